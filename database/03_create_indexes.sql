@@ -91,6 +91,14 @@ CREATE INDEX idx_like_record_recipe_id
 CREATE INDEX idx_like_record_user_id
     ON like_record (user_id);
 
+-- ============================================================================
+-- RECIPE_VIEW TABLE INDEXES
+-- ============================================================================
+
+-- Range scans by view time (dashboard rollups, daily view counts)
+CREATE INDEX idx_recipe_view_viewed_at
+    ON recipe_view (viewed_at);
+
 -- ============================================================================
 -- SEARCH_HISTORY TABLE INDEXES
 -- ============================================================================
@@ -143,6 +151,10 @@ CREATE INDEX idx_session_user_id
 CREATE INDEX idx_session_expires_at
     ON session (expires_at);
 
+-- Sessions touched in a time range (active user rollups)
+CREATE INDEX idx_session_updated_at
+    ON session (updated_at);
+
 -- ============================================================================
 -- INGREDIENT TABLE INDEXES
 -- ============================================================================
@@ -0,0 +1,653 @@
+from __future__ import annotations
+
+import argparse
+import json
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from db import Database, connect, format_datetime, sqlite_standin, to_datetime
+
+# Columns exported per table. Kinds: "i" int64, "f" nullable float64,
+# "s" dictionary-encoded string (int32 codes, -1 = NULL), "t" datetime64[s].
+EXPORT_TABLES: dict[str, dict[str, str]] = {
+    "user": {"id": "i", "username": "s", "role": "s", "status": "s", "joined_date": "t"},
+    "recipe": {
+        "id": "i",
+        "title": "s",
+        "category": "s",
+        "difficulty": "s",
+        "prep_time": "f",
+        "cook_time": "f",
+        "author_id": "i",
+        "status": "s",
+    },
+    "review": {"id": "i", "user_id": "i", "recipe_id": "i", "rating": "i"},
+    "like_record": {"id": "i", "user_id": "i", "recipe_id": "i"},
+    "favorite": {"id": "i", "user_id": "i", "recipe_id": "i"},
+    "recipe_view": {"id": "i", "user_id": "i", "recipe_id": "i", "viewed_at": "t"},
+    "search_history": {"id": "i", "user_id": "i", "query": "s", "searched_at": "t"},
+    "daily_stat": {
+        "id": "i",
+        "stat_date": "t",
+        "page_view_count": "i",
+        "active_user_count": "i",
+        "new_user_count": "i",
+        "recipe_view_count": "i",
+    },
+}
+
+_DTYPES = {"i": np.int64, "f": np.float64, "s": np.int32, "t": "datetime64[s]"}
+DIFFICULTY_ORDER = ("Easy", "Medium", "Hard")
+
+
+def _encode(kind: str, values: list[Any], vocab: dict[str, int] | None) -> np.ndarray:
+    if kind == "s":
+        assert vocab is not None
+        return np.array(
+            [-1 if v is None else vocab.setdefault(str(v), len(vocab)) for v in values],
+            dtype=np.int32,
+        )
+    if kind == "t":
+        return np.array(
+            [np.datetime64("NaT") if v is None else np.datetime64(to_datetime(v), "s") for v in values],
+            dtype="datetime64[s]",
+        )
+    if kind == "f":
+        return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+    return np.array([int(v) for v in values], dtype=np.int64)
+
+
+def export_tables(db: Database, out_dir: Path, chunk_size: int = 50_000) -> dict:
+    """Stream each table into memory-mapped ``.npy`` columns under ``out_dir``.
+
+    Rows are read in primary-key order up to the ``MAX(id)`` seen at the start,
+    so one pass gives a consistent cut even while the table keeps growing.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    manifest: dict[str, Any] = {"exported_at": datetime.now().isoformat(timespec="seconds"), "tables": {}}
+    for table, columns in EXPORT_TABLES.items():
+        max_id = db.scalar(f"SELECT MAX(id) FROM {table}") or 0
+        count = db.scalar(f"SELECT COUNT(*) FROM {table} WHERE id <= ?", (max_id,)) or 0
+        arrays = {
+            col: np.lib.format.open_memmap(
+                out_dir / f"{table}.{col}.npy", mode="w+", dtype=_DTYPES[kind], shape=(count,)
+            )
+            if count
+            else np.empty(0, dtype=_DTYPES[kind])
+            for col, kind in columns.items()
+        }
+        vocabs = {col: {} for col, kind in columns.items() if kind == "s"}
+        pos = 0
+        select = ", ".join(columns)
+        for rows in db.stream(
+            f"SELECT {select} FROM {table} WHERE id <= ? ORDER BY id", (max_id,), chunk_size
+        ):
+            rows = rows[: count - pos]
+            for i, (col, kind) in enumerate(columns.items()):
+                arrays[col][pos : pos + len(rows)] = _encode(kind, [r[i] for r in rows], vocabs.get(col))
+            pos += len(rows)
+        for col, arr in arrays.items():
+            if isinstance(arr, np.memmap):
+                arr.flush()
+            else:
+                np.save(out_dir / f"{table}.{col}.npy", arr)
+        for col, vocab in vocabs.items():
+            (out_dir / f"{table}.{col}.vocab.json").write_text(json.dumps(list(vocab)), encoding="utf-8")
+        manifest["tables"][table] = {"rows": pos, "max_id": int(max_id), "columns": columns}
+    (out_dir / "manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    return manifest
+
+
+class ColumnarSnapshot:
+    """Read-only, memory-mapped view over an ``export_tables`` directory."""
+
+    def __init__(self, out_dir: Path) -> None:
+        self.out_dir = out_dir
+        self.manifest = json.loads((out_dir / "manifest.json").read_text(encoding="utf-8"))
+        self._vocab: dict[tuple[str, str], np.ndarray] = {}
+
+    def rows(self, table: str) -> int:
+        return self.manifest["tables"][table]["rows"]
+
+    def column(self, table: str, col: str) -> np.ndarray:
+        arr = np.load(self.out_dir / f"{table}.{col}.npy", mmap_mode="r")
+        return arr[: self.rows(table)]
+
+    def vocab(self, table: str, col: str) -> np.ndarray:
+        key = (table, col)
+        if key not in self._vocab:
+            words = json.loads((self.out_dir / f"{table}.{col}.vocab.json").read_text(encoding="utf-8"))
+            self._vocab[key] = np.array(words + [None], dtype=object)
+        return self._vocab[key]
+
+    def strings(self, table: str, col: str) -> np.ndarray:
+        # Code -1 indexes the trailing None appended to the vocabulary.
+        return self.vocab(table, col)[self.column(table, col)]
+
+
+def _positions(ids: np.ndarray, keys: np.ndarray) -> np.ndarray:
+    """Map foreign keys onto row positions of a sorted id column (-1 when absent)."""
+    if len(ids) == 0:
+        return np.full(len(keys), -1, dtype=np.int64)
+    pos = np.clip(np.searchsorted(ids, keys), 0, len(ids) - 1)
+    return np.where(ids[pos] == keys, pos, -1)
+
+
+def _count(pos: np.ndarray, n: int) -> np.ndarray:
+    return np.bincount(pos[pos >= 0], minlength=n)[:n]
+
+
+def _total(pos: np.ndarray, weights: np.ndarray, n: int) -> np.ndarray:
+    ok = pos >= 0
+    return np.bincount(pos[ok], weights=weights[ok].astype(np.float64), minlength=n)[:n]
+
+
+def _mean(total: np.ndarray, count: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / np.maximum(count, 1), np.nan)
+
+
+def _round(values: np.ndarray, digits: int) -> np.ndarray:
+    # MySQL rounds exact DECIMAL averages half away from zero; np.round would
+    # round half to even and disagree on values such as 4.25.
+    scale = 10.0**digits
+    return np.sign(values) * np.floor(np.abs(values) * scale + 0.5 + 1e-9) / scale
+
+
+def _rank(values: np.ndarray) -> np.ndarray:
+    """RANK() OVER (ORDER BY value DESC) for values already sorted descending."""
+    if len(values) == 0:
+        return np.empty(0, dtype=np.int64)
+    new_group = np.r_[True, values[1:] != values[:-1]]
+    return np.maximum.accumulate(np.where(new_group, np.arange(1, len(values) + 1), 0))
+
+
+def _py(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    return value
+
+
+def _records(columns: dict[str, np.ndarray], order: np.ndarray) -> list[dict[str, Any]]:
+    return [{name: _py(col[i]) for name, col in columns.items()} for i in order]
+
+
+class AnalyticsEngine:
+    """Vectorised equivalents of the queries in ``11_analytics_queries.sql``."""
+
+    def __init__(self, snapshot: ColumnarSnapshot, as_of: date | None = None) -> None:
+        self.s = snapshot
+        self.as_of = as_of or date.today()
+        # One clock reading for every time-of-day window, so verify() can replay it.
+        self.now = datetime.combine(self.as_of, datetime.now().time())
+        s = snapshot
+        self.recipe_id = s.column("recipe", "id")
+        self.user_id = s.column("user", "id")
+        self.n_recipes = len(self.recipe_id)
+        self.n_users = len(self.user_id)
+        self.published = s.strings("recipe", "status") == "published"
+        self.author_name = s.strings("user", "username")[_positions(self.user_id, s.column("recipe", "author_id"))]
+
+        self.view_pos = _positions(self.recipe_id, s.column("recipe_view", "recipe_id"))
+        self.like_pos = _positions(self.recipe_id, s.column("like_record", "recipe_id"))
+        self.review_pos = _positions(self.recipe_id, s.column("review", "recipe_id"))
+        self.ratings = s.column("review", "rating")
+        self.views = _count(self.view_pos, self.n_recipes)
+        self.likes = _count(self.like_pos, self.n_recipes)
+        self.review_count = _count(self.review_pos, self.n_recipes)
+        self.avg_rating = _mean(_total(self.review_pos, self.ratings, self.n_recipes), self.review_count)
+
+    def _top(self, metric: np.ndarray, mask: np.ndarray, limit: int) -> np.ndarray:
+        idx = np.flatnonzero(mask)
+        order = np.lexsort((self.recipe_id[idx], -metric[idx]))
+        return idx[order][:limit]
+
+    def _recipe_columns(self) -> dict[str, np.ndarray]:
+        return {
+            "recipe_id": self.recipe_id,
+            "title": self.s.strings("recipe", "title"),
+            "category": self.s.strings("recipe", "category"),
+            "author_name": self.author_name,
+        }
+
+    def top_by_views(self, limit: int = 10) -> list[dict[str, Any]]:
+        top = self._top(self.views, self.published, limit)
+        cols = self._recipe_columns() | {
+            "total_views": self.views,
+            "like_count": self.likes,
+            "avg_rating": _round(self.avg_rating, 1),
+        }
+        rows = _records(cols, top)
+        for row, rank in zip(rows, _rank(self.views[top])):
+            row["rank"] = int(rank)
+        return rows
+
+    def top_by_likes(self, limit: int = 10) -> list[dict[str, Any]]:
+        top = self._top(self.likes, self.published, limit)
+        cols = self._recipe_columns() | {"total_likes": self.likes, "avg_rating": _round(self.avg_rating, 1)}
+        rows = _records(cols, top)
+        for row, rank in zip(rows, _rank(self.likes[top])):
+            row["rank"] = int(rank)
+        return rows
+
+    def top_by_rating(self, limit: int = 10, min_reviews: int = 2) -> list[dict[str, Any]]:
+        rating = _round(self.avg_rating, 2)
+        idx = np.flatnonzero(self.published & (self.review_count >= min_reviews))
+        order = np.lexsort((self.recipe_id[idx], -self.review_count[idx], -rating[idx]))
+        top = idx[order][:limit]
+        cols = self._recipe_columns() | {"review_count": self.review_count, "avg_rating": rating}
+        rows = _records(cols, top)
+        for row, rank in zip(rows, _rank(rating[top])):
+            row["rank"] = int(rank)
+        return rows
+
+    def user_engagement(self) -> list[dict[str, Any]]:
+        s, n = self.s, self.n_users
+        uid = self.user_id
+        author_pos = _positions(uid, s.column("recipe", "author_id"))
+        review_user = _positions(uid, s.column("review", "user_id"))
+        like_user = _positions(uid, s.column("like_record", "user_id"))
+        # likes_received: each like is credited to the author of the liked recipe
+        like_author = np.where(self.like_pos >= 0, author_pos[np.maximum(self.like_pos, 0)], -1)
+        reviews_written = _count(review_user, n)
+        cols = {
+            "user_id": uid,
+            "display_name": s.strings("user", "username"),
+            "status": s.strings("user", "status"),
+            "joined_date": s.column("user", "joined_date").astype("datetime64[D]").astype(str),
+            "published_recipes": _count(np.where(self.published, author_pos, -1), n),
+            "reviews_written": reviews_written,
+            "avg_rating_given": _round(_mean(_total(review_user, self.ratings, n), reviews_written), 1),
+            "likes_given": _count(like_user, n),
+            "likes_received": _count(like_author, n),
+            "favorites_count": _count(_positions(uid, s.column("favorite", "user_id")), n),
+            "recipes_viewed": _count(_positions(uid, s.column("recipe_view", "user_id")), n),
+            "searches_made": _count(_positions(uid, s.column("search_history", "user_id")), n),
+        }
+        idx = np.flatnonzero(s.strings("user", "role") == "user")
+        order = np.lexsort((uid[idx], -cols["likes_received"][idx], -cols["published_recipes"][idx]))
+        return _records(cols, idx[order])
+
+    def growth(self) -> dict[str, list[dict[str, Any]]]:
+        s = self.s
+        days = s.column("daily_stat", "stat_date").astype("datetime64[D]")
+        metrics = {
+            name: s.column("daily_stat", name)
+            for name in ("page_view_count", "active_user_count", "new_user_count", "recipe_view_count")
+        }
+        as_of = np.datetime64(self.as_of, "D")
+
+        recent = np.flatnonzero(days >= as_of - np.timedelta64(30, "D"))
+        daily = _records({"stat_date": days.astype(str)} | metrics, recent[np.argsort(-days[recent].astype(np.int64))])
+
+        def rollup(keys: np.ndarray, mask: np.ndarray) -> tuple[np.ndarray, np.ndarray, dict[str, np.ndarray]]:
+            uniq, inverse = np.unique(keys[mask], return_inverse=True)
+            k = len(uniq)
+            counts = np.bincount(inverse, minlength=k)
+            sums = {name: np.bincount(inverse, weights=v[mask], minlength=k) for name, v in metrics.items()}
+            return uniq, counts, sums
+
+        iso = np.array([d.isocalendar()[0] * 100 + d.isocalendar()[1] for d in days.astype(object)], dtype=np.int64)
+        wmask = days >= as_of - np.timedelta64(12 * 7, "D")
+        weeks, wcount, wsum = rollup(iso, wmask)
+        wdays = days[wmask]
+        _, winv = np.unique(iso[wmask], return_inverse=True)
+        week_start = np.full(len(weeks), np.datetime64("9999-12-31"), dtype="datetime64[D]")
+        week_end = np.full(len(weeks), np.datetime64("0001-01-01"), dtype="datetime64[D]")
+        np.minimum.at(week_start, winv, wdays)
+        np.maximum.at(week_end, winv, wdays)
+        weekly = _records(
+            {
+                "year_week": weeks,
+                "week_start": week_start.astype(str),
+                "week_end": week_end.astype(str),
+                "total_page_views": wsum["page_view_count"].astype(np.int64),
+                "avg_daily_active_users": _round(wsum["active_user_count"] / np.maximum(wcount, 1), 0).astype(np.int64),
+                "total_new_users": wsum["new_user_count"].astype(np.int64),
+                "total_recipe_views": wsum["recipe_view_count"].astype(np.int64),
+            },
+            np.arange(len(weeks))[::-1],
+        )
+
+        month_keys = days.astype("datetime64[M]").astype(str)
+        months, mcount, msum = rollup(month_keys, np.ones(len(days), dtype=bool))
+        monthly = _records(
+            {
+                "month": months,
+                "total_page_views": msum["page_view_count"].astype(np.int64),
+                "avg_daily_active_users": _round(msum["active_user_count"] / np.maximum(mcount, 1), 0).astype(np.int64),
+                "total_new_users": msum["new_user_count"].astype(np.int64),
+                "total_recipe_views": msum["recipe_view_count"].astype(np.int64),
+            },
+            np.arange(len(months))[::-1],
+        )
+        return {"daily": daily, "weekly": weekly, "monthly": monthly}
+
+    def category_distribution(self) -> list[dict[str, Any]]:
+        codes = self.s.column("recipe", "category").astype(np.int64) + 1  # shift NULL (-1) to 0
+        vocab = np.r_[np.array([None], dtype=object), self.s.vocab("recipe", "category")[:-1]]
+        k = len(vocab)
+
+        def per_category(pos: np.ndarray, weights: np.ndarray | None = None) -> np.ndarray:
+            ok = pos >= 0
+            return np.bincount(codes[pos[ok]], weights=None if weights is None else weights[ok], minlength=k)
+
+        recipe_count = np.bincount(codes, minlength=k)
+        published_count = np.bincount(codes, weights=self.published, minlength=k).astype(np.int64)
+        rating_n = per_category(self.review_pos)
+        cols = {
+            "category": vocab,
+            "recipe_count": recipe_count,
+            "published_count": published_count,
+            "publish_rate_pct": _round(_mean(published_count * 100.0, recipe_count), 4),
+            "total_views": per_category(self.view_pos),
+            "total_likes": per_category(self.like_pos),
+            "avg_rating": _round(_mean(per_category(self.review_pos, self.ratings.astype(np.float64)), rating_n), 2),
+        }
+        present = np.flatnonzero(recipe_count > 0)
+        names = np.array(["" if v is None else v for v in vocab], dtype=str)
+        order = np.lexsort((names[present], -recipe_count[present]))
+        return _records(cols, present[order])
+
+    def popular_searches(self, limit: int = 20) -> list[dict[str, Any]]:
+        s = self.s
+        codes = s.column("search_history", "query")
+        lowered = np.array([w.lower() for w in s.vocab("search_history", "query")[:-1]], dtype=str)
+        if len(codes) == 0:
+            return []
+        terms, remap = np.unique(lowered, return_inverse=True)
+        group = remap[codes]
+        k = len(terms)
+        users = s.column("search_history", "user_id")
+        pairs = np.unique(np.stack([group, users]), axis=1)
+        last = np.full(k, np.datetime64("NaT"), dtype="datetime64[s]")
+        searched = s.column("search_history", "searched_at")
+        order = np.argsort(searched, kind="stable")
+        last[group[order]] = searched[order]  # later assignments win: latest timestamp per term
+        cols = {
+            "search_term": terms,
+            "search_count": np.bincount(group, minlength=k),
+            "unique_users": np.bincount(pairs[0], minlength=k),
+            "last_searched": last.astype(object),
+        }
+        top = np.lexsort((terms, -cols["search_count"]))[:limit]
+        return _records(cols, top)
+
+    def search_trends(self, days: int = 7) -> list[dict[str, Any]]:
+        s = self.s
+        searched = s.column("search_history", "searched_at")
+        cutoff = np.datetime64(self.now - timedelta(days=days), "s")
+        mask = searched >= cutoff
+        day = searched[mask].astype("datetime64[D]")
+        uniq, inv = np.unique(day, return_inverse=True)
+        users = s.column("search_history", "user_id")[mask]
+        pairs = np.unique(np.stack([inv, users]), axis=1) if len(inv) else np.empty((2, 0), dtype=np.int64)
+        cols = {
+            "search_date": uniq.astype(str),
+            "total_searches": np.bincount(inv, minlength=len(uniq)),
+            "unique_searchers": np.bincount(pairs[0], minlength=len(uniq)),
+        }
+        return _records(cols, np.arange(len(uniq))[::-1])
+
+    def difficulty_distribution(self) -> list[dict[str, Any]]:
+        s = self.s
+        difficulty = s.strings("recipe", "difficulty")
+        prep, cook = s.column("recipe", "prep_time"), s.column("recipe", "cook_time")
+        rows = []
+        for level in DIFFICULTY_ORDER:
+            mask = self.published & (difficulty == level)
+            if not mask.any():
+                continue
+            total = prep[mask] + cook[mask]
+            avg_total = np.nanmean(total) if np.isfinite(total).any() else np.nan
+            ratings = self.avg_rating[mask]
+            avg_rating = np.nanmean(ratings) if np.isfinite(ratings).any() else np.nan
+            if avg_total <= 30:
+                bucket = "Quick (<=30 min)"
+            elif avg_total <= 60:
+                bucket = "Medium (31-60 min)"
+            else:
+                bucket = "Long (>60 min)"
+            rows.append(
+                {
+                    "difficulty": level,
+                    "recipe_count": int(mask.sum()),
+                    "avg_prep_min": _py(_round(np.array([np.nanmean(prep[mask])]), 0)[0]),
+                    "avg_cook_min": _py(_round(np.array([np.nanmean(cook[mask])]), 0)[0]),
+                    "avg_total_min": _py(_round(np.array([avg_total]), 0)[0]),
+                    "avg_rating": _py(_round(np.array([avg_rating]), 2)[0]),
+                    "time_category": bucket,
+                }
+            )
+        return rows
+
+    def compute_all(self) -> dict[str, list[dict[str, Any]]]:
+        growth = self.growth()
+        return {
+            "top_by_views": self.top_by_views(),
+            "top_by_likes": self.top_by_likes(),
+            "top_by_rating": self.top_by_rating(),
+            "user_engagement": self.user_engagement(),
+            "growth_daily": growth["daily"],
+            "growth_weekly": growth["weekly"],
+            "growth_monthly": growth["monthly"],
+            "category_distribution": self.category_distribution(),
+            "popular_searches": self.popular_searches(),
+            "search_trends": self.search_trends(),
+            "difficulty_distribution": self.difficulty_distribution(),
+        }
+
+
+def _column_type(values: list[Any]) -> str:
+    present = [v for v in values if v is not None]
+    if present and all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "BIGINT"
+    if present and all(isinstance(v, (int, float)) for v in present):
+        return "DOUBLE"
+    return "TEXT"
+
+
+def publish(db: Database, results: dict[str, list[dict[str, Any]]], prefix: str = "analytics_") -> None:
+    """Replace one small ``analytics_<name>`` summary table per result set."""
+    computed_at = datetime.now().isoformat(sep=" ", timespec="seconds")
+    with db.transaction():
+        for name, rows in results.items():
+            table = prefix + name
+            db.execute(f"DROP TABLE IF EXISTS {table}")
+            if not rows:
+                continue
+            cols = list(rows[0])
+            ddl = ", ".join(f"{c} {_column_type([r[c] for r in rows])}" for c in cols)
+            db.execute(f"CREATE TABLE {table} ({ddl}, computed_at TEXT)")
+            marks = ", ".join("?" for _ in range(len(cols) + 1))
+            db.executemany(
+                f"INSERT INTO {table} ({', '.join(cols)}, computed_at) VALUES ({marks})",
+                ([r[c] for c in cols] + [computed_at] for r in rows),
+            )
+
+
+# Reference SQL for verification: the 11_analytics_queries.sql queries written
+# against the column names of 02_create_tables.sql, with deterministic tie-breaks.
+REFERENCE_SQL: dict[str, str] = {
+    "top_by_views": """
+        SELECT r.id, r.title, r.category, u.username,
+               (SELECT COUNT(*) FROM recipe_view WHERE recipe_id = r.id) AS total_views,
+               (SELECT COUNT(*) FROM like_record WHERE recipe_id = r.id) AS like_count,
+               (SELECT ROUND(AVG(rating), 1) FROM review WHERE recipe_id = r.id) AS avg_rating,
+               RANK() OVER (ORDER BY (SELECT COUNT(*) FROM recipe_view WHERE recipe_id = r.id) DESC)
+        FROM recipe r INNER JOIN user u ON r.author_id = u.id
+        WHERE r.status = 'published'
+        ORDER BY total_views DESC, r.id LIMIT 10""",
+    "top_by_likes": """
+        SELECT r.id, r.title, r.category, u.username,
+               (SELECT COUNT(*) FROM like_record WHERE recipe_id = r.id) AS total_likes,
+               (SELECT ROUND(AVG(rating), 1) FROM review WHERE recipe_id = r.id) AS avg_rating,
+               RANK() OVER (ORDER BY (SELECT COUNT(*) FROM like_record WHERE recipe_id = r.id) DESC)
+        FROM recipe r INNER JOIN user u ON r.author_id = u.id
+        WHERE r.status = 'published'
+        ORDER BY total_likes DESC, r.id LIMIT 10""",
+    "top_by_rating": """
+        SELECT r.id, r.title, r.category, u.username,
+               COUNT(rv.id) AS review_count, ROUND(AVG(rv.rating), 2) AS avg_rating,
+               RANK() OVER (ORDER BY ROUND(AVG(rv.rating), 2) DESC)
+        FROM recipe r
+        INNER JOIN user u ON r.author_id = u.id
+        INNER JOIN review rv ON r.id = rv.recipe_id
+        WHERE r.status = 'published'
+        GROUP BY r.id, r.title, r.category, u.username
+        HAVING COUNT(rv.id) >= 2
+        ORDER BY avg_rating DESC, review_count DESC, r.id LIMIT 10""",
+    "user_engagement": """
+        SELECT u.id, u.username, u.status, SUBSTR(CAST(u.joined_date AS CHAR), 1, 10),
+               (SELECT COUNT(*) FROM recipe WHERE author_id = u.id AND status = 'published') AS published_recipes,
+               (SELECT COUNT(*) FROM review WHERE user_id = u.id),
+               (SELECT ROUND(AVG(rating), 1) FROM review WHERE user_id = u.id),
+               (SELECT COUNT(*) FROM like_record WHERE user_id = u.id),
+               (SELECT COUNT(*) FROM like_record lr INNER JOIN recipe r ON lr.recipe_id = r.id
+                  WHERE r.author_id = u.id) AS likes_received,
+               (SELECT COUNT(*) FROM favorite WHERE user_id = u.id),
+               (SELECT COUNT(*) FROM recipe_view WHERE user_id = u.id),
+               (SELECT COUNT(*) FROM search_history WHERE user_id = u.id)
+        FROM user u
+        WHERE u.role = 'user'
+        ORDER BY published_recipes DESC, likes_received DESC, u.id""",
+    "growth_daily": """
+        SELECT stat_date, page_view_count, active_user_count, new_user_count, recipe_view_count
+        FROM daily_stat
+        WHERE stat_date >= ?
+        ORDER BY stat_date DESC""",
+    # Grouped by the Monday of each ISO week; verify() turns it into YEARWEEK(stat_date, 1).
+    "growth_weekly": """
+        SELECT {week_start} AS monday, MIN(stat_date), MAX(stat_date),
+               SUM(page_view_count), ROUND(AVG(active_user_count)),
+               SUM(new_user_count), SUM(recipe_view_count)
+        FROM daily_stat
+        WHERE stat_date >= ?
+        GROUP BY {week_start}
+        ORDER BY monday DESC""",
+    "growth_monthly": """
+        SELECT SUBSTR(CAST(stat_date AS CHAR), 1, 7) AS month,
+               SUM(page_view_count), ROUND(AVG(active_user_count)),
+               SUM(new_user_count), SUM(recipe_view_count)
+        FROM daily_stat
+        GROUP BY SUBSTR(CAST(stat_date AS CHAR), 1, 7)
+        ORDER BY month DESC""",
+    "category_distribution": """
+        SELECT r.category, COUNT(*) AS recipe_count,
+               COUNT(CASE WHEN r.status = 'published' THEN 1 END),
+               ROUND(SUM(CASE WHEN r.status = 'published' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 4),
+               (SELECT COUNT(*) FROM recipe_view rv INNER JOIN recipe r2 ON rv.recipe_id = r2.id
+                  WHERE r2.category = r.category),
+               (SELECT COUNT(*) FROM like_record lr INNER JOIN recipe r2 ON lr.recipe_id = r2.id
+                  WHERE r2.category = r.category),
+               (SELECT ROUND(AVG(rev.rating), 2) FROM review rev INNER JOIN recipe r2 ON rev.recipe_id = r2.id
+                  WHERE r2.category = r.category)
+        FROM recipe r
+        GROUP BY r.category
+        ORDER BY recipe_count DESC, r.category""",
+    "popular_searches": """
+        SELECT LOWER(query) AS search_term, COUNT(*) AS search_count,
+               COUNT(DISTINCT user_id), MAX(searched_at)
+        FROM search_history
+        GROUP BY LOWER(query)
+        ORDER BY search_count DESC, search_term LIMIT 20""",
+    "search_trends": """
+        SELECT DATE(searched_at) AS search_date, COUNT(*), COUNT(DISTINCT user_id)
+        FROM search_history
+        WHERE searched_at >= ?
+        GROUP BY DATE(searched_at)
+        ORDER BY search_date DESC""",
+    "difficulty_distribution": """
+        SELECT r.difficulty, COUNT(*),
+               ROUND(AVG(r.prep_time)), ROUND(AVG(r.cook_time)), ROUND(AVG(r.prep_time + r.cook_time)),
+               ROUND(AVG((SELECT AVG(rating) FROM review WHERE recipe_id = r.id)), 2),
+               CASE
+                   WHEN AVG(r.prep_time + r.cook_time) <= 30 THEN 'Quick (<=30 min)'
+                   WHEN AVG(r.prep_time + r.cook_time) <= 60 THEN 'Medium (31-60 min)'
+                   ELSE 'Long (>60 min)'
+               END
+        FROM recipe r
+        WHERE r.status = 'published' AND r.difficulty IN ('Easy', 'Medium', 'Hard')
+        GROUP BY r.difficulty
+        ORDER BY CASE r.difficulty WHEN 'Easy' THEN 1 WHEN 'Medium' THEN 2 ELSE 3 END""",
+}
+
+# Monday of stat_date's ISO week, per dialect (MySQL, SQLite).
+WEEK_START_SQL = ("DATE_SUB(stat_date, INTERVAL WEEKDAY(stat_date) DAY)", "DATE(stat_date, '-6 days', 'weekday 1')")
+
+
+def _normalise(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        value = float(value)
+    if isinstance(value, float):
+        return round(value, 4)
+    if isinstance(value, (datetime, date)):
+        return _py(value)
+    return value
+
+
+def verify(db: Database, results: dict[str, list[dict[str, Any]]], as_of: date, now: datetime) -> list[str]:
+    """Compare engine output, ranks included, against ``REFERENCE_SQL`` run on the source database.
+
+    ``as_of`` and ``now`` must be the engine's, so the windowed queries cut
+    off at the same instant.
+    """
+    params = {
+        "growth_daily": ((as_of - timedelta(days=30)).isoformat(),),
+        "growth_weekly": ((as_of - timedelta(weeks=12)).isoformat(),),
+        "search_trends": (format_datetime(now - timedelta(days=7)),),
+    }
+    week_start = WEEK_START_SQL[0] if db.is_mysql else WEEK_START_SQL[1]
+    problems = []
+    for name, sql in REFERENCE_SQL.items():
+        rows = db.query(sql.format(week_start=week_start), params.get(name, ()))
+        expected = [[_normalise(v) for v in row] for row in rows]
+        actual = [[_normalise(v) for v in row.values()] for row in results[name]]
+        if name == "popular_searches":
+            expected = [row[:3] + [_py(to_datetime(row[3]))] for row in expected]
+        elif name == "growth_weekly":
+            expected = [[_year_week(row[0])] + row[1:] for row in expected]
+        if expected != actual:
+            problems.append(f"{name}: expected {expected!r}, got {actual!r}")
+    return problems
+
+
+def _year_week(monday: Any) -> int:
+    year, week, _ = to_datetime(monday).isocalendar()
+    return year * 100 + week
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline analytics over a columnar export of cookhub")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--out", type=Path, default=Path(__file__).parent / "out" / "analytics")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="Reference date for windowed metrics")
+    parser.add_argument("--publish", action="store_true", help="Write analytics_* summary tables")
+    parser.add_argument("--verify", action="store_true", help="Check results against the reference SQL")
+    args = parser.parse_args()
+
+    db = connect(args.db) if args.db else sqlite_standin()
+    export_tables(db, args.out / "columns")
+    engine = AnalyticsEngine(ColumnarSnapshot(args.out / "columns"), args.as_of)
+    results = engine.compute_all()
+    (args.out / "results.json").write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.verify:
+        problems = verify(db, results, engine.as_of, engine.now)
+        for problem in problems:
+            print(problem)
+        print("verify:", "OK" if not problems else f"{len(problems)} mismatches")
+    if args.publish:
+        publish(db, results)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,434 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import queue
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+from db import Database, connect, format_datetime, sqlite_standin
+
+# Base tables of 02_create_tables.sql, in the order 14_backup_restore.sql lists them
+TABLES = (
+    "user",
+    "recipe",
+    "ingredient",
+    "instruction",
+    "recipe_image",
+    "review",
+    "like_record",
+    "favorite",
+    "recipe_view",
+    "search_history",
+    "daily_stat",
+    "activity_log",
+    "session",
+)
+# Only ever inserted into by the application, so rows past the previous
+# backup's max id are exactly what changed; an incremental backup dumps only
+# those and every other (small, mutable) table in full. Deletes (retention,
+# compaction, cascades from a deleted user or recipe) are not captured: the
+# restore re-applies the cascades, and a periodic full backup resets the chain.
+APPEND_ONLY = ("recipe_view", "search_history", "activity_log")
+# (table, column, parent table, ON DELETE action) for the foreign keys of 02_create_tables.sql
+FOREIGN_KEYS = (
+    ("session", "user_id", "user", "CASCADE"),
+    ("recipe", "author_id", "user", "CASCADE"),
+    ("ingredient", "recipe_id", "recipe", "CASCADE"),
+    ("instruction", "recipe_id", "recipe", "CASCADE"),
+    ("recipe_image", "recipe_id", "recipe", "CASCADE"),
+    ("review", "user_id", "user", "CASCADE"),
+    ("review", "recipe_id", "recipe", "CASCADE"),
+    ("favorite", "user_id", "user", "CASCADE"),
+    ("favorite", "recipe_id", "recipe", "CASCADE"),
+    ("like_record", "user_id", "user", "CASCADE"),
+    ("like_record", "recipe_id", "recipe", "CASCADE"),
+    ("recipe_view", "recipe_id", "recipe", "CASCADE"),
+    ("recipe_view", "user_id", "user", "CASCADE"),
+    ("search_history", "user_id", "user", "CASCADE"),
+    ("activity_log", "admin_id", "user", "SET NULL"),
+)
+CHUNK_ROWS = 50_000
+MANIFEST = "manifest.json"
+
+
+class _HashingWriter(io.RawIOBase):
+    """File wrapper hashing and counting the (compressed) bytes written through it."""
+
+    def __init__(self, raw: Any) -> None:
+        self.raw = raw
+        self.sha256 = hashlib.sha256()
+        self.bytes = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        self.bytes += len(data)
+        return self.raw.write(data)
+
+
+def _checksum(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _open_snapshot(db: Database) -> None:
+    if db.is_mysql:
+        db.execute("SET SESSION TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        db.execute("START TRANSACTION WITH CONSISTENT SNAPSHOT")
+    else:
+        db.execute("BEGIN")
+        db.execute("SELECT COUNT(*) FROM sqlite_master")  # takes the read lock now
+
+
+def _run_workers(connections: list[Database], tasks: list[Any], work: Callable[[Database, Any], Any]) -> list[Any]:
+    """Run ``work(db, task)`` over ``tasks`` with one thread per connection."""
+    pending: queue.Queue = queue.Queue()
+    for task in tasks:
+        pending.put(task)
+    results, errors = [], []
+    lock = threading.Lock()
+
+    def loop(db: Database) -> None:
+        while not errors:
+            try:
+                task = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                result = work(db, task)
+            except BaseException as exc:
+                errors.append(exc)
+                return
+            with lock:
+                results.append(result)
+
+    threads = [threading.Thread(target=loop, args=(db,)) for db in connections]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+class BackupTool:
+    """Parallel per-table dumps and restores of the cookhub schema.
+
+    Every worker holds its own connection. For a backup, every table is read
+    as of the same instant: the coordinator opens its snapshot first and
+    computes the chunk bounds in it, and worker snapshots are only added
+    while writes are held off (``FLUSH TABLES WITH READ LOCK`` on MySQL,
+    released straight after, as ``mydumper`` does). When that is not
+    possible the backup falls back to the coordinator's single snapshot.
+    Tables are split into primary-key ranges, and each range is streamed as
+    gzip-compressed JSON lines with its SHA-256 recorded in ``manifest.json``.
+
+    An incremental backup holds the ``APPEND_ONLY`` rows added since its
+    base and a full copy of every other table, so it is only consistent
+    together with its base chain, and ``restore`` always applies the whole
+    chain: each table is loaded from the newest backup that holds it in
+    full, plus the newer append-only rows.
+
+    A restore verifies each chunk's checksum and loads chunks in parallel
+    with foreign key checks off and ``@DISABLE_TRIGGERS = 1``, both reset
+    afterwards on every connection. Append-only rows whose user or recipe
+    was deleted after the base are then removed as the ``ON DELETE`` rules
+    would have, and the restore fails if any row is still orphaned. Inserts
+    ignore existing ids, so an interrupted restore can be re-run; the target
+    schema must otherwise be empty.
+    """
+
+    def __init__(self, connect_db: Callable[[], Database], workers: int = 4, chunk_rows: int = CHUNK_ROWS) -> None:
+        self.connect_db = connect_db
+        self.workers = workers
+        self.chunk_rows = chunk_rows
+
+    # -- backup ----------------------------------------------------------------
+
+    def backup(self, out_dir: Path, base: Path | None = None, global_lock: bool = True) -> dict[str, Any]:
+        """Full backup, or with ``base`` an incremental one: ``APPEND_ONLY`` past the base's max ids, the rest in full."""
+        out_dir.mkdir(parents=True, exist_ok=True)
+        previous = json.loads((base / MANIFEST).read_text(encoding="utf-8")) if base else None
+        started = time.perf_counter()
+        coordinator = self.connect_db()
+        connections = [coordinator]
+        try:
+            connections = self._open_snapshots(coordinator, global_lock)
+            manifest = {
+                "created_at": format_datetime(datetime.now()),
+                "kind": "incremental" if previous else "full",
+                "base": str(base.resolve()) if base else None,
+                "workers": len(connections),
+                "tables": {},
+            }
+            # Bounds come from the same snapshot every worker reads, so a row
+            # inside a chunk range is always in that chunk, and max_id is
+            # exactly where the next incremental has to start.
+            tasks = []
+            for table in TABLES:
+                # min_id 0: this backup holds the table in full.
+                since = previous["tables"][table]["max_id"] if previous and table in APPEND_ONLY else 0
+                low, high = coordinator.execute(
+                    f"SELECT MIN(id), MAX(id) FROM {table} WHERE id > ?", (since,)
+                ).fetchone()
+                columns = [d[0] for d in coordinator.execute(f"SELECT * FROM {table} LIMIT 0").description]
+                manifest["tables"][table] = {
+                    "columns": columns,
+                    "min_id": since,
+                    "max_id": high if high is not None else since,
+                    "chunks": [],
+                }
+                if low is None:
+                    continue
+                start = low
+                while start <= high:
+                    tasks.append((table, columns, start, min(start + self.chunk_rows - 1, high)))
+                    start += self.chunk_rows
+            # Largest ranges first so the slowest chunk does not start last.
+            tasks.sort(key=lambda t: t[3] - t[2], reverse=True)
+            chunks = _run_workers(connections, tasks, lambda db, task: self._dump_chunk(db, out_dir, *task))
+        finally:
+            for db in connections:
+                db.rollback()
+                db.close()
+        for table, chunk in sorted(chunks, key=lambda c: (c[0], c[1]["first_id"])):
+            manifest["tables"][table]["chunks"].append(chunk)
+        elapsed = time.perf_counter() - started
+        rows = sum(c["rows"] for _, c in chunks)
+        size = sum(c["bytes"] for _, c in chunks)
+        manifest["stats"] = {"rows": rows, "bytes": size, "seconds": round(elapsed, 3)}
+        (out_dir / MANIFEST).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+        return manifest
+
+    def _open_snapshots(self, coordinator: Database, global_lock: bool) -> list[Database]:
+        """Open the coordinator's snapshot, then as many worker snapshots of the same instant as possible.
+
+        Worker snapshots are only opened while no write can commit: under
+        ``FLUSH TABLES WITH READ LOCK`` on MySQL, and on SQLite (outside WAL
+        mode) while the coordinator's read lock blocks writers. Otherwise --
+        no ``global_lock``, no RELOAD privilege, or WAL -- the whole backup
+        is read from the coordinator's single snapshot.
+        """
+        if coordinator.is_mysql:
+            if not global_lock:
+                _open_snapshot(coordinator)
+                return [coordinator]
+            try:
+                coordinator.execute("FLUSH TABLES WITH READ LOCK")
+            except Exception:
+                _open_snapshot(coordinator)
+                return [coordinator]
+            connections = [coordinator]
+            try:
+                _open_snapshot(coordinator)
+                connections += [self.connect_db() for _ in range(self.workers - 1)]
+                for db in connections[1:]:
+                    _open_snapshot(db)
+            except BaseException:
+                for db in connections[1:]:
+                    db.close()
+                raise
+            finally:
+                coordinator.execute("UNLOCK TABLES")
+            return connections
+        _open_snapshot(coordinator)
+        if coordinator.scalar("PRAGMA journal_mode").lower() == "wal":
+            return [coordinator]
+        connections = [coordinator] + [self.connect_db() for _ in range(self.workers - 1)]
+        for db in connections[1:]:
+            _open_snapshot(db)
+        return connections
+
+    def _dump_chunk(
+        self, db: Database, out_dir: Path, table: str, columns: list[str], first: int, last: int
+    ) -> tuple[str, dict[str, Any]]:
+        name = f"{table}.{first:010d}-{last:010d}.jsonl.gz"
+        rows = 0
+        with open(out_dir / name, "wb") as raw:
+            writer = _HashingWriter(raw)
+            with gzip.GzipFile(fileobj=writer, mode="wb", compresslevel=6, mtime=0) as gz:
+                for batch in db.stream(
+                    f"SELECT {', '.join(columns)} FROM {table} WHERE id BETWEEN ? AND ? ORDER BY id", (first, last)
+                ):
+                    gz.write("".join(json.dumps(r, default=str) + "\n" for r in batch).encode())
+                    rows += len(batch)
+        chunk = {
+            "file": name,
+            "first_id": first,
+            "last_id": last,
+            "rows": rows,
+            "bytes": writer.bytes,
+            "sha256": writer.sha256.hexdigest(),
+        }
+        return table, chunk
+
+    # -- restore ---------------------------------------------------------------
+
+    def restore(self, backup_dir: Path) -> dict[str, Any]:
+        """Restore ``backup_dir``, applying its chain of base backups first."""
+        chain = []
+        current: Path | None = backup_dir
+        while current is not None:
+            manifest = json.loads((current / MANIFEST).read_text(encoding="utf-8"))
+            chain.append((current, manifest))
+            current = Path(manifest["base"]) if manifest["base"] else None
+        started = time.perf_counter()
+        connections = [self.connect_db()]
+        if connections[0].is_mysql:
+            connections += [self.connect_db() for _ in range(self.workers - 1)]
+        # else: SQLite has a single writer; extra connections would only queue on its lock.
+        rows = size = 0
+        try:
+            for db in connections:
+                self._load_mode(db, True)
+            # Per table, the newest backup holding it in full (chain runs newest first) and any newer ones.
+            start = {
+                table: min(i for i, (_, manifest) in enumerate(chain) if manifest["tables"][table]["min_id"] == 0)
+                for table in chain[-1][1]["tables"]
+            }
+            for i in reversed(range(len(chain))):
+                directory, manifest = chain[i]
+                tasks = [
+                    (directory, table, spec["columns"], chunk)
+                    for table, spec in manifest["tables"].items()
+                    if i <= start[table]
+                    for chunk in spec["chunks"]
+                ]
+                tasks.sort(key=lambda t: t[3]["bytes"], reverse=True)
+                for loaded, nbytes in _run_workers(connections, tasks, lambda db, task: self._load_chunk(db, *task)):
+                    rows += loaded
+                    size += nbytes
+            orphans = self._apply_deletes(connections[0], prune=len(chain) > 1)
+        finally:
+            for db in connections:
+                self._load_mode(db, False)
+                db.close()
+        if orphans:
+            raise ValueError("Orphaned rows after restore: " + ", ".join(f"{n} in {fk}" for fk, n in orphans.items()))
+        elapsed = time.perf_counter() - started
+        return {"backups": len(chain), "rows": rows, "bytes": size, "seconds": round(elapsed, 3)}
+
+    def _apply_deletes(self, db: Database, prune: bool) -> dict[str, int]:
+        """Re-apply ``ON DELETE`` to append-only rows whose parent is gone (with ``prune``); count remaining orphans."""
+        orphans = {}
+        with db.transaction():
+            for table, column, parent, action in FOREIGN_KEYS:
+                missing = f"{column} IS NOT NULL AND NOT EXISTS (SELECT 1 FROM {parent} WHERE {parent}.id = {table}.{column})"
+                if prune and table in APPEND_ONLY:
+                    if action == "SET NULL":
+                        db.execute(f"UPDATE {table} SET {column} = NULL WHERE {missing}")
+                    else:
+                        db.execute(f"DELETE FROM {table} WHERE {missing}")
+                n = int(db.scalar(f"SELECT COUNT(*) FROM {table} WHERE {missing}"))
+                if n:
+                    orphans[f"{table}.{column}"] = n
+        return orphans
+
+    def _load_mode(self, db: Database, loading: bool) -> None:
+        if db.is_mysql:
+            db.execute(f"SET FOREIGN_KEY_CHECKS = {0 if loading else 1}")
+            db.execute(f"SET UNIQUE_CHECKS = {0 if loading else 1}")
+            db.execute("SET @DISABLE_TRIGGERS = 1" if loading else "SET @DISABLE_TRIGGERS = NULL")
+        else:
+            db.commit()  # PRAGMA foreign_keys is ignored inside a transaction
+            db.execute(f"PRAGMA foreign_keys = {'OFF' if loading else 'ON'}")
+
+    def _load_chunk(
+        self, db: Database, directory: Path, table: str, columns: list[str], chunk: dict[str, Any]
+    ) -> tuple[int, int]:
+        path = directory / chunk["file"]
+        if _checksum(path) != chunk["sha256"]:
+            raise ValueError(f"Checksum mismatch for {path}")
+        insert = db.insert_ignore_sql(table, columns)
+        loaded = 0
+        with gzip.open(path, "rt", encoding="utf-8") as fh, db.transaction():
+            batch = []
+            for line in fh:
+                batch.append(json.loads(line))
+                if len(batch) >= 1000:
+                    loaded += db.executemany(insert, batch)
+                    batch = []
+            loaded += db.executemany(insert, batch)
+        if loaded != chunk["rows"]:
+            raise ValueError(f"{path}: expected {chunk['rows']} rows, read {loaded}")
+        return loaded, chunk["bytes"]
+
+
+def verify(backup_dir: Path) -> list[str]:
+    """Files whose checksum does not match the manifest (empty when the backup is intact)."""
+    manifest = json.loads((backup_dir / MANIFEST).read_text(encoding="utf-8"))
+    return [
+        chunk["file"]
+        for spec in manifest["tables"].values()
+        for chunk in spec["chunks"]
+        if not (backup_dir / chunk["file"]).exists() or _checksum(backup_dir / chunk["file"]) != chunk["sha256"]
+    ]
+
+
+def _report(label: str, stats: dict[str, Any]) -> None:
+    seconds = max(stats["seconds"], 1e-9)
+    print(
+        f"{label}: {stats['rows']} rows, {stats['bytes'] / 1e6:.2f} MB compressed in {seconds:.2f}s "
+        f"({stats['rows'] / seconds:,.0f} rows/s, {stats['bytes'] / 1e6 / seconds:.2f} MB/s)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parallel chunked backup and restore")
+    parser.add_argument("--db", help="Database URL (defaults to a seeded SQLite stand-in file)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    sub = parser.add_subparsers(dest="command", required=True)
+    dump = sub.add_parser("backup", help="Dump every table (with --base, append-only tables only since the base)")
+    dump.add_argument("out", type=Path)
+    dump.add_argument(
+        "--base",
+        type=Path,
+        help="Previous backup directory for an incremental backup (restorable only together with its base chain)",
+    )
+    dump.add_argument(
+        "--no-global-lock",
+        dest="global_lock",
+        action="store_false",
+        help="Skip FLUSH TABLES WITH READ LOCK (MySQL) and dump from a single snapshot",
+    )
+    load = sub.add_parser("restore", help="Load a backup and its base chain into an existing, empty schema")
+    load.add_argument("backup", type=Path)
+    check = sub.add_parser("verify", help="Check chunk files against the manifest checksums")
+    check.add_argument("backup", type=Path)
+    args = parser.parse_args()
+
+    if args.command == "verify":
+        bad = verify(args.backup)
+        print("\n".join(bad) if bad else "verify: OK")
+        return
+    url = args.db
+    if url is None:
+        path = Path(tempfile.gettempdir()) / "cookhub_standin.db"
+        if not path.exists():
+            sqlite_standin(str(path), seed=args.command == "backup").close()
+        url = f"sqlite:///{path}"
+    tool = BackupTool(lambda: connect(url), args.workers, args.chunk_rows)
+    if args.command == "backup":
+        manifest = tool.backup(args.out, args.base, args.global_lock)
+        _report(f"{manifest['kind']} backup", manifest["stats"])
+    else:
+        _report("restore", tool.restore(args.backup))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+from __future__ import annotations
+
+import argparse
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any
+
+from db import Database, connect, format_datetime, sqlite_standin, to_datetime
+
+# Additive per-bucket counters: metric -> (table, timestamp column, extra filter)
+EVENT_SOURCES: dict[str, tuple[str, str, str | None]] = {
+    "new_users": ("user", "joined_date", "role <> 'admin'"),
+    "new_contributors": ("user", "joined_date", "role = 'user' AND status <> 'pending'"),
+    "recipes_created": ("recipe", "created_at", None),
+    "recipe_views": ("recipe_view", "viewed_at", None),
+    "admin_actions": ("activity_log", "created_at", None),
+}
+# Tables whose rows mark a user as active at a point in time
+ACTIVE_SOURCES: tuple[tuple[str, str], ...] = (("session", "updated_at"), ("recipe_view", "viewed_at"))
+
+METRICS = tuple(EVENT_SOURCES) + ("active_users",)
+ROLLUP_COLUMNS = ("granularity", "bucket_start") + METRICS
+SNAPSHOT_COLUMNS = (
+    "total_users",
+    "new_users_today",
+    "total_contributors",
+    "new_contributors_today",
+    "published_recipes",
+    "pending_recipes",
+    "daily_views",
+    "daily_active_users",
+)
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS stat_rollup (
+        granularity      VARCHAR(5) NOT NULL,
+        bucket_start     DATETIME NOT NULL,
+        new_users        INT NOT NULL DEFAULT 0,
+        new_contributors INT NOT NULL DEFAULT 0,
+        recipes_created  INT NOT NULL DEFAULT 0,
+        recipe_views     INT NOT NULL DEFAULT 0,
+        admin_actions    INT NOT NULL DEFAULT 0,
+        active_users     INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (granularity, bucket_start)
+    )""",
+    # Distinct (day, user) pairs so daily and monthly active users can be
+    # recounted without rescanning session/recipe_view.
+    """CREATE TABLE IF NOT EXISTS stat_active_user (
+        bucket_day DATETIME NOT NULL,
+        user_id    INT NOT NULL,
+        PRIMARY KEY (bucket_day, user_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS stat_rollup_state (
+        name  VARCHAR(50) NOT NULL PRIMARY KEY,
+        value DATETIME NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS dashboard_snapshot (
+        id                     INT NOT NULL PRIMARY KEY,
+        total_users            INT NOT NULL DEFAULT 0,
+        new_users_today        INT NOT NULL DEFAULT 0,
+        total_contributors     INT NOT NULL DEFAULT 0,
+        new_contributors_today INT NOT NULL DEFAULT 0,
+        published_recipes      INT NOT NULL DEFAULT 0,
+        pending_recipes        INT NOT NULL DEFAULT 0,
+        daily_views            INT NOT NULL DEFAULT 0,
+        daily_active_users     INT NOT NULL DEFAULT 0,
+        computed_at            DATETIME NOT NULL
+    )""",
+)
+
+
+def floor_hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def floor_day(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def floor_month(ts: datetime) -> datetime:
+    return floor_day(ts).replace(day=1)
+
+
+def next_month(ts: datetime) -> datetime:
+    return (ts.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class DashboardRollup:
+    """Maintains hourly/daily/monthly buckets behind the admin dashboard.
+
+    Hourly buckets are computed from the source tables; daily and monthly
+    buckets are summed from the level below. A run rescans the hours from
+    ``rescan_hours`` before the stored watermark (the open hour of the
+    previous run) up to now, so rows that land late (e.g. buffered view
+    writes) are still counted.
+
+    The dashboard totals describe current state (deletes, approvals,
+    moderation), so they are recounted on every refresh with ``COUNT(*)``s
+    answered from ``idx_user_role_status`` and ``idx_recipe_status``.
+    """
+
+    def __init__(self, db: Database, chunk_hours: int = 24 * 7, rescan_hours: int = 24) -> None:
+        self.db = db
+        self.chunk_hours = chunk_hours
+        self.rescan_hours = rescan_hours
+
+    def ensure_schema(self) -> None:
+        with self.db.transaction():
+            for ddl in SCHEMA:
+                self.db.execute(ddl)
+
+    def _watermark(self) -> datetime | None:
+        return to_datetime(self.db.scalar("SELECT value FROM stat_rollup_state WHERE name = 'hourly'"))
+
+    def _earliest_event(self) -> datetime | None:
+        sources = {(t, c) for t, c, _ in EVENT_SOURCES.values()} | set(ACTIVE_SOURCES)
+        found = [to_datetime(self.db.scalar(f"SELECT MIN({c}) FROM {t}")) for t, c in sources]
+        found = [ts for ts in found if ts is not None]
+        return min(found) if found else None
+
+    def run(self, now: datetime | None = None) -> dict[str, Any]:
+        now = now or datetime.now()
+        self.ensure_schema()
+        watermark = self._watermark()
+        if watermark is not None:
+            start = watermark - timedelta(hours=self.rescan_hours)
+        else:
+            start = self._earliest_event() or now
+        start, end = floor_hour(start), floor_hour(now) + timedelta(hours=1)
+        while start < end:
+            chunk_end = min(start + timedelta(hours=self.chunk_hours), end)
+            with self.db.transaction():
+                self._process_hours(start, chunk_end)
+                # The last hour of the final chunk is still open; it is rescanned next run.
+                self.db.execute(
+                    self.db.upsert_sql("stat_rollup_state", ("name", "value"), ("name",)),
+                    ("hourly", format_datetime(min(chunk_end, floor_hour(now)))),
+                )
+            start = chunk_end
+        with self.db.transaction():
+            return self._refresh_snapshot(now)
+
+    def _process_hours(self, start: datetime, end: datetime) -> None:
+        db = self.db
+        params = (format_datetime(start), format_datetime(end))
+        hours: dict[datetime, dict[str, int]] = {}
+        h = start
+        while h < end:
+            hours.setdefault(h, dict.fromkeys(METRICS, 0))
+            h += timedelta(hours=1)
+
+        for metric, (table, column, where) in EVENT_SOURCES.items():
+            bucket = db.hour_bucket(column)
+            extra = f" AND {where}" if where else ""
+            for bucket_start, count in db.query(
+                f"SELECT {bucket}, COUNT(*) FROM {table} "
+                f"WHERE {column} >= ? AND {column} < ?{extra} GROUP BY {bucket}",
+                params,
+            ):
+                hours[to_datetime(bucket_start)][metric] = int(count)
+
+        active: dict[datetime, set[int]] = defaultdict(set)
+        for table, column in ACTIVE_SOURCES:
+            bucket = db.hour_bucket(column)
+            for bucket_start, user_id in db.query(
+                f"SELECT DISTINCT {bucket}, user_id FROM {table} WHERE {column} >= ? AND {column} < ?",
+                params,
+            ):
+                active[to_datetime(bucket_start)].add(int(user_id))
+        for h, users in active.items():
+            hours[h]["active_users"] = len(users)
+        db.executemany(
+            db.insert_ignore_sql("stat_active_user", ("bucket_day", "user_id")),
+            {(format_datetime(floor_day(h)), u) for h, users in active.items() for u in users},
+        )
+
+        upsert = db.upsert_sql("stat_rollup", ROLLUP_COLUMNS, ("granularity", "bucket_start"))
+        db.executemany(
+            upsert,
+            (("hour", format_datetime(h)) + tuple(v[m] for m in METRICS) for h, v in sorted(hours.items())),
+        )
+        days = sorted({floor_day(h) for h in hours})
+        self._rollup("day", "hour", days, lambda d: d + timedelta(days=1))
+        months = sorted({floor_month(d) for d in days})
+        self._rollup("month", "day", months, next_month)
+
+    def _rollup(self, granularity: str, child: str, buckets: list[datetime], step) -> None:
+        if not buckets:
+            return
+        db = self.db
+        lo, hi = format_datetime(buckets[0]), format_datetime(step(buckets[-1]))
+        sums: dict[datetime, dict[str, int]] = {b: dict.fromkeys(METRICS, 0) for b in buckets}
+        floor = floor_day if granularity == "day" else floor_month
+        additive = METRICS[:-1]
+        for row in db.query(
+            f"SELECT bucket_start, {', '.join(additive)} FROM stat_rollup "
+            "WHERE granularity = ? AND bucket_start >= ? AND bucket_start < ?",
+            (child, lo, hi),
+        ):
+            target = sums[floor(to_datetime(row[0]))]
+            for metric, value in zip(additive, row[1:]):
+                target[metric] += int(value)
+        for bucket in buckets:
+            sums[bucket]["active_users"] = int(
+                db.scalar(
+                    "SELECT COUNT(DISTINCT user_id) FROM stat_active_user WHERE bucket_day >= ? AND bucket_day < ?",
+                    (format_datetime(bucket), format_datetime(step(bucket))),
+                )
+                or 0
+            )
+        db.executemany(
+            db.upsert_sql("stat_rollup", ROLLUP_COLUMNS, ("granularity", "bucket_start")),
+            ((granularity, format_datetime(b)) + tuple(v[m] for m in METRICS) for b, v in sorted(sums.items())),
+        )
+
+    def _refresh_snapshot(self, now: datetime) -> dict[str, Any]:
+        db = self.db
+        total = {
+            name: int(db.scalar(sql) or 0)
+            for name, sql in (
+                ("users", "SELECT COUNT(*) FROM user WHERE role <> 'admin'"),
+                ("contributors", "SELECT COUNT(*) FROM user WHERE role = 'user' AND status <> 'pending'"),
+                ("published", "SELECT COUNT(*) FROM recipe WHERE status = 'published'"),
+                ("pending", "SELECT COUNT(*) FROM recipe WHERE status = 'pending'"),
+            )
+        }
+        today = read_buckets(db, "day", floor_day(now), floor_day(now))
+        bucket = today[0] if today else dict.fromkeys(METRICS, 0)
+        snapshot = {
+            "total_users": total["users"],
+            "new_users_today": bucket["new_users"],
+            "total_contributors": total["contributors"],
+            "new_contributors_today": bucket["new_contributors"],
+            "published_recipes": total["published"],
+            "pending_recipes": total["pending"],
+            "daily_views": bucket["recipe_views"],
+            "daily_active_users": bucket["active_users"],
+        }
+        columns = ("id",) + SNAPSHOT_COLUMNS + ("computed_at",)
+        db.execute(
+            db.upsert_sql("dashboard_snapshot", columns, ("id",)),
+            (1,) + tuple(snapshot.values()) + (format_datetime(now),),
+        )
+        return snapshot | {"computed_at": format_datetime(now)}
+
+
+def read_dashboard(db: Database) -> dict[str, Any] | None:
+    """Single primary-key read backing the admin dashboard cards."""
+    columns = SNAPSHOT_COLUMNS + ("computed_at",)
+    row = db.execute(f"SELECT {', '.join(columns)} FROM dashboard_snapshot WHERE id = 1").fetchone()
+    return dict(zip(columns, row)) if row else None
+
+
+def read_buckets(db: Database, granularity: str, start: datetime, end: datetime) -> list[dict[str, Any]]:
+    """Buckets of one granularity with ``start <= bucket_start <= end`` (chart series)."""
+    rows = db.query(
+        f"SELECT bucket_start, {', '.join(METRICS)} FROM stat_rollup "
+        "WHERE granularity = ? AND bucket_start >= ? AND bucket_start <= ? ORDER BY bucket_start",
+        (granularity, format_datetime(start), format_datetime(end)),
+    )
+    return [{"bucket_start": format_datetime(to_datetime(r[0]))} | dict(zip(METRICS, map(int, r[1:]))) for r in rows]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain time-bucketed dashboard rollups")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--chunk-hours", type=int, default=24 * 7, help="Hours per backfill transaction")
+    parser.add_argument("--rescan-hours", type=int, default=24, help="Closed hours recounted each run for late rows")
+    args = parser.parse_args()
+
+    db = connect(args.db) if args.db else sqlite_standin()
+    DashboardRollup(db, args.chunk_hours, args.rescan_hours).run()
+    print(json.dumps(read_dashboard(db), indent=2, default=str))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
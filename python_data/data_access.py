@@ -0,0 +1,731 @@
+from __future__ import annotations
+
+import argparse
+import functools
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Iterator, Sequence
+
+from db import Database, connect, format_datetime, sqlite_standin, to_datetime
+
+PAGE_SIZE = 20
+MAX_SEARCH_HISTORY = 10  # per user, as in storage.addSearchHistory
+MAX_IN_PARAMS = 500
+BCRYPT_ROUNDS = 12
+
+RECIPE_COLUMNS = (
+    "id, title, description, category, difficulty, prep_time, cook_time, servings, "
+    "author_id, status, created_at, updated_at"
+)
+USER_COLUMNS = (
+    "id, username, first_name, last_name, email, birthday, role, status, joined_date, "
+    "last_active, avatar_url, bio, location, cooking_level"
+)
+REVIEW_COLUMNS = "id, recipe_id, user_id, rating, comment, created_at"
+ACTIVITY_COLUMNS = "id, admin_id, action_type, target_type, target_id, description, created_at"
+
+# storage.js field -> column, for the writable fields of saveUser/saveRecipe
+USER_FIELDS = {
+    "username": "username",
+    "firstName": "first_name",
+    "lastName": "last_name",
+    "email": "email",
+    "birthday": "birthday",
+    "role": "role",
+    "status": "status",
+    "lastActive": "last_active",
+    "avatar": "avatar_url",
+    "bio": "bio",
+    "location": "location",
+    "cookingLevel": "cooking_level",
+}
+RECIPE_FIELDS = {
+    "title": "title",
+    "description": "description",
+    "category": "category",
+    "difficulty": "difficulty",
+    "prepTime": "prep_time",
+    "cookTime": "cook_time",
+    "servings": "servings",
+    "authorId": "author_id",
+    "status": "status",
+}
+
+
+def hash_password(password: str, rounds: int = BCRYPT_ROUNDS) -> str:
+    try:
+        import bcrypt
+    except ImportError as exc:
+        raise RuntimeError("bcrypt is required to hash passwords") from exc
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+
+def needs_rehash(hashed: str, rounds: int = BCRYPT_ROUNDS) -> bool:
+    """True for a bcrypt hash (``$2b$<cost>$...``) made with fewer than ``rounds`` rounds."""
+    parts = hashed.split("$")
+    return len(parts) > 2 and parts[2].isdigit() and int(parts[2]) < rounds
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    try:
+        import bcrypt
+    except ImportError as exc:
+        raise RuntimeError("bcrypt is required to verify passwords") from exc
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+
+def _iso(value: Any) -> str | None:
+    ts = to_datetime(value)
+    return ts.isoformat() if ts is not None else None
+
+
+def _marks(values: Sequence[Any]) -> str:
+    return ", ".join("?" for _ in values)
+
+
+def _chunks(values: Sequence[Any], size: int = MAX_IN_PARAMS) -> Iterator[Sequence[Any]]:
+    for i in range(0, len(values), size):
+        yield values[i : i + size]
+
+
+class ConnectionPool:
+    """Fixed-size pool of ``Database`` connections.
+
+    Connections are created lazily up to ``size``; callers block for up to
+    ``timeout`` seconds once all of them are checked out. Every connection is
+    rolled back on release so a pooled InnoDB connection never carries an
+    open read snapshot into the next call.
+    """
+
+    def __init__(self, factory: Callable[[], Database], size: int = 4, timeout: float = 10.0) -> None:
+        self._factory = factory
+        self.size = size
+        self.timeout = timeout
+        self._idle: queue.LifoQueue[Database] = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_url(cls, url: str, size: int = 4) -> "ConnectionPool":
+        return cls(lambda: connect(url), size)
+
+    @contextmanager
+    def connection(self) -> Iterator[Database]:
+        db = self._checkout()
+        try:
+            yield db
+        finally:
+            db.rollback()
+            self._idle.put(db)
+
+    def _checkout(self) -> Database:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._factory()
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No database connection available after {self.timeout}s") from None
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class _TrackedDatabase(Database):
+    """Counts the statements one DAL call sends through a pooled connection."""
+
+    def __init__(self, inner: Database) -> None:
+        super().__init__(inner.conn, inner.dialect)
+        self.queries = 0
+
+    def execute(self, statement: str, params: Sequence[Any] = ()) -> Any:
+        self.queries += 1
+        return super().execute(statement, params)
+
+    def executemany(self, statement: str, rows) -> int:
+        self.queries += 1
+        return super().executemany(statement, rows)
+
+
+@dataclass
+class OperationStats:
+    calls: int = 0
+    queries: int = 0
+    seconds: float = 0.0
+    last_queries: int = 0
+    last_ms: float = 0.0
+
+
+def _operation(method):
+    """Run a DAL method on a pooled connection and record its query count and time."""
+
+    @functools.wraps(method)
+    def wrapper(self: "StorageDAL", *args, **kwargs):
+        with self.pool.connection() as conn:
+            db = _TrackedDatabase(conn)
+            started = time.perf_counter()
+            try:
+                return method(self, db, *args, **kwargs)
+            finally:
+                self._record(method.__name__, db.queries, time.perf_counter() - started)
+
+    return wrapper
+
+
+class StorageDAL:
+    """MySQL-backed counterpart of the ``storage`` object in ``src/lib/storage.js``.
+
+    Methods keep the storage.js names in snake_case and return the same
+    camelCase shapes. Recipe lists are assembled per page with one
+    ``WHERE recipe_id IN (...)`` query per child table, so a page costs the
+    same handful of queries whatever its size, and ``get_recipe_page`` pages
+    by keyset on ``(created_at, id)`` (``idx_recipe_created_at``). Per-call
+    query counts and timings accumulate in ``stats``.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        verify: Callable[[str, str], bool] = verify_password,
+        hasher: Callable[[str], str] = hash_password,
+    ) -> None:
+        self.pool = pool
+        self.verify = verify
+        self.hasher = hasher
+        self.stats: dict[str, OperationStats] = defaultdict(OperationStats)
+        self._stats_lock = threading.Lock()
+
+    def _record(self, op: str, queries: int, seconds: float) -> None:
+        with self._stats_lock:
+            entry = self.stats[op]
+            entry.calls += 1
+            entry.queries += queries
+            entry.seconds += seconds
+            entry.last_queries = queries
+            entry.last_ms = seconds * 1000
+
+    # -- users -------------------------------------------------------------
+
+    def _user_dicts(self, db: Database, rows: list[tuple]) -> list[dict[str, Any]]:
+        favorites: dict[int, list[int]] = defaultdict(list)
+        ids = [r[0] for r in rows]
+        for chunk in _chunks(ids):
+            for user_id, recipe_id in db.query(
+                f"SELECT user_id, recipe_id FROM favorite WHERE user_id IN ({_marks(chunk)}) ORDER BY id", chunk
+            ):
+                favorites[user_id].append(recipe_id)
+        users = []
+        for r in rows:
+            users.append(
+                {
+                    "id": r[0],
+                    "username": r[1],
+                    "firstName": r[2],
+                    "lastName": r[3],
+                    "email": r[4],
+                    "birthday": str(r[5]) if r[5] is not None else None,
+                    "role": r[6],
+                    "status": r[7],
+                    "joinedDate": _iso(r[8]),
+                    "lastActive": _iso(r[9]),
+                    "avatar": r[10],
+                    "bio": r[11],
+                    "location": r[12],
+                    "cookingLevel": r[13],
+                    "favorites": favorites.get(r[0], []),
+                }
+            )
+        return users
+
+    @_operation
+    def get_users(self, db: Database) -> list[dict[str, Any]]:
+        return self._user_dicts(db, db.query(f"SELECT {USER_COLUMNS} FROM user ORDER BY id"))
+
+    @_operation
+    def save_user(self, db: Database, user: dict[str, Any]) -> int:
+        """Insert or update a user; ``favorites``, when given, replaces the user's favorites.
+
+        ``password`` is hashed with ``hasher``; it is required for a new user
+        (``password_hash`` is NOT NULL) and optional on update.
+        """
+        values = {col: user[field] for field, col in USER_FIELDS.items() if field in user}
+        if "lastActive" in user and user["lastActive"]:
+            values["last_active"] = format_datetime(to_datetime(user["lastActive"]))
+        if user.get("password"):
+            values["password_hash"] = self.hasher(user["password"])
+        with db.transaction():
+            user_id = user.get("id")
+            if user_id is not None and db.scalar("SELECT 1 FROM user WHERE id = ?", (user_id,)):
+                if values:
+                    sets = ", ".join(f"{c} = ?" for c in values)
+                    db.execute(f"UPDATE user SET {sets} WHERE id = ?", (*values.values(), user_id))
+            else:
+                if "password_hash" not in values:
+                    raise ValueError("A new user needs a password")
+                cur = db.execute(
+                    f"INSERT INTO user ({', '.join(values)}) VALUES ({_marks(values)})", tuple(values.values())
+                )
+                user_id = cur.lastrowid
+            if "favorites" in user:
+                wanted = [int(r) for r in user["favorites"]]
+                if wanted:
+                    db.execute(
+                        f"DELETE FROM favorite WHERE user_id = ? AND recipe_id NOT IN ({_marks(wanted)})",
+                        (user_id, *wanted),
+                    )
+                else:
+                    db.execute("DELETE FROM favorite WHERE user_id = ?", (user_id,))
+                db.executemany(
+                    db.insert_ignore_sql("favorite", ("user_id", "recipe_id")), ((user_id, r) for r in wanted)
+                )
+        return int(user_id)
+
+    @_operation
+    def delete_user(self, db: Database, user_id: int) -> None:
+        with db.transaction():
+            db.execute("DELETE FROM user WHERE id = ?", (user_id,))
+
+    @_operation
+    def login(self, db: Database, email: str, password: str) -> dict[str, Any]:
+        row = db.execute(f"SELECT {USER_COLUMNS}, password_hash FROM user WHERE email = ?", (email,)).fetchone()
+        if row is None or not self.verify(password, row[-1]):
+            raise ValueError("Invalid credentials")
+        with db.transaction():
+            self._mark_active(db, row[0], row[9])
+            # Only toggle active/inactive users; keep pending/suspended users as-is
+            db.execute("UPDATE user SET status = 'active' WHERE id = ? AND status = 'inactive'", (row[0],))
+            if needs_rehash(row[-1]):
+                # Migrated accounts are hashed at a lower cost (migrate_localstorage.MIGRATION_ROUNDS).
+                db.execute("UPDATE user SET password_hash = ? WHERE id = ?", (self.hasher(password), row[0]))
+        return self._user_dicts(db, db.query(f"SELECT {USER_COLUMNS} FROM user WHERE id = ?", (row[0],)))[0]
+
+    # -- recipes -----------------------------------------------------------
+
+    def _assemble(self, db: Database, rows: list[tuple]) -> list[dict[str, Any]]:
+        """Attach children to a page of recipe rows with one IN query per child table."""
+        ids = [r[0] for r in rows]
+        children: dict[str, dict[int, list]] = defaultdict(lambda: defaultdict(list))
+        for chunk in _chunks(ids):
+            marks = _marks(chunk)
+            for recipe_id, name, quantity, unit in db.query(
+                f"SELECT recipe_id, name, quantity, unit FROM ingredient "
+                f"WHERE recipe_id IN ({marks}) ORDER BY recipe_id, sort_order, id",
+                chunk,
+            ):
+                children["ingredients"][recipe_id].append({"name": name, "quantity": quantity, "unit": unit})
+            for recipe_id, text in db.query(
+                f"SELECT recipe_id, instruction_text FROM instruction "
+                f"WHERE recipe_id IN ({marks}) ORDER BY recipe_id, step_number",
+                chunk,
+            ):
+                children["instructions"][recipe_id].append(text)
+            for recipe_id, url in db.query(
+                f"SELECT recipe_id, image_url FROM recipe_image "
+                f"WHERE recipe_id IN ({marks}) ORDER BY recipe_id, display_order, id",
+                chunk,
+            ):
+                children["images"][recipe_id].append(url)
+            for recipe_id, user_id in db.query(
+                f"SELECT recipe_id, user_id FROM like_record WHERE recipe_id IN ({marks}) ORDER BY id", chunk
+            ):
+                children["likedBy"][recipe_id].append(user_id)
+            for recipe_id, user_id in db.query(
+                f"SELECT DISTINCT recipe_id, user_id FROM recipe_view WHERE recipe_id IN ({marks})", chunk
+            ):
+                children["viewedBy"][recipe_id].append(user_id)
+        recipes = []
+        for r in rows:
+            recipe = {
+                "id": r[0],
+                "title": r[1],
+                "description": r[2],
+                "category": r[3],
+                "difficulty": r[4],
+                "prepTime": r[5],
+                "cookTime": r[6],
+                "servings": r[7],
+                "authorId": r[8],
+                "status": r[9],
+                "createdAt": _iso(r[10]),
+                "updatedAt": _iso(r[11]),
+            }
+            for key in ("ingredients", "instructions", "images", "likedBy", "viewedBy"):
+                recipe[key] = children[key].get(r[0], [])
+            recipes.append(recipe)
+        return recipes
+
+    def _page(
+        self, db: Database, limit: int, cursor: str | None, status: str | None
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        where, params = [], []
+        if status:
+            where.append("status = ?")
+            params.append(status)
+        if cursor:
+            created, _, last_id = cursor.rpartition("|")
+            created = format_datetime(to_datetime(created))
+            where.append("(created_at < ? OR (created_at = ? AND id < ?))")
+            params += [created, created, int(last_id)]
+        clause = f"WHERE {' AND '.join(where)} " if where else ""
+        rows = db.query(
+            f"SELECT {RECIPE_COLUMNS} FROM recipe {clause}ORDER BY created_at DESC, id DESC LIMIT ?",
+            (*params, limit),
+        )
+        following = f"{_iso(rows[-1][10])}|{rows[-1][0]}" if len(rows) == limit else None
+        return self._assemble(db, rows), following
+
+    @_operation
+    def get_recipe_page(
+        self, db: Database, limit: int = PAGE_SIZE, cursor: str | None = None, status: str | None = None
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        """One page, newest first, plus the cursor for the next page (None on the last)."""
+        return self._page(db, limit, cursor, status)
+
+    @_operation
+    def get_recipes(self, db: Database, status: str | None = None) -> list[dict[str, Any]]:
+        recipes, cursor = [], None
+        while True:
+            page, cursor = self._page(db, MAX_IN_PARAMS, cursor, status)
+            recipes += page
+            if cursor is None:
+                return recipes
+
+    @_operation
+    def get_recipe_by_id(self, db: Database, recipe_id: int) -> dict[str, Any] | None:
+        rows = db.query(f"SELECT {RECIPE_COLUMNS} FROM recipe WHERE id = ?", (recipe_id,))
+        return self._assemble(db, rows)[0] if rows else None
+
+    @_operation
+    def save_recipe(self, db: Database, recipe: dict[str, Any]) -> int:
+        """Insert or update a recipe; ingredient/instruction/image lists, when given, replace the stored ones."""
+        values = {col: recipe[field] for field, col in RECIPE_FIELDS.items() if field in recipe}
+        with db.transaction():
+            recipe_id = recipe.get("id")
+            if recipe_id is not None and db.scalar("SELECT 1 FROM recipe WHERE id = ?", (recipe_id,)):
+                if values:
+                    sets = ", ".join(f"{c} = ?" for c in values)
+                    db.execute(f"UPDATE recipe SET {sets} WHERE id = ?", (*values.values(), recipe_id))
+            else:
+                cur = db.execute(
+                    f"INSERT INTO recipe ({', '.join(values)}) VALUES ({_marks(values)})", tuple(values.values())
+                )
+                recipe_id = cur.lastrowid
+            if "ingredients" in recipe:
+                db.execute("DELETE FROM ingredient WHERE recipe_id = ?", (recipe_id,))
+                db.executemany(
+                    "INSERT INTO ingredient (recipe_id, name, quantity, unit, sort_order) VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (recipe_id, i["name"], i.get("quantity"), i.get("unit"), n)
+                        for n, i in enumerate(recipe["ingredients"], start=1)
+                    ),
+                )
+            if "instructions" in recipe:
+                db.execute("DELETE FROM instruction WHERE recipe_id = ?", (recipe_id,))
+                db.executemany(
+                    "INSERT INTO instruction (recipe_id, step_number, instruction_text) VALUES (?, ?, ?)",
+                    ((recipe_id, n, text) for n, text in enumerate(recipe["instructions"], start=1)),
+                )
+            if "images" in recipe:
+                db.execute("DELETE FROM recipe_image WHERE recipe_id = ?", (recipe_id,))
+                db.executemany(
+                    "INSERT INTO recipe_image (recipe_id, image_url, display_order) VALUES (?, ?, ?)",
+                    ((recipe_id, url, n) for n, url in enumerate(recipe["images"], start=1)),
+                )
+        return int(recipe_id)
+
+    @_operation
+    def delete_recipe(self, db: Database, recipe_id: int) -> None:
+        # Reviews, favorites, likes, views and child rows go with it via ON DELETE CASCADE.
+        with db.transaction():
+            db.execute("DELETE FROM recipe WHERE id = ?", (recipe_id,))
+
+    # -- reviews -----------------------------------------------------------
+
+    @_operation
+    def get_reviews(self, db: Database, recipe_id: int | None = None) -> list[dict[str, Any]]:
+        if recipe_id is None:
+            rows = db.query(f"SELECT {REVIEW_COLUMNS} FROM review ORDER BY id")
+        else:
+            rows = db.query(f"SELECT {REVIEW_COLUMNS} FROM review WHERE recipe_id = ? ORDER BY id", (recipe_id,))
+        return [
+            {"id": r[0], "recipeId": r[1], "userId": r[2], "rating": r[3], "comment": r[4], "createdAt": _iso(r[5])}
+            for r in rows
+        ]
+
+    @_operation
+    def get_average_rating(self, db: Database, recipe_id: int) -> float:
+        return float(db.scalar("SELECT AVG(rating) FROM review WHERE recipe_id = ?", (recipe_id,)) or 0)
+
+    @_operation
+    def add_review(self, db: Database, review: dict[str, Any]) -> None:
+        """One review per user and recipe (``uk_user_recipe_review``); a second one replaces the first."""
+        columns = ("user_id", "recipe_id", "rating", "comment", "created_at")
+        with db.transaction():
+            db.execute(
+                db.upsert_sql("review", columns, ("user_id", "recipe_id")),
+                (
+                    review["userId"],
+                    review["recipeId"],
+                    review["rating"],
+                    review.get("comment"),
+                    format_datetime(datetime.now()),
+                ),
+            )
+
+    @_operation
+    def delete_review(self, db: Database, review_id: int) -> None:
+        with db.transaction():
+            db.execute("DELETE FROM review WHERE id = ?", (review_id,))
+
+    # -- search history ----------------------------------------------------
+
+    @_operation
+    def get_search_history(self, db: Database, user_id: int | None = None) -> list[dict[str, Any]]:
+        if user_id is None:
+            rows = db.query("SELECT id, user_id, query, searched_at FROM search_history ORDER BY searched_at DESC, id DESC")
+        else:
+            rows = db.query(
+                "SELECT id, user_id, query, searched_at FROM search_history "
+                "WHERE user_id = ? ORDER BY searched_at DESC, id DESC",
+                (user_id,),
+            )
+        return [{"id": r[0], "userId": r[1], "query": r[2], "createdAt": _iso(r[3])} for r in rows]
+
+    @_operation
+    def clear_search_history(self, db: Database, user_id: int) -> int:
+        with db.transaction():
+            return db.execute("DELETE FROM search_history WHERE user_id = ?", (user_id,)).rowcount
+
+    @_operation
+    def add_search_history(self, db: Database, user_id: int, query: str) -> dict[str, Any] | None:
+        """Record a search, dropping older copies of the same query and keeping the newest ten per user."""
+        query = (query or "").strip()
+        if not query:
+            return None
+        now = format_datetime(datetime.now())
+        with db.transaction():
+            db.execute("DELETE FROM search_history WHERE user_id = ? AND query = ?", (user_id, query))
+            record_id = db.execute(
+                "INSERT INTO search_history (user_id, query, searched_at) VALUES (?, ?, ?)", (user_id, query, now)
+            ).lastrowid
+            stale = [
+                r[0]
+                for r in db.query(
+                    "SELECT id FROM search_history WHERE user_id = ? ORDER BY searched_at DESC, id DESC LIMIT 1000 OFFSET ?",
+                    (user_id, MAX_SEARCH_HISTORY),
+                )
+            ]
+            if stale:
+                db.execute(f"DELETE FROM search_history WHERE id IN ({_marks(stale)})", stale)
+        return {"id": record_id, "userId": user_id, "query": query, "createdAt": _iso(now)}
+
+    # -- likes, favorites, views -------------------------------------------
+
+    @_operation
+    def toggle_favorite(self, db: Database, user_id: int, recipe_id: int) -> bool:
+        with db.transaction():
+            if db.execute("DELETE FROM favorite WHERE user_id = ? AND recipe_id = ?", (user_id, recipe_id)).rowcount:
+                return False
+            db.execute("INSERT INTO favorite (user_id, recipe_id) VALUES (?, ?)", (user_id, recipe_id))
+            return True
+
+    @_operation
+    def toggle_like(self, db: Database, user_id: int, recipe_id: int) -> dict[str, Any]:
+        with db.transaction():
+            removed = db.execute(
+                "DELETE FROM like_record WHERE user_id = ? AND recipe_id = ?", (user_id, recipe_id)
+            ).rowcount
+            if not removed:
+                db.execute("INSERT INTO like_record (user_id, recipe_id) VALUES (?, ?)", (user_id, recipe_id))
+            count = int(db.scalar("SELECT COUNT(*) FROM like_record WHERE recipe_id = ?", (recipe_id,)))
+        return {"liked": not removed, "count": count}
+
+    @_operation
+    def get_like_count(self, db: Database, recipe_id: int) -> int:
+        return int(db.scalar("SELECT COUNT(*) FROM like_record WHERE recipe_id = ?", (recipe_id,)))
+
+    @_operation
+    def has_user_liked(self, db: Database, user_id: int, recipe_id: int) -> bool:
+        return db.scalar("SELECT 1 FROM like_record WHERE user_id = ? AND recipe_id = ?", (user_id, recipe_id)) is not None
+
+    @_operation
+    def has_user_favorited(self, db: Database, user_id: int, recipe_id: int) -> bool:
+        return db.scalar("SELECT 1 FROM favorite WHERE user_id = ? AND recipe_id = ?", (user_id, recipe_id)) is not None
+
+    @_operation
+    def record_view(self, db: Database, viewer_id: int | str, recipe_id: int, viewer_type: str = "user") -> int:
+        """Count one view per viewer, recipe and day; returns the recipe's distinct viewer count.
+
+        ``recipe_view.user_id`` is NOT NULL, so guest views are not stored here;
+        high-volume and guest traffic goes through ``view_ingest.ViewIngestor``.
+        """
+        if viewer_type != "guest" and viewer_id:
+            today = format_datetime(datetime.combine(date.today(), datetime.min.time()))
+            with db.transaction():
+                seen = db.scalar(
+                    "SELECT 1 FROM recipe_view WHERE user_id = ? AND recipe_id = ? AND viewed_at >= ?",
+                    (viewer_id, recipe_id, today),
+                )
+                if seen is None:
+                    db.execute("INSERT INTO recipe_view (recipe_id, user_id) VALUES (?, ?)", (recipe_id, viewer_id))
+                    self._emulate_stat_trigger(db, ("page_view_count", "recipe_view_count"))
+        return self._view_count(db, recipe_id)
+
+    def _view_count(self, db: Database, recipe_id: int) -> int:
+        return int(db.scalar("SELECT COUNT(DISTINCT user_id) FROM recipe_view WHERE recipe_id = ?", (recipe_id,)))
+
+    @_operation
+    def get_view_count(self, db: Database, recipe_id: int) -> int:
+        return self._view_count(db, recipe_id)
+
+    # -- daily stats and activity ------------------------------------------
+
+    def _emulate_stat_trigger(self, db: Database, columns: tuple[str, ...]) -> None:
+        # 13_triggers.sql maintains these counters in MySQL; the stand-in has no triggers.
+        if db.is_mysql:
+            return
+        cols = ("stat_date",) + columns
+        db.execute(
+            db.upsert_sql("daily_stat", cols, ("stat_date",), increment=columns),
+            (date.today().isoformat(),) + (1,) * len(columns),
+        )
+
+    def _mark_active(self, db: Database, user_id: int, last_active: Any) -> None:
+        last = to_datetime(last_active)
+        if last is None or last.date() != date.today():
+            db.execute(
+                db.upsert_sql("daily_stat", ("stat_date", "active_user_count"), ("stat_date",), ("active_user_count",)),
+                (date.today().isoformat(), 1),
+            )
+        db.execute("UPDATE user SET last_active = ? WHERE id = ?", (format_datetime(datetime.now()), user_id))
+
+    @_operation
+    def get_daily_stats(self, db: Database) -> dict[str, dict[str, int]]:
+        return {
+            str(r[0]): {"pageViews": r[1], "activeUsers": r[2], "newUsers": r[3], "recipeViews": r[4]}
+            for r in db.query(
+                "SELECT stat_date, page_view_count, active_user_count, new_user_count, recipe_view_count "
+                "FROM daily_stat ORDER BY stat_date"
+            )
+        }
+
+    @_operation
+    def record_new_user(self, db: Database, user_id: int, role: str = "user") -> None:
+        """Counted by ``trg_User_NewUserStat`` on insert; only the stand-in needs the explicit increment."""
+        with db.transaction():
+            self._emulate_stat_trigger(db, ("new_user_count",))
+
+    @_operation
+    def record_active_user(self, db: Database, user_id: int) -> None:
+        with db.transaction():
+            self._mark_active(db, user_id, db.scalar("SELECT last_active FROM user WHERE id = ?", (user_id,)))
+
+    def _today(self) -> str:
+        return format_datetime(datetime.combine(date.today(), datetime.min.time()))
+
+    @_operation
+    def get_new_users_today(self, db: Database) -> list[dict[str, Any]]:
+        rows = db.query(f"SELECT {USER_COLUMNS} FROM user WHERE joined_date >= ? ORDER BY id", (self._today(),))
+        return self._user_dicts(db, rows)
+
+    @_operation
+    def get_new_contributors_today(self, db: Database) -> list[dict[str, Any]]:
+        rows = db.query(
+            f"SELECT {USER_COLUMNS} FROM user WHERE role = 'user' AND joined_date >= ? ORDER BY id", (self._today(),)
+        )
+        return self._user_dicts(db, rows)
+
+    @_operation
+    def get_daily_active_users(self, db: Database) -> list[dict[str, Any]]:
+        rows = db.query(f"SELECT {USER_COLUMNS} FROM user WHERE last_active >= ? ORDER BY id", (self._today(),))
+        return self._user_dicts(db, rows)
+
+    @_operation
+    def get_daily_views(self, db: Database) -> int:
+        return int(db.scalar("SELECT COUNT(*) FROM recipe_view WHERE viewed_at >= ?", (self._today(),)))
+
+    @_operation
+    def add_activity(self, db: Database, activity: dict[str, Any]) -> dict[str, Any]:
+        now = format_datetime(datetime.now())
+        with db.transaction():
+            activity_id = db.execute(
+                "INSERT INTO activity_log (admin_id, action_type, target_type, target_id, description, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    activity.get("adminId"),
+                    activity["actionType"],
+                    activity.get("targetType"),
+                    activity.get("targetId"),
+                    activity.get("description"),
+                    now,
+                ),
+            ).lastrowid
+        return {"id": activity_id, "time": _iso(now)} | activity
+
+    @_operation
+    def get_recent_activity(self, db: Database, limit: int = 5) -> list[dict[str, Any]]:
+        rows = db.query(
+            f"SELECT {ACTIVITY_COLUMNS} FROM activity_log ORDER BY created_at DESC, id DESC LIMIT ?", (max(1, limit),)
+        )
+        return [
+            {
+                "id": r[0],
+                "adminId": r[1],
+                "actionType": r[2],
+                "targetType": r[3],
+                "targetId": r[4],
+                "description": r[5],
+                "time": _iso(r[6]),
+            }
+            for r in rows
+        ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Exercise the Python storage DAL and print per-call query stats")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    args = parser.parse_args()
+
+    if args.db:
+        pool = ConnectionPool.from_url(args.db, args.pool_size)
+    else:
+        standin = sqlite_standin()
+        pool = ConnectionPool(lambda: standin, size=1)
+    dal = StorageDAL(pool)
+    cursor, pages = None, 0
+    while True:
+        page, cursor = dal.get_recipe_page(args.page_size, cursor, "published")
+        pages += 1
+        if cursor is None:
+            break
+    for recipe in dal.get_recipes()[:3]:
+        dal.get_recipe_by_id(recipe["id"])
+        dal.get_average_rating(recipe["id"])
+        dal.get_reviews(recipe["id"])
+    dal.get_users()
+    dal.get_daily_stats()
+    dal.get_recent_activity()
+    print(f"{'operation':<22}{'calls':>6}{'queries':>9}{'avg ms':>9}")
+    for op, entry in sorted(dal.stats.items()):
+        print(f"{op:<22}{entry.calls:>6}{entry.queries:>9}{entry.seconds * 1000 / entry.calls:>9.2f}")
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
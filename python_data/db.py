@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from contextlib import contextmanager
+from functools import lru_cache
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Sequence
+from urllib.parse import unquote, urlparse
+
+DATABASE_DIR = Path(__file__).resolve().parent.parent / "database"
+SCHEMA_SCRIPTS = ("02_create_tables.sql", "03_create_indexes.sql")
+SEED_SCRIPTS = (
+    "05_seed_users.sql",
+    "06_seed_recipes.sql",
+    "07_seed_reviews.sql",
+    "08_seed_stats.sql",
+)
+
+
+class Database:
+    """Thin DB-API wrapper shared by the cookhub data services.
+
+    Statements are written once with ``?`` placeholders and rewritten to the
+    ``%s`` paramstyle when the connection is a MySQL/MariaDB driver, so the same
+    code runs against production and the SQLite stand-in from ``sqlite_standin``.
+    """
+
+    def __init__(self, conn: Any, dialect: str) -> None:
+        if dialect not in ("mysql", "sqlite"):
+            raise ValueError(f"Unsupported dialect: {dialect}")
+        self.conn = conn
+        self.dialect = dialect
+
+    @property
+    def is_mysql(self) -> bool:
+        return self.dialect == "mysql"
+
+    def sql(self, statement: str) -> str:
+        if self.is_mysql:
+            return _pyformat(statement)
+        return statement
+
+    def execute(self, statement: str, params: Sequence[Any] = ()) -> Any:
+        cur = self.conn.cursor()
+        cur.execute(self.sql(statement), tuple(params))
+        return cur
+
+    def executemany(self, statement: str, rows: Iterable[Sequence[Any]]) -> int:
+        rows = [tuple(r) for r in rows]
+        if not rows:
+            return 0
+        cur = self.conn.cursor()
+        cur.executemany(self.sql(statement), rows)
+        return len(rows)
+
+    def query(self, statement: str, params: Sequence[Any] = ()) -> list[tuple]:
+        return list(self.execute(statement, params).fetchall())
+
+    def scalar(self, statement: str, params: Sequence[Any] = ()) -> Any:
+        row = self.execute(statement, params).fetchone()
+        return row[0] if row else None
+
+    def stream(
+        self, statement: str, params: Sequence[Any] = (), chunk_size: int = 5000
+    ) -> Iterator[list[tuple]]:
+        cur = self.execute(statement, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield list(rows)
+
+    def hour_bucket(self, column: str) -> str:
+        """SQL expression truncating ``column`` to the start of its hour."""
+        if self.is_mysql:
+            return f"DATE_FORMAT({column}, '%Y-%m-%d %H:00:00')"
+        return f"strftime('%Y-%m-%d %H:00:00', {column})"
+
+    def upsert_sql(
+        self, table: str, columns: Sequence[str], keys: Sequence[str], increment: Sequence[str] = ()
+    ) -> str:
+        """INSERT that overwrites (or, for ``increment`` columns, adds to) an existing row."""
+        marks = ", ".join("?" for _ in columns)
+        head = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({marks})"
+        updates = [c for c in columns if c not in keys]
+        if self.is_mysql:
+            sets = [f"{c} = {c} + VALUES({c})" if c in increment else f"{c} = VALUES({c})" for c in updates]
+            return f"{head} ON DUPLICATE KEY UPDATE {', '.join(sets)}"
+        sets = [f"{c} = {c} + excluded.{c}" if c in increment else f"{c} = excluded.{c}" for c in updates]
+        return f"{head} ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {', '.join(sets)}"
+
+    def insert_ignore_sql(self, table: str, columns: Sequence[str]) -> str:
+        marks = ", ".join("?" for _ in columns)
+        verb = "INSERT IGNORE" if self.is_mysql else "INSERT OR IGNORE"
+        return f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({marks})"
+
+    def table_exists(self, table: str) -> bool:
+        if self.is_mysql:
+            found = self.scalar(
+                "SELECT COUNT(*) FROM information_schema.TABLES "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ?",
+                (table,),
+            )
+        else:
+            found = self.scalar(
+                "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?",
+                (table,),
+            )
+        return bool(found)
+
+    def commit(self) -> None:
+        self.conn.commit()
+
+    def rollback(self) -> None:
+        self.conn.rollback()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator["Database"]:
+        try:
+            yield self
+        except BaseException:
+            self.rollback()
+            raise
+        self.commit()
+
+    @contextmanager
+    def triggers_disabled(self) -> Iterator["Database"]:
+        # Every trigger in 13_triggers.sql checks @DISABLE_TRIGGERS; the SQLite
+        # stand-in has no triggers so there is nothing to toggle there.
+        if self.is_mysql:
+            self.execute("SET @DISABLE_TRIGGERS = 1")
+        try:
+            yield self
+        finally:
+            if self.is_mysql:
+                self.execute("SET @DISABLE_TRIGGERS = NULL")
+
+
+@lru_cache(maxsize=1024)
+def _pyformat(statement: str) -> str:
+    # Statements are module-level constants, so the rewrite is done once each.
+    return statement.replace("%", "%%").replace("?", "%s")
+
+
+def connect(url: str) -> Database:
+    """Open ``sqlite:///path.db`` (``sqlite://`` for memory) or ``mysql://user:pw@host:port/db``."""
+    parsed = urlparse(url)
+    if parsed.scheme == "sqlite":
+        path = parsed.path[1:] if parsed.path.startswith("/") else parsed.path
+        conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        conn.execute("PRAGMA foreign_keys = ON")
+        return Database(conn, "sqlite")
+    if parsed.scheme in ("mysql", "mariadb"):
+        try:
+            import pymysql
+        except ImportError as exc:
+            raise RuntimeError("pymysql is required for mysql:// URLs") from exc
+        conn = pymysql.connect(
+            host=parsed.hostname or "localhost",
+            port=parsed.port or 3306,
+            user=unquote(parsed.username or "root"),
+            password=unquote(parsed.password or ""),
+            database=parsed.path.lstrip("/") or "cookhub",
+            charset="utf8mb4",
+            autocommit=False,
+        )
+        return Database(conn, "mysql")
+    raise ValueError(f"Unsupported database URL: {url}")
+
+
+def split_statements(script: str) -> list[str]:
+    """Split a MySQL script on ``;``, skipping ``--`` comments and quoted text."""
+    statements: list[str] = []
+    buf: list[str] = []
+    i, n = 0, len(script)
+    quote: str | None = None
+    while i < n:
+        ch = script[i]
+        if quote:
+            buf.append(ch)
+            if ch == quote:
+                if i + 1 < n and script[i + 1] == quote:
+                    buf.append(script[i + 1])
+                    i += 1
+                else:
+                    quote = None
+        elif ch in ("'", '"', "`"):
+            quote = ch
+            buf.append(ch)
+        elif script.startswith("--", i):
+            end = script.find("\n", i)
+            i = n if end == -1 else end
+            continue
+        elif ch == ";":
+            stmt = "".join(buf).strip()
+            if stmt:
+                statements.append(stmt)
+            buf = []
+        else:
+            buf.append(ch)
+        i += 1
+    tail = "".join(buf).strip()
+    if tail:
+        statements.append(tail)
+    return statements
+
+
+_INLINE_INDEX = re.compile(r",\s*INDEX\s+(\w+)\s*\(([^)]*)\)")
+
+
+def _sqlite_ddl(stmt: str) -> list[str]:
+    table = re.match(r"CREATE TABLE (\w+)", stmt)
+    indexes = _INLINE_INDEX.findall(stmt)
+    stmt = _INLINE_INDEX.sub("", stmt)
+    stmt = re.sub(r"INT AUTO_INCREMENT PRIMARY KEY", "INTEGER PRIMARY KEY AUTOINCREMENT", stmt)
+    stmt = re.sub(r"ENUM\s*\([^)]*\)", "TEXT", stmt, flags=re.S)
+    stmt = re.sub(r"ON UPDATE CURRENT_TIMESTAMP", "", stmt)
+    stmt = re.sub(r"COMMENT\s+'[^']*'", "", stmt)
+    stmt = re.sub(r"UNIQUE KEY \w+\s*\(", "UNIQUE (", stmt)
+    stmt = re.sub(r"\)\s*ENGINE=.*$", ")", stmt, flags=re.S)
+    out = [stmt]
+    if table:
+        out += [f"CREATE INDEX {name} ON {table.group(1)} ({cols})" for name, cols in indexes]
+    return out
+
+
+def _sqlite_dml(stmt: str) -> str:
+    stmt = re.sub(
+        r"DATE_SUB\(NOW\(\),\s*INTERVAL\s+(\d+)\s+(\w+)\)",
+        lambda m: f"datetime('now', '-{m.group(1)} {m.group(2).lower()}')",
+        stmt,
+    )
+    return stmt.replace("NOW()", "datetime('now')").replace("CURDATE()", "date('now')")
+
+
+def sqlite_standin(path: str = ":memory:", seed: bool = True) -> Database:
+    """Build the cookhub schema (and optionally the seed data) in SQLite.
+
+    The scripts under ``database/`` are translated on the fly so the stand-in
+    tracks the real DDL instead of a hand-maintained copy.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False)
+    db = Database(conn, "sqlite")
+    scripts = SCHEMA_SCRIPTS + (SEED_SCRIPTS if seed else ())
+    for name in scripts:
+        for stmt in split_statements((DATABASE_DIR / name).read_text(encoding="utf-8")):
+            head = stmt.split(None, 1)[0].upper()
+            if head in ("USE", "SET", "SELECT"):
+                continue
+            for part in _sqlite_ddl(stmt) if head in ("CREATE", "DROP") else [_sqlite_dml(stmt)]:
+                conn.execute(part)
+    conn.commit()
+    conn.execute("PRAGMA foreign_keys = ON")
+    return db
+
+
+def format_datetime(value: datetime) -> str:
+    """Render a timestamp parameter the same way for MySQL and SQLite."""
+    return value.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def to_datetime(value: Any) -> datetime | None:
+    if value is None or isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    return datetime.fromisoformat(str(value))
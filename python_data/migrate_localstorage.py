@@ -0,0 +1,814 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import tempfile
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, TextIO
+
+from data_access import hash_password
+from db import Database, connect, format_datetime, to_datetime
+
+# STORAGE_KEYS in src/lib/storage.js
+STORAGE_KEYS = {
+    "users": "cookhub_users",
+    "recipes": "cookhub_recipes",
+    "reviews": "cookhub_reviews",
+    "search_history": "cookhub_search_history",
+    "daily_stats": "cookhub_daily_stats",
+    "activity": "cookhub_activity",
+}
+# (section, storage key) in load order; favorites are read back from the users
+# once the recipes they point at have ids.
+SECTIONS = (
+    ("users", "cookhub_users"),
+    ("recipes", "cookhub_recipes"),
+    ("favorites", "cookhub_users"),
+    ("reviews", "cookhub_reviews"),
+    ("search_history", "cookhub_search_history"),
+    ("daily_stats", "cookhub_daily_stats"),
+    ("activity", "cookhub_activity"),
+)
+TABLE_ORDER = (
+    "user",
+    "recipe",
+    "ingredient",
+    "instruction",
+    "recipe_image",
+    "like_record",
+    "recipe_view",
+    "favorite",
+    "review",
+    "search_history",
+    "daily_stat",
+    "activity_log",
+)
+# Tables whose migrated rows can be counted back through the recipe id map.
+RECIPE_SCOPED = ("ingredient", "instruction", "recipe_image", "like_record", "recipe_view", "favorite", "review")
+COLUMNS = {
+    "user": (
+        "id", "username", "first_name", "last_name", "email", "password_hash", "birthday", "role", "status",
+        "joined_date", "last_active", "avatar_url", "bio", "location", "cooking_level",
+    ),
+    "recipe": (
+        "id", "title", "description", "category", "difficulty", "prep_time", "cook_time", "servings", "author_id",
+        "status", "created_at",
+    ),
+    "ingredient": ("id", "recipe_id", "name", "quantity", "unit", "sort_order"),
+    "instruction": ("id", "recipe_id", "step_number", "instruction_text"),
+    "recipe_image": ("id", "recipe_id", "image_url", "display_order"),
+    "like_record": ("id", "user_id", "recipe_id", "created_at"),
+    "recipe_view": ("id", "recipe_id", "user_id", "viewed_at"),
+    "favorite": ("id", "user_id", "recipe_id"),
+    "review": ("id", "user_id", "recipe_id", "rating", "comment", "created_at"),
+    "search_history": ("id", "user_id", "query", "searched_at", "created_at"),
+    "daily_stat": ("stat_date", "page_view_count", "active_user_count", "new_user_count", "recipe_view_count"),
+    "activity_log": ("id", "admin_id", "action_type", "target_type", "description", "created_at"),
+}
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS migration_id_map (
+    source      VARCHAR(100) NOT NULL,
+    kind        VARCHAR(20) NOT NULL,
+    source_id   VARCHAR(191) NOT NULL,
+    target_id   INT NOT NULL,
+    PRIMARY KEY (source, kind, source_id)
+)""",
+    """CREATE TABLE IF NOT EXISTS migration_checkpoint (
+    source      VARCHAR(100) NOT NULL,
+    section     VARCHAR(50) NOT NULL,
+    position    INT NOT NULL DEFAULT 0,
+    done        INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, section)
+)""",
+    """CREATE TABLE IF NOT EXISTS migration_tally (
+    source      VARCHAR(100) NOT NULL,
+    table_name  VARCHAR(64) NOT NULL,
+    outcome     VARCHAR(100) NOT NULL,
+    row_count   INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (source, table_name, outcome)
+)""",
+)
+LOADED = "loaded"
+MERGED = "merged with existing email"
+# Migrated passwords are hashed at the full BCRYPT_ROUNDS cost (~0.3 s each);
+# bcrypt releases the GIL, so one thread per core hashes a batch in parallel.
+HASH_WORKERS = os.cpu_count() or 4
+
+
+class JsonStream:
+    """Pull parser over a JSON text stream, reading ``read_size`` characters at a time.
+
+    Containers are walked one member at a time with ``members`` and
+    ``elements``; every value below that is decoded whole with
+    ``json.JSONDecoder.raw_decode``. Memory is therefore bounded by the
+    largest single element (one recipe, one day of stats), not by the
+    export.
+    """
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, fh: TextIO, read_size: int = 1 << 16) -> None:
+        self.fh = fh
+        self.read_size = read_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self, size: int) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fh.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character without consuming it ("" at end of input)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self._fill(self.read_size):
+                return self.buf[self.pos : self.pos + 1]
+
+    def _take(self, expected: str) -> str:
+        ch = self.peek()
+        if ch not in expected:
+            raise ValueError(f"Expected one of {expected!r}, found {ch!r}")
+        self.pos += 1
+        return ch
+
+    def value(self) -> Any:
+        self.peek()
+        size = self.read_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill(size):
+                    raise
+            else:
+                # A number running into the end of the buffer may continue in the next read.
+                if end < len(self.buf) or not self._fill(size):
+                    self.pos = end
+                    return value
+            size *= 2
+
+    def skip(self) -> None:
+        """Consume the value at the cursor, a container one member at a time."""
+        head = self.peek()
+        if head == "[":
+            for _ in self.elements():
+                pass
+        elif head == "{":
+            for _ in self.members():
+                self.skip()
+        else:
+            self.value()
+
+    def members(self) -> Iterator[str]:
+        """Keys of the object at the cursor; the caller consumes each value before advancing."""
+        self._take("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._take(":")
+            yield key
+            if self._take(",}") == "}":
+                return
+
+    def elements(self) -> Iterator[Any]:
+        self._take("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self._take(",]") == "]":
+                return
+
+
+class StringContent:
+    """Read-only text file over the JSON string literal at a ``JsonStream``'s cursor.
+
+    Escapes are decoded as the string is read, so a string holding a whole
+    serialised section (``JSON.stringify`` of a ``localStorage`` value) can
+    itself be parsed with a ``JsonStream`` without ever being held in full.
+    """
+
+    # A run of complete characters and escapes; it stops at the closing quote
+    # or at an escape cut off by the end of the buffer.
+    _RUN = re.compile(r'(?:[^"\\]+|\\["\\/bfnrt]|\\u[0-9a-fA-F]{4})*')
+    _HIGH = re.compile(r"\\u[dD][89abAB][0-9a-fA-F]{2}")
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, stream: JsonStream) -> None:
+        stream._take('"')
+        self.stream = stream
+        self.done = False
+
+    def _have(self, n: int) -> bool:
+        s = self.stream
+        while len(s.buf) - s.pos < n:
+            if not s._fill(s.read_size):
+                return False
+        return True
+
+    def _escape(self) -> str:
+        s = self.stream
+        if not self._have(2):
+            raise ValueError("Unterminated string")
+        kind = s.buf[s.pos + 1]
+        if kind != "u":
+            s.pos += 2
+            return self._ESCAPES[kind]
+        if not self._have(6):
+            raise ValueError("Unterminated string")
+        code = int(s.buf[s.pos + 2 : s.pos + 6], 16)
+        s.pos += 6
+        if 0xD800 <= code < 0xDC00 and self._have(6) and s.buf[s.pos : s.pos + 2] == "\\u":
+            low = int(s.buf[s.pos + 2 : s.pos + 6], 16)
+            if 0xDC00 <= low < 0xE000:
+                s.pos += 6
+                code = 0x10000 + ((code - 0xD800) << 10) + (low - 0xDC00)
+        return chr(code)
+
+    def _ends_high(self, start: int, end: int) -> bool:
+        """Whether ``buf[start:end]`` ends with a ``\\uD800``-``\\uDBFF`` escape."""
+        buf = self.stream.buf
+        if end - start < 6 or not self._HIGH.fullmatch(buf, end - 6, end):
+            return False
+        slashes = 0
+        while end - 7 - slashes >= start and buf[end - 7 - slashes] == "\\":
+            slashes += 1
+        return slashes % 2 == 0
+
+    def read(self, size: int = -1) -> str:
+        s, out, n = self.stream, [], 0
+        while not self.done and (size < 0 or n < size):
+            if not self._have(1):
+                raise ValueError("Unterminated string")
+            if s.buf[s.pos] == '"':
+                s.pos += 1
+                self.done = True
+                break
+            # Raw length bounds the decoded length, so ``size`` is never exceeded.
+            stop = len(s.buf) if size < 0 else min(len(s.buf), s.pos + size - n)
+            end = self._RUN.match(s.buf, s.pos, stop).end()
+            if self._ends_high(s.pos, end):
+                end -= 6  # keep a high surrogate with its low half, which may not be read yet
+            if end > s.pos:
+                text = json.loads(f'"{s.buf[s.pos : end]}"')
+                s.pos = end
+            else:
+                text = self._escape()  # an escape split across reads
+            out.append(text)
+            n += len(text)
+        return "".join(out)
+
+    def drain(self) -> None:
+        while not self.done:
+            self.read(self.stream.read_size)
+
+
+def _section_entries(stream: JsonStream) -> Iterator[Any]:
+    head = stream.peek()
+    if head == "[":
+        yield from stream.elements()
+    elif head == "{":
+        for member in stream.members():
+            yield [member, stream.value()]
+    elif head == '"':
+        content = StringContent(stream)
+        yield from _section_entries(JsonStream(content, stream.read_size))
+        content.drain()
+    else:
+        stream.value()  # null or a stray scalar: nothing to load
+
+
+def iter_entries(path: Path) -> Iterator[tuple[str, Any]]:
+    """Stream ``(storage key, entry)`` over a whole exported snapshot in one pass.
+
+    The snapshot is one JSON object keyed by storage key. Values may be the
+    parsed arrays/objects or, as copied straight out of ``localStorage``,
+    JSON strings; the latter are unescaped and parsed incrementally too
+    (``StringContent``). Object entries (daily stats) are yielded as
+    ``[key, value]`` pairs.
+    """
+    with open(path, encoding="utf-8") as fh:
+        stream = JsonStream(fh)
+        for name in stream.members():
+            for entry in _section_entries(stream):
+                yield name, entry
+
+
+def split_sections(path: Path, out_dir: Path, sections: Iterable[str]) -> dict[str, Path]:
+    """Write the entries of ``sections`` to one JSON-lines file each under ``out_dir``.
+
+    The export is read once, whatever order its keys are in; sections are
+    then loaded in dependency order from these files. The favorites section
+    keeps only each user's id and ``favorites``.
+    """
+    wanted = set(sections)
+    by_key: dict[str, list[str]] = defaultdict(list)
+    for section, key in SECTIONS:
+        if section in wanted:
+            by_key[key].append(section)
+    paths = {section: out_dir / f"{section}.jsonl" for section in wanted}
+    files = {section: open(p, "w", encoding="utf-8") for section, p in paths.items()}
+    try:
+        for key, entry in iter_entries(path):
+            for section in by_key.get(key, ()):
+                if section == "favorites":
+                    entry = {"id": entry.get("id"), "favorites": entry.get("favorites")} if isinstance(entry, dict) else {}
+                files[section].write(json.dumps(entry, ensure_ascii=False) + "\n")
+    finally:
+        for fh in files.values():
+            fh.close()
+    return paths
+
+
+def _read_lines(path: Path) -> Iterator[Any]:
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            yield json.loads(line)
+
+
+def _timestamp(value: Any) -> str | None:
+    try:
+        ts = to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return format_datetime(ts) if ts is not None else None
+
+
+def _date(value: Any) -> str | None:
+    try:
+        return date.fromisoformat(str(value)[:10]).isoformat() if value else None
+    except ValueError:
+        return None
+
+
+def _int(value: Any) -> int | None:
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _text(value: Any) -> str | None:
+    text = str(value).strip() if value is not None else ""
+    return text or None
+
+
+def _unique(values: Any) -> list[str]:
+    return list(dict.fromkeys(str(v) for v in values or () if v))
+
+
+def _action(entry: dict) -> tuple[str, str] | None:
+    """``activity_log`` action type and target type for a storage.addActivity entry."""
+    kind, text = entry.get("type"), str(entry.get("text") or "")
+    if kind == "user":
+        return "user_create", "user"
+    if kind == "admin-user":
+        return ("user_delete" if " removed " in text else "user_update"), "user"
+    if kind == "admin-recipe":
+        for verb, action in ((" approved ", "recipe_approve"), (" rejected ", "recipe_reject"), (" removed ", "recipe_delete")):
+            if verb in text:
+                return action, "recipe"
+    return None
+
+
+class _Batch:
+    """Rows, id mappings and tallies produced from one batch of source entries."""
+
+    def __init__(self, db: Database) -> None:
+        self.db = db
+        self.rows: dict[str, list[tuple]] = defaultdict(list)
+        self.ids: dict[tuple[str, str], int] = {}
+        self.tally: Counter = Counter()
+        self._next: dict[str, int] = {}
+
+    def new_id(self, table: str) -> int:
+        if table not in self._next:
+            self._next[table] = int(self.db.scalar(f"SELECT COALESCE(MAX(id), 0) FROM {table}")) + 1
+        self._next[table] += 1
+        return self._next[table] - 1
+
+    def add(self, table: str, row: tuple) -> None:
+        self.rows[table].append(row)
+        self.tally[table, LOADED] += 1
+
+    def skip(self, table: str, reason: str, n: int = 1) -> None:
+        if n:
+            self.tally[table, reason] += n
+
+
+class LocalStorageMigrator:
+    """Loads an exported ``localStorage`` snapshot into the relational schema.
+
+    The export is split into per-section files in one pass
+    (``split_sections``), and sections are then loaded in dependency order,
+    so only one batch of entries is in memory at a time (plus the user and
+    recipe id maps). Embedded arrays become child rows: ``ingredients``,
+    ``instructions`` and ``images`` on a recipe, ``likedBy``/``viewedBy`` as
+    ``like_record``/``recipe_view``, and ``favorites`` on a user. The string
+    ids from ``generateId()`` are given integer keys, recorded in
+    ``migration_id_map``; users whose email already exists are mapped onto
+    that row instead.
+
+    Each batch is written in one transaction with ``@DISABLE_TRIGGERS = 1``
+    (the stat triggers would count migrated views twice), together with the
+    id mappings, the per-table tallies and the section's checkpoint, so a
+    re-run resumes after the last committed batch. Ids are allocated from
+    ``MAX(id)``, so nothing else should write to the tables while the
+    migration runs.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        source: str,
+        hasher: Callable[[str], str] = hash_password,
+        batch_size: int = 500,
+        now: datetime | None = None,
+    ) -> None:
+        self.db = db
+        self.source = source
+        self.hasher = hasher
+        self.batch_size = batch_size
+        self.now = format_datetime(now or datetime.now())
+        self.ids: dict[tuple[str, str], int] = {}
+
+    def _ensure_schema(self) -> None:
+        with self.db.transaction():
+            for statement in SCHEMA:
+                self.db.execute(statement)
+
+    def run(self, path: Path) -> dict[str, Any]:
+        # Fail before the first batch is written, not on the first user with a password.
+        self.hasher("dependency check")
+        self._ensure_schema()
+        self.ids = {
+            (kind, source_id): int(target)
+            for kind, source_id, target in self.db.query(
+                "SELECT kind, source_id, target_id FROM migration_id_map WHERE source = ?", (self.source,)
+            )
+        }
+        checkpoints = {
+            section: (int(position), bool(done))
+            for section, position, done in self.db.query(
+                "SELECT section, position, done FROM migration_checkpoint WHERE source = ?", (self.source,)
+            )
+        }
+        self.db.rollback()
+        pending = [section for section, _ in SECTIONS if not checkpoints.get(section, (0, False))[1]]
+        with tempfile.TemporaryDirectory(prefix="cookhub_migration_") as workdir:
+            spills = split_sections(path, Path(workdir), pending)
+            for section in pending:
+                self._section(spills[section], section, checkpoints.get(section, (0, False))[0])
+        return self.verify()
+
+    def _section(self, spill: Path, section: str, committed: int) -> None:
+        convert = getattr(self, f"_convert_{section}")
+        batch, position = [], 0
+        for entry in _read_lines(spill):
+            position += 1
+            if position <= committed:
+                continue
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                self._write(section, convert, batch, position, False)
+                batch = []
+        self._write(section, convert, batch, position, True)
+
+    def _write(self, section: str, convert: Callable, entries: list, position: int, done: bool) -> None:
+        plan = _Batch(self.db)
+        if entries:
+            convert(entries, plan)
+        with self.db.transaction(), self.db.triggers_disabled():
+            for table in TABLE_ORDER:
+                if not plan.rows[table]:
+                    continue
+                if table == "daily_stat":
+                    columns = COLUMNS[table]
+                    statement = self.db.upsert_sql(table, columns, ("stat_date",), columns[1:])
+                else:
+                    columns = COLUMNS[table]
+                    statement = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+                self.db.executemany(statement, plan.rows[table])
+            self.db.executemany(
+                "INSERT INTO migration_id_map (source, kind, source_id, target_id) VALUES (?, ?, ?, ?)",
+                ((self.source, kind, source_id, target) for (kind, source_id), target in plan.ids.items()),
+            )
+            self.db.executemany(
+                self.db.upsert_sql(
+                    "migration_tally",
+                    ("source", "table_name", "outcome", "row_count"),
+                    ("source", "table_name", "outcome"),
+                    ("row_count",),
+                ),
+                ((self.source, table, outcome, n) for (table, outcome), n in sorted(plan.tally.items())),
+            )
+            self.db.execute(
+                self.db.upsert_sql(
+                    "migration_checkpoint", ("source", "section", "position", "done"), ("source", "section")
+                ),
+                (self.source, section, position, int(done)),
+            )
+        # Only committed mappings become visible to later batches.
+        self.ids.update(plan.ids)
+
+    def _target(self, plan: _Batch, kind: str, source_id: Any) -> int | None:
+        key = (kind, str(source_id))
+        return self.ids.get(key) or plan.ids.get(key)
+
+    # -- conversions (one per section) ------------------------------------------
+
+    def _convert_users(self, entries: list[dict], plan: _Batch) -> None:
+        emails = sorted({str(u.get("email") or "").lower() for u in entries} - {""})
+        # uk_user_email is case-insensitive under utf8mb4_unicode_ci; SQLite needs LOWER().
+        column = "email" if self.db.is_mysql else "LOWER(email)"
+        existing = {}
+        for i in range(0, len(emails), 500):
+            chunk = emails[i : i + 500]
+            existing.update(
+                (str(email).lower(), int(uid))
+                for uid, email in self.db.query(
+                    f"SELECT id, email FROM user WHERE {column} IN ({', '.join('?' for _ in chunk)})", chunk
+                )
+            )
+        new = []
+        for user in entries:
+            source_id, email = str(user.get("id") or ""), _text(user.get("email"))
+            if not source_id or not email:
+                plan.skip("user", "missing id or email")
+                continue
+            if self._target(plan, "user", source_id):
+                plan.skip("user", "duplicate id")
+                continue
+            if email.lower() in existing:
+                plan.ids["user", source_id] = existing[email.lower()]
+                plan.skip("user", MERGED)
+                continue
+            target = plan.new_id("user")
+            existing[email.lower()] = plan.ids["user", source_id] = target
+            new.append((target, email, user))
+        # bcrypt releases the GIL, so a batch's hashes run in parallel.
+        passwords = [str(user["password"]) for _, _, user in new if user.get("password")]
+        with ThreadPoolExecutor(HASH_WORKERS) as pool:
+            hashes = iter(list(pool.map(self.hasher, passwords)))
+        for target, email, user in new:
+            role = user.get("role") if user.get("role") in ("admin", "user") else "user"
+            status = user.get("status") if user.get("status") in ("active", "inactive", "pending", "suspended") else "pending"
+            plan.add(
+                "user",
+                (
+                    target,
+                    _text(user.get("username")) or email.split("@")[0],
+                    _text(user.get("firstName")) or "",
+                    _text(user.get("lastName")) or "",
+                    email,
+                    # localStorage kept plain-text passwords; accounts without one cannot log in.
+                    next(hashes) if user.get("password") else "!",
+                    _date(user.get("birthday")),
+                    role,
+                    status,
+                    _timestamp(user.get("joinedDate")) or self.now,
+                    _timestamp(user.get("lastActive")),
+                    _text(user.get("avatar")),
+                    _text(user.get("bio")),
+                    _text(user.get("location")),
+                    _text(user.get("cookingLevel")),
+                ),
+            )
+
+    def _convert_recipes(self, entries: list[dict], plan: _Batch) -> None:
+        for recipe in entries:
+            source_id = str(recipe.get("id") or "")
+            if not source_id or self._target(plan, "recipe", source_id):
+                plan.skip("recipe", "missing or duplicate id")
+                continue
+            author = self._target(plan, "user", recipe.get("authorId"))
+            title = _text(recipe.get("title"))
+            if author is None or title is None:
+                plan.skip("recipe", "unknown author or no title")
+                continue
+            target = plan.ids["recipe", source_id] = plan.new_id("recipe")
+            created = _timestamp(recipe.get("createdAt")) or self.now
+            difficulty = recipe.get("difficulty") if recipe.get("difficulty") in ("Easy", "Medium", "Hard") else "Easy"
+            status = recipe.get("status") if recipe.get("status") in ("published", "pending", "rejected") else "pending"
+            plan.add(
+                "recipe",
+                (
+                    target,
+                    title,
+                    _text(recipe.get("description")),
+                    _text(recipe.get("category")),
+                    difficulty,
+                    _int(recipe.get("prepTime")),
+                    _int(recipe.get("cookTime")),
+                    _int(recipe.get("servings")),
+                    author,
+                    status,
+                    created,
+                ),
+            )
+            for order, item in enumerate(recipe.get("ingredients") or (), start=1):
+                item = item if isinstance(item, dict) else {"name": item}
+                name = _text(item.get("name"))
+                if name is None:
+                    plan.skip("ingredient", "no name")
+                    continue
+                quantity, unit = _text(item.get("quantity")), _text(item.get("unit"))
+                plan.add("ingredient", (plan.new_id("ingredient"), target, name, quantity, unit, order))
+            step = 0
+            for item in recipe.get("instructions") or ():
+                text = _text(item.get("text") if isinstance(item, dict) else item)
+                if text is None:
+                    plan.skip("instruction", "empty step")
+                    continue
+                step += 1
+                plan.add("instruction", (plan.new_id("instruction"), target, step, text))
+            images = recipe.get("images") or ([recipe["image"]] if recipe.get("image") else [])
+            for order, url in enumerate(_unique(images), start=1):
+                plan.add("recipe_image", (plan.new_id("recipe_image"), target, url, order))
+            for user_key in _unique(recipe.get("likedBy")):
+                user = self._target(plan, "user", user_key)
+                if user is None:
+                    plan.skip("like_record", "unknown user")
+                    continue
+                plan.add("like_record", (plan.new_id("like_record"), user, target, created))
+            for viewer in _unique(recipe.get("viewedBy")):
+                if viewer.startswith("guest:"):
+                    # REQ-MIG-003: recipe_view only records authenticated users.
+                    plan.skip("recipe_view", "guest viewer")
+                    continue
+                user = self._target(plan, "user", viewer)
+                if user is None:
+                    plan.skip("recipe_view", "unknown user")
+                    continue
+                # viewedBy carries no timestamps; the recipe's creation time is the only safe lower bound.
+                plan.add("recipe_view", (plan.new_id("recipe_view"), target, user, created))
+
+    def _convert_favorites(self, entries: list[dict], plan: _Batch) -> None:
+        for user in entries:
+            favorites = _unique(user.get("favorites"))
+            target = self._target(plan, "user", user.get("id"))
+            if target is None:
+                plan.skip("favorite", "unknown user", len(favorites))
+                continue
+            for recipe_key in favorites:
+                recipe = self._target(plan, "recipe", recipe_key)
+                if recipe is None:
+                    plan.skip("favorite", "unknown recipe")
+                    continue
+                plan.add("favorite", (plan.new_id("favorite"), target, recipe))
+
+    def _convert_reviews(self, entries: list[dict], plan: _Batch) -> None:
+        recipes = sorted({r for e in entries if (r := self._target(plan, "recipe", e.get("recipeId")))})
+        seen = set()
+        for i in range(0, len(recipes), 500):
+            chunk = recipes[i : i + 500]
+            seen.update(
+                self.db.query(
+                    f"SELECT user_id, recipe_id FROM review WHERE recipe_id IN ({', '.join('?' for _ in chunk)})", chunk
+                )
+            )
+        for review in entries:
+            user = self._target(plan, "user", review.get("userId"))
+            recipe = self._target(plan, "recipe", review.get("recipeId"))
+            rating = _int(review.get("rating"))
+            if user is None or recipe is None:
+                plan.skip("review", "unknown user or recipe")
+            elif rating is None or not 1 <= rating <= 5:
+                plan.skip("review", "invalid rating")
+            elif (user, recipe) in seen:
+                # uk_user_recipe_review: storage.addReview also kept one review per user and recipe.
+                plan.skip("review", "duplicate user and recipe")
+            else:
+                seen.add((user, recipe))
+                created = _timestamp(review.get("createdAt")) or self.now
+                plan.add("review", (plan.new_id("review"), user, recipe, rating, _text(review.get("comment")), created))
+
+    def _convert_search_history(self, entries: list[dict], plan: _Batch) -> None:
+        for entry in entries:
+            user_key, query = str(entry.get("userId") or ""), _text(entry.get("query"))
+            if user_key.startswith("guest:"):
+                plan.skip("search_history", "guest searcher")
+                continue
+            user = self._target(plan, "user", user_key)
+            if user is None or query is None:
+                plan.skip("search_history", "unknown user or empty query")
+                continue
+            at = _timestamp(entry.get("createdAt")) or self.now
+            plan.add("search_history", (plan.new_id("search_history"), user, query, at, at))
+
+    def _convert_daily_stats(self, entries: list[tuple[str, dict]], plan: _Batch) -> None:
+        for day, stats in entries:
+            stat_date = _date(day)
+            if stat_date is None or not isinstance(stats, dict):
+                plan.skip("daily_stat", "bad date or entry")
+                continue
+            views = len(stats.get("views") or ())
+            # recordView is the only page-level tracking localStorage had, so it stands in for page views.
+            active, new = len(_unique(stats.get("activeUsers"))), len(_unique(stats.get("newUsers")))
+            plan.add("daily_stat", (stat_date, views, active, new, views))
+
+    def _convert_activity(self, entries: list[dict], plan: _Batch) -> None:
+        for entry in entries:
+            action = _action(entry)
+            if action is None:
+                plan.skip("activity_log", "no matching action_type")
+                continue
+            # Entries name the admin only inside the text, so admin_id stays NULL.
+            created = _timestamp(entry.get("time")) or self.now
+            plan.add(
+                "activity_log",
+                (plan.new_id("activity_log"), None, action[0], action[1], _text(entry.get("text")), created),
+            )
+
+    # -- verification -----------------------------------------------------------
+
+    def verify(self) -> dict[str, Any]:
+        """Per table: rows loaded and skipped (by reason) from the tallies, and rows found in the target.
+
+        ``found`` counts back through ``migration_id_map``: users and recipes
+        against the distinct ids mapped to (a merged user adds a mapping but
+        no row), recipe children against the rows loaded, by ``recipe_id``. Tables that cannot be
+        attributed to this source (search history, stats, activity) report
+        None.
+        """
+        self._ensure_schema()
+        tallies: dict[str, dict[str, int]] = defaultdict(dict)
+        for table, outcome, n in self.db.query(
+            "SELECT table_name, outcome, row_count FROM migration_tally WHERE source = ?", (self.source,)
+        ):
+            tallies[table][outcome] = int(n)
+        sections = dict(
+            self.db.query("SELECT section, done FROM migration_checkpoint WHERE source = ?", (self.source,))
+        )
+        mapped = "SELECT target_id FROM migration_id_map WHERE source = ? AND kind = ?"
+        report = {"source": self.source, "complete": all(sections.get(s) for s, _ in SECTIONS), "tables": {}}
+        for table in TABLE_ORDER:
+            counts = tallies.get(table, {})
+            loaded = counts.get(LOADED, 0)
+            expected = loaded
+            if table in ("user", "recipe"):
+                found = self.db.scalar(f"SELECT COUNT(*) FROM {table} WHERE id IN ({mapped})", (self.source, table))
+                expected = self.db.scalar(
+                    "SELECT COUNT(DISTINCT target_id) FROM migration_id_map WHERE source = ? AND kind = ?",
+                    (self.source, table),
+                )
+            elif table in RECIPE_SCOPED:
+                found = self.db.scalar(
+                    f"SELECT COUNT(*) FROM {table} WHERE recipe_id IN ({mapped})", (self.source, "recipe")
+                )
+            else:
+                found = None
+            report["tables"][table] = {
+                "loaded": loaded,
+                "skipped": {k: v for k, v in sorted(counts.items()) if k != LOADED},
+                "found": None if found is None else int(found),
+                "ok": found is None or int(found) == int(expected),
+            }
+        self.db.rollback()
+        report["ok"] = report["complete"] and all(t["ok"] for t in report["tables"].values())
+        return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Migrate a localStorage JSON export into the relational schema")
+    parser.add_argument("snapshot", type=Path, help="JSON object keyed by the cookhub_* storage keys")
+    parser.add_argument(
+        "--db", required=True, help="Target database URL (mysql://... or sqlite:///path with the schema loaded)"
+    )
+    parser.add_argument("--source", help="Name for this snapshot in the checkpoint tables (default: file name)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Source entries per transaction")
+    parser.add_argument("--verify-only", action="store_true", help="Print the report for a previous run")
+    args = parser.parse_args()
+
+    db = connect(args.db)
+    migrator = LocalStorageMigrator(db, args.source or args.snapshot.name, batch_size=args.batch_size)
+    report = migrator.verify() if args.verify_only else migrator.run(args.snapshot)
+    print(f"{report['source']}: {'complete' if report['complete'] else 'INCOMPLETE'}")
+    for table, row in report["tables"].items():
+        skipped = ", ".join(f"{reason}: {n}" for reason, n in row["skipped"].items()) or "-"
+        found = "-" if row["found"] is None else row["found"]
+        print(f"  {table:<15} loaded {row['loaded']:>8}  found {found!s:>8}  {'ok' if row['ok'] else 'MISMATCH'}  skipped {skipped}")
+    db.close()
+    raise SystemExit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
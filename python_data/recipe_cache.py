@@ -0,0 +1,544 @@
+from __future__ import annotations
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+from data_access import ConnectionPool, StorageDAL
+from db import sqlite_standin
+
+LISTINGS = "listings"  # tag carried by every listing page
+SHARED_SYNC_SECONDS = 1.0
+
+# Table written -> whether the write can change which recipes a listing shows
+WRITE_TABLES = {
+    "user": True,  # documents embed the author's username and avatar; deletes cascade to recipes
+    "recipe": True,
+    "ingredient": False,
+    "instruction": False,
+    "recipe_image": False,
+    "review": False,
+    "like_record": False,
+}
+
+SHARED_MAX_BYTES = 256 << 20
+SHARED_VERSION = 2  # PRAGMA user_version of the shared file; older files are rebuilt
+# accessed is rewritten at most this often per entry, so hits stay read-only.
+ACCESS_RESOLUTION = 60.0
+# Readers not seen for this long no longer hold back log truncation.
+READER_TIMEOUT = 300.0
+TRUNCATE_SECONDS = 10.0
+ALL = "*"  # pseudo-tag: every entry
+
+SHARED_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS cache_entry (
+        key      TEXT PRIMARY KEY,
+        value    BLOB NOT NULL,
+        bytes    INTEGER NOT NULL,
+        accessed REAL NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS idx_cache_entry_accessed ON cache_entry (accessed)",
+    """CREATE TABLE IF NOT EXISTS cache_tag (
+        tag TEXT NOT NULL,
+        key TEXT NOT NULL,
+        PRIMARY KEY (tag, key)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_cache_tag_key ON cache_tag (key)",
+    "CREATE TABLE IF NOT EXISTS cache_invalidation (seq INTEGER PRIMARY KEY AUTOINCREMENT, tag TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS cache_reader (reader TEXT PRIMARY KEY, seq INTEGER NOT NULL, seen REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)",
+    "INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('bytes', 0), ('truncated', 0)",
+    # Entries are replaced by DELETE + INSERT (REPLACE would skip the delete trigger).
+    """CREATE TRIGGER IF NOT EXISTS cache_entry_added AFTER INSERT ON cache_entry BEGIN
+        UPDATE cache_meta SET value = value + NEW.bytes WHERE name = 'bytes';
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS cache_entry_removed AFTER DELETE ON cache_entry BEGIN
+        UPDATE cache_meta SET value = value - OLD.bytes WHERE name = 'bytes';
+        DELETE FROM cache_tag WHERE key = OLD.key;
+    END""",
+)
+SHARED_TABLES = ("cache_entry", "cache_tag", "cache_invalidation", "cache_reader", "cache_meta")
+
+
+def recipe_tag(recipe_id: int) -> str:
+    return f"recipe:{recipe_id}"
+
+
+def user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+class LRUCache:
+    """Byte-bounded LRU of serialised values with tag-based invalidation."""
+
+    def __init__(self, max_bytes: int, metrics: Counter) -> None:
+        self.max_bytes = max_bytes
+        self.metrics = metrics
+        self.size = 0
+        self._entries: OrderedDict[str, tuple[bytes, frozenset[str]]] = OrderedDict()
+        self._by_tag: dict[str, set[str]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: str, value: bytes, tags: frozenset[str]) -> None:
+        if len(value) > self.max_bytes:
+            return
+        self.discard(key)
+        self._entries[key] = (value, tags)
+        self.size += len(value)
+        for tag in tags:
+            self._by_tag[tag].add(key)
+        while self.size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self.discard(oldest)
+            self.metrics["evictions"] += 1
+
+    def discard(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self.size -= len(entry[0])
+        for tag in entry[1]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def invalidate(self, tag: str) -> int:
+        keys = list(self._entries) if tag == ALL else list(self._by_tag.get(tag, ()))
+        for key in keys:
+            self.discard(key)
+        return len(keys)
+
+
+class SharedTier:
+    """SQLite file shared by the processes on one host.
+
+    Entries are bounded by ``max_bytes`` (kept in ``cache_meta`` by
+    triggers) and evicted least recently used first; ``cache_tag`` indexes
+    them by tag for invalidation. Invalidations are appended to
+    ``cache_invalidation``; each process polls it at most every
+    ``SHARED_SYNC_SECONDS`` and drops matching entries from its own LRU,
+    which bounds cross-process staleness to that interval. Every process
+    records how far it has read in ``cache_reader``, and the log is
+    truncated up to the slowest live reader; a reader that has fallen
+    behind the truncation point is told to drop everything (``ALL``).
+    """
+
+    def __init__(self, path: Path, max_bytes: int = SHARED_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.conn = sqlite3.connect(str(path), timeout=5.0, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self._lock = threading.Lock()
+        with self._write():
+            if self.conn.execute("PRAGMA user_version").fetchone()[0] != SHARED_VERSION:
+                for table in SHARED_TABLES:
+                    self.conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self.conn.execute(f"PRAGMA user_version = {SHARED_VERSION}")
+            for ddl in SHARED_SCHEMA:
+                self.conn.execute(ddl)
+            self.last_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidation").fetchone()[0]
+            self.reader = uuid.uuid4().hex
+            self.conn.execute(
+                "INSERT INTO cache_reader (reader, seq, seen) VALUES (?, ?, ?)", (self.reader, self.last_seq, time.time())
+            )
+        self._truncated_at = time.monotonic()
+
+    @contextmanager
+    def _write(self) -> Iterator[None]:
+        with self._lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    def _meta(self, name: str) -> int:
+        return self.conn.execute("SELECT value FROM cache_meta WHERE name = ?", (name,)).fetchone()[0]
+
+    def get(self, key: str) -> tuple[bytes, frozenset[str]] | None:
+        with self._lock:
+            row = self.conn.execute("SELECT value, accessed FROM cache_entry WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            tags = frozenset(t for (t,) in self.conn.execute("SELECT tag FROM cache_tag WHERE key = ?", (key,)))
+        now = time.time()
+        if now - row[1] >= ACCESS_RESOLUTION:
+            with self._lock:
+                self.conn.execute("UPDATE cache_entry SET accessed = ? WHERE key = ?", (now, key))
+        return bytes(row[0]), tags
+
+    def seq(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidation").fetchone()[0]
+
+    def put(self, key: str, value: bytes, tags: frozenset[str], since: int) -> int:
+        """Store unless one of ``tags`` was invalidated after sequence ``since`` (a racing load).
+
+        Returns the number of entries evicted to stay within ``max_bytes``.
+        """
+        if len(value) > self.max_bytes:
+            return 0
+        marks = ", ".join("?" for _ in tags)
+        with self._write():
+            # Past the truncation point the log can no longer prove the load was not raced.
+            if since < self._meta("truncated") or self.conn.execute(
+                f"SELECT 1 FROM cache_invalidation WHERE seq > ? AND tag IN ({marks}) LIMIT 1", (since, *tags)
+            ).fetchone():
+                return 0
+            self.conn.execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+            self.conn.execute(
+                "INSERT INTO cache_entry (key, value, bytes, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, len(value), time.time()),
+            )
+            self.conn.executemany("INSERT INTO cache_tag (tag, key) VALUES (?, ?)", ((t, key) for t in tags))
+            return self._evict()
+
+    def _evict(self) -> int:
+        excess = self._meta("bytes") - self.max_bytes
+        if excess <= 0:
+            return 0
+        # Evict down to 90% of the budget so the next puts do not evict one entry each.
+        excess += self.max_bytes // 10
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, bytes FROM cache_entry ORDER BY accessed"):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.conn.executemany("DELETE FROM cache_entry WHERE key = ?", doomed)
+        return len(doomed)
+
+    def invalidate(self, tags: list[str]) -> None:
+        with self._write():
+            for tag in tags:
+                self.conn.execute("DELETE FROM cache_entry WHERE key IN (SELECT key FROM cache_tag WHERE tag = ?)", (tag,))
+            self.conn.executemany("INSERT INTO cache_invalidation (tag) VALUES (?)", ((t,) for t in tags))
+
+    def changes(self) -> list[str]:
+        """Tags invalidated by any process since the previous call (``[ALL]`` after falling behind)."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT seq, tag FROM cache_invalidation WHERE seq > ? ORDER BY seq", (self.last_seq,)
+            ).fetchall()
+            behind = self.last_seq < self._meta("truncated")
+            if behind:
+                rows = self.conn.execute("SELECT COALESCE(MAX(seq), 0), ? FROM cache_invalidation", (ALL,)).fetchall()
+            if rows:
+                self.last_seq = rows[-1][0]
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache_reader (reader, seq, seen) VALUES (?, ?, ?)",
+                (self.reader, self.last_seq, time.time()),
+            )
+        if time.monotonic() - self._truncated_at >= TRUNCATE_SECONDS:
+            self._truncated_at = time.monotonic()
+            self.truncate()
+        return [ALL] if behind else [tag for _, tag in rows]
+
+    def truncate(self) -> int:
+        """Delete log entries every live reader has seen; returns rows deleted."""
+        with self._write():
+            self.conn.execute("DELETE FROM cache_reader WHERE seen < ?", (time.time() - READER_TIMEOUT,))
+            floor = self.conn.execute("SELECT MIN(seq) FROM cache_reader").fetchone()[0]
+            if floor is None:
+                floor = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidation").fetchone()[0]
+            deleted = self.conn.execute("DELETE FROM cache_invalidation WHERE seq <= ?", (floor,)).rowcount
+            self.conn.execute(
+                "UPDATE cache_meta SET value = MAX(value, ?) WHERE name = 'truncated'", (floor,)
+            )
+        return deleted
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "shared_entries": self.conn.execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0],
+                "shared_bytes": self._meta("bytes"),
+                "log_rows": self.conn.execute("SELECT COUNT(*) FROM cache_invalidation").fetchone()[0],
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.execute("DELETE FROM cache_reader WHERE reader = ?", (self.reader,))
+        self.conn.close()
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: bytes | None = None
+        self.error: BaseException | None = None
+
+
+class RecipeCache:
+    """Read-through cache of assembled recipe documents and listing pages.
+
+    A recipe document is the DAL recipe plus its review count, average
+    rating and author summary, serialised to JSON. ``viewedBy`` is left out
+    because views change far more often than anything else in the document;
+    view counts come from ``StorageDAL.get_view_count``.
+
+    Entries carry tags: a document is tagged with its recipe and its author,
+    a listing page with ``listings`` and every recipe and author on it.
+    Writes through this class invalidate exactly those tags; writes made elsewhere (for example the
+    ``usp_CreateRecipe``/``usp_ApproveRecipe``/``usp_DeleteRecipe``
+    procedures) report them with ``on_write``. Concurrent misses for one key
+    share a single load, and a load that raced with an invalidation is
+    returned but not stored.
+    """
+
+    def __init__(
+        self,
+        dal: StorageDAL,
+        max_bytes: int = 64 << 20,
+        shared: Path | None = None,
+        shared_max_bytes: int = SHARED_MAX_BYTES,
+    ) -> None:
+        self.dal = dal
+        self.metrics: Counter = Counter()
+        self.local = LRUCache(max_bytes, self.metrics)
+        self.shared = SharedTier(shared, shared_max_bytes) if shared else None
+        self._lock = threading.Lock()
+        self._flights: dict[str, _Flight] = {}
+        self._generation: dict[str, int] = defaultdict(int)
+        self._synced = time.monotonic()
+
+    # -- reads ---------------------------------------------------------------
+
+    def get_recipe(self, recipe_id: int) -> dict[str, Any] | None:
+        def load() -> tuple[Any, frozenset[str]]:
+            recipe = self.dal.get_recipe_by_id(recipe_id)
+            if recipe is None:
+                return None, frozenset({recipe_tag(recipe_id)})
+            self._decorate([recipe])
+            return recipe, frozenset({recipe_tag(recipe_id), user_tag(recipe["authorId"])})
+
+        return self._read(f"recipe:{recipe_id}", load)
+
+    def get_recipe_page(
+        self, limit: int = 20, cursor: str | None = None, status: str | None = "published"
+    ) -> tuple[list[dict[str, Any]], str | None]:
+        def load() -> tuple[Any, frozenset[str]]:
+            recipes, following = self.dal.get_recipe_page(limit, cursor, status)
+            self._decorate(recipes)
+            tags = {LISTINGS} | {recipe_tag(r["id"]) for r in recipes} | {user_tag(r["authorId"]) for r in recipes}
+            return [recipes, following], frozenset(tags)
+
+        recipes, following = self._read(f"page:{status}:{limit}:{cursor}", load)
+        return recipes, following
+
+    def _decorate(self, recipes: list[dict[str, Any]]) -> None:
+        """Add review aggregates and author summaries with one IN query per table."""
+        ids = [r["id"] for r in recipes]
+        authors = sorted({r["authorId"] for r in recipes})
+        reviews: dict[int, tuple[int, float]] = {}
+        people: dict[int, dict[str, Any]] = {}
+        with self.dal.pool.connection() as db:
+            for i in range(0, len(ids), 500):
+                chunk = ids[i : i + 500]
+                for recipe_id, count, avg in db.query(
+                    f"SELECT recipe_id, COUNT(*), AVG(rating) FROM review "
+                    f"WHERE recipe_id IN ({', '.join('?' for _ in chunk)}) GROUP BY recipe_id",
+                    chunk,
+                ):
+                    reviews[recipe_id] = (int(count), round(float(avg), 2))
+            for i in range(0, len(authors), 500):
+                chunk = authors[i : i + 500]
+                for user_id, username, avatar in db.query(
+                    f"SELECT id, username, avatar_url FROM user WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+                ):
+                    people[user_id] = {"id": user_id, "username": username, "avatar": avatar}
+        for recipe in recipes:
+            recipe.pop("viewedBy", None)
+            recipe["reviewCount"], recipe["averageRating"] = reviews.get(recipe["id"], (0, 0.0))
+            recipe["author"] = people.get(recipe["authorId"])
+
+    def _read(self, key: str, load: Callable[[], tuple[Any, frozenset[str]]]) -> Any:
+        self._sync()
+        with self._lock:
+            value = self.local.get(key)
+            if value is not None:
+                self.metrics["hits"] += 1
+                return json.loads(value)
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                generation = dict(self._generation)
+        if not leader:
+            self.metrics["coalesced"] += 1
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return json.loads(flight.value)
+        try:
+            value = self._fill(key, load, generation)
+            flight.value = value
+            return json.loads(value)
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _fill(self, key: str, load: Callable[[], tuple[Any, frozenset[str]]], generation: dict[str, int]) -> bytes:
+        shared = self.shared.get(key) if self.shared else None
+        since = self.shared.seq() if self.shared else 0
+        if shared is not None:
+            self.metrics["shared_hits"] += 1
+            value, tags = shared
+        else:
+            self.metrics["misses"] += 1
+            started = time.perf_counter()
+            doc, tags = load()
+            self.metrics["load_ms"] += (time.perf_counter() - started) * 1000
+            value = json.dumps(doc, separators=(",", ":"), default=str).encode()
+        with self._lock:
+            if any(self._generation[t] != generation.get(t, 0) for t in tags | {ALL}):
+                self.metrics["stale_loads"] += 1
+                return value
+            self.local.put(key, value, tags)
+        if self.shared is not None and shared is None:
+            self.metrics["shared_evictions"] += self.shared.put(key, value, tags, since)
+        return value
+
+    # -- invalidation ----------------------------------------------------------
+
+    def _sync(self) -> None:
+        if self.shared is None or time.monotonic() - self._synced < SHARED_SYNC_SECONDS:
+            return
+        self._synced = time.monotonic()
+        self._drop(self.shared.changes())
+
+    def _drop(self, tags: list[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                self._generation[tag] += 1
+                self.metrics["invalidated"] += self.local.invalidate(tag)
+
+    def _invalidate(self, tags: list[str]) -> None:
+        self._drop(tags)
+        if self.shared is not None:
+            self.shared.invalidate(tags)
+
+    def invalidate_recipe(self, recipe_id: int, listings: bool = False) -> None:
+        self._invalidate([recipe_tag(recipe_id)] + ([LISTINGS] if listings else []))
+
+    def invalidate_user(self, user_id: int, listings: bool = False) -> None:
+        self._invalidate([user_tag(user_id)] + ([LISTINGS] if listings else []))
+
+    def on_write(self, table: str, row_id: int) -> None:
+        """Report a write made outside this cache: ``row_id`` is the user for ``user``, else the recipe."""
+        if table not in WRITE_TABLES:
+            raise ValueError(f"Unsupported table: {table}")
+        if table == "user":
+            self.invalidate_user(row_id, listings=WRITE_TABLES[table])
+        else:
+            self.invalidate_recipe(row_id, listings=WRITE_TABLES[table])
+
+    # -- writes ----------------------------------------------------------------
+
+    def save_user(self, user: dict[str, Any]) -> int:
+        user_id = self.dal.save_user(user)
+        self.invalidate_user(user_id)
+        return user_id
+
+    def delete_user(self, user_id: int) -> None:
+        self.dal.delete_user(user_id)
+        self.invalidate_user(user_id, listings=True)
+
+    def save_recipe(self, recipe: dict[str, Any]) -> int:
+        recipe_id = self.dal.save_recipe(recipe)
+        self.invalidate_recipe(recipe_id, listings=True)
+        return recipe_id
+
+    def delete_recipe(self, recipe_id: int) -> None:
+        self.dal.delete_recipe(recipe_id)
+        self.invalidate_recipe(recipe_id, listings=True)
+
+    def add_review(self, review: dict[str, Any]) -> None:
+        self.dal.add_review(review)
+        self.invalidate_recipe(review["recipeId"])
+
+    def delete_review(self, review_id: int) -> None:
+        with self.dal.pool.connection() as db:
+            recipe_id = db.scalar("SELECT recipe_id FROM review WHERE id = ?", (review_id,))
+        self.dal.delete_review(review_id)
+        if recipe_id is not None:
+            self.invalidate_recipe(recipe_id)
+
+    def toggle_like(self, user_id: int, recipe_id: int) -> dict[str, Any]:
+        result = self.dal.toggle_like(user_id, recipe_id)
+        self.invalidate_recipe(recipe_id)
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.metrics["hits"] + self.metrics["shared_hits"] + self.metrics["misses"]
+        return (
+            dict(self.metrics)
+            | {
+                "entries": len(self.local),
+                "bytes": self.local.size,
+                "hit_ratio": round(self.metrics["hits"] / lookups, 4) if lookups else 0.0,
+            }
+            | (self.shared.stats() if self.shared is not None else {})
+        )
+
+    def close(self) -> None:
+        if self.shared is not None:
+            self.shared.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Read-through recipe cache demo with metrics")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--shared", type=Path, help="SQLite file for the shared local tier")
+    parser.add_argument("--max-mb", type=int, default=64)
+    parser.add_argument("--shared-max-mb", type=int, default=SHARED_MAX_BYTES >> 20)
+    parser.add_argument("--reads", type=int, default=10_000)
+    args = parser.parse_args()
+
+    if args.db:
+        pool = ConnectionPool.from_url(args.db)
+    else:
+        standin = sqlite_standin()
+        pool = ConnectionPool(lambda: standin, size=1)
+    dal = StorageDAL(pool)
+    cache = RecipeCache(dal, args.max_mb << 20, args.shared, args.shared_max_mb << 20)
+    ids = [r["id"] for r in dal.get_recipes()]
+    started = time.perf_counter()
+    for i in range(args.reads):
+        cache.get_recipe(ids[i % len(ids)])
+        if i % 10 == 0:
+            cache.get_recipe_page(10)
+        if i % 1000 == 999:
+            cache.toggle_like(1, ids[i % len(ids)])
+    elapsed = time.perf_counter() - started
+    print(f"{args.reads} reads in {elapsed:.2f}s ({args.reads / elapsed:.0f}/s)")
+    print(json.dumps(cache.stats(), indent=2))
+    cache.close()
+    pool.close()
+
+
+if __name__ == "__main__":
+    main()
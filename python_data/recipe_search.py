@@ -0,0 +1,488 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+import re
+import shutil
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from db import Database, connect, sqlite_standin
+
+# BM25F field weights: a title hit counts three times a description hit.
+FIELD_WEIGHTS = {"title": 3.0, "category": 2.0, "ingredients": 1.5, "description": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+PARTIAL_MATCH_WEIGHT = 0.7
+RATING_WEIGHT = 0.5
+VIEWS_WEIGHT = 0.3
+MAX_TERM_LENGTH = 32
+
+STOPWORDS = frozenset({"a", "an", "and", "the", "of", "with", "in", "for", "to", "on", "or", "at", "by"})
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def stem(word: str) -> str:
+    """Light suffix stripper: plurals plus -ing/-ed when a 4+ letter stem remains."""
+    for suffix, repl in (("sses", "ss"), ("ies", "y"), ("oes", "o"), ("ing", ""), ("ed", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 + (suffix in ("ing", "ed")):
+            return word[: -len(suffix)] + repl
+    if word.endswith("s") and not word.endswith(("ss", "us")) and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def tokenize(text: str | None) -> list[str]:
+    return [t[:MAX_TERM_LENGTH] for t in _TOKEN.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+def analyse(text: str | None) -> list[str]:
+    return [stem(t) for t in tokenize(text)]
+
+
+def trigrams(term: str) -> set[str]:
+    return {term[i : i + 3] for i in range(len(term) - 2)}
+
+
+@dataclass(frozen=True)
+class RecipeDocument:
+    recipe_id: int
+    title: str
+    description: str
+    category: str
+    ingredients: tuple[str, ...]
+    avg_rating: float
+    view_count: int
+
+    def field_terms(self) -> dict[str, list[str]]:
+        return {
+            "title": analyse(self.title),
+            "category": analyse(self.category),
+            "ingredients": [t for name in self.ingredients for t in analyse(name)],
+            "description": analyse(self.description),
+        }
+
+
+def fetch_documents(
+    db: Database, recipe_ids: Iterable[int] | None = None, batch_size: int = 500
+) -> Iterator[RecipeDocument]:
+    """Load published recipes with their ingredient names and engagement stats.
+
+    Child rows are fetched with one ``IN (...)`` query per batch rather than
+    per recipe; without ``recipe_ids`` the table is walked by keyset on ``id``.
+    """
+
+    def batches() -> Iterator[list[tuple]]:
+        if recipe_ids is not None:
+            ids = sorted(set(recipe_ids))
+            for i in range(0, len(ids), batch_size):
+                chunk = ids[i : i + batch_size]
+                marks = ", ".join("?" for _ in chunk)
+                yield db.query(
+                    "SELECT id, title, description, category FROM recipe "
+                    f"WHERE status = 'published' AND id IN ({marks}) ORDER BY id",
+                    chunk,
+                )
+            return
+        last = 0
+        while True:
+            rows = db.query(
+                "SELECT id, title, description, category FROM recipe "
+                "WHERE status = 'published' AND id > ? ORDER BY id LIMIT ?",
+                (last, batch_size),
+            )
+            if not rows:
+                return
+            yield rows
+            last = rows[-1][0]
+
+    for rows in batches():
+        if not rows:
+            continue
+        ids = [r[0] for r in rows]
+        marks = ", ".join("?" for _ in ids)
+        ingredients: dict[int, list[str]] = defaultdict(list)
+        for recipe_id, name in db.query(
+            f"SELECT recipe_id, name FROM ingredient WHERE recipe_id IN ({marks}) ORDER BY recipe_id, sort_order",
+            ids,
+        ):
+            ingredients[recipe_id].append(name)
+        ratings = dict(
+            db.query(f"SELECT recipe_id, AVG(rating) FROM review WHERE recipe_id IN ({marks}) GROUP BY recipe_id", ids)
+        )
+        views = dict(
+            db.query(f"SELECT recipe_id, COUNT(*) FROM recipe_view WHERE recipe_id IN ({marks}) GROUP BY recipe_id", ids)
+        )
+        for recipe_id, title, description, category in rows:
+            yield RecipeDocument(
+                recipe_id=int(recipe_id),
+                title=title or "",
+                description=description or "",
+                category=category or "",
+                ingredients=tuple(ingredients.get(recipe_id, ())),
+                avg_rating=float(ratings.get(recipe_id) or 0.0),
+                view_count=int(views.get(recipe_id) or 0),
+            )
+
+
+class _Segment:
+    """Immutable, memory-mapped postings written by ``RecipeSearchIndex.save``.
+
+    Terms are sorted so a lookup is one binary search; postings for term ``i``
+    live in ``post_docs[offsets[i]:offsets[i + 1]]`` (CSR layout).
+    """
+
+    FILES = ("terms", "offsets", "post_docs", "post_tf", "doc_ids", "doc_len", "doc_rating", "doc_views")
+
+    def __init__(self, path: Path) -> None:
+        for name in self.FILES:
+            setattr(self, name, np.load(path / f"{name}.npy", mmap_mode="r"))
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray]:
+        i = int(np.searchsorted(self.terms, term))
+        if i >= len(self.terms) or self.terms[i] != term:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        lo, hi = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.post_docs[lo:hi], self.post_tf[lo:hi]
+
+    def doc_position(self, recipe_id: int) -> int:
+        i = int(np.searchsorted(self.doc_ids, recipe_id))
+        return i if i < len(self.doc_ids) and self.doc_ids[i] == recipe_id else -1
+
+
+class RecipeSearchIndex:
+    """BM25F inverted index over recipe title, description, category and ingredients.
+
+    A saved index is a read-only memory-mapped segment; later updates go to an
+    in-memory delta plus a set of tombstoned segment documents, and ``save``
+    merges both back into a fresh segment.
+    """
+
+    def __init__(self) -> None:
+        self._segment: _Segment | None = None
+        self._removed: set[int] = set()
+        self._postings: dict[str, dict[int, float]] = defaultdict(dict)
+        self._docs: dict[int, tuple[float, float, int]] = {}  # id -> (length, rating, views)
+        self._doc_terms: dict[int, tuple[str, ...]] = {}
+        self._doc_count = 0
+        self._total_len = 0.0
+        self._trigrams: dict[str, set[str]] | None = None
+
+    # -- building -------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._doc_count
+
+    def __contains__(self, recipe_id: int) -> bool:
+        if recipe_id in self._docs:
+            return True
+        return (
+            self._segment is not None
+            and recipe_id not in self._removed
+            and self._segment.doc_position(recipe_id) >= 0
+        )
+
+    def add(self, doc: RecipeDocument) -> None:
+        self.remove(doc.recipe_id)
+        weighted: dict[str, float] = defaultdict(float)
+        length = 0.0
+        for field, terms in doc.field_terms().items():
+            weight = FIELD_WEIGHTS[field]
+            length += weight * len(terms)
+            for term in terms:
+                weighted[term] += weight
+        for term, tf in weighted.items():
+            if self._trigrams is not None and term not in self._postings:
+                for gram in trigrams(term):
+                    self._trigrams.setdefault(gram, set()).add(term)
+            self._postings[term][doc.recipe_id] = tf
+        self._docs[doc.recipe_id] = (length, doc.avg_rating, doc.view_count)
+        self._doc_terms[doc.recipe_id] = tuple(weighted)
+        self._doc_count += 1
+        self._total_len += length
+
+    def remove(self, recipe_id: int) -> bool:
+        if recipe_id in self._docs:
+            length = self._docs.pop(recipe_id)[0]
+            for term in self._doc_terms.pop(recipe_id):
+                del self._postings[term][recipe_id]
+            self._doc_count -= 1
+            self._total_len -= length
+            return True
+        if self._segment is not None and recipe_id not in self._removed:
+            pos = self._segment.doc_position(recipe_id)
+            if pos >= 0:
+                self._removed.add(recipe_id)
+                self._doc_count -= 1
+                self._total_len -= float(self._segment.doc_len[pos])
+                return True
+        return False
+
+    def build(self, docs: Iterable[RecipeDocument]) -> "RecipeSearchIndex":
+        for doc in docs:
+            self.add(doc)
+        return self
+
+    def apply_event(self, db: Database, event: str, recipe_id: int) -> None:
+        """Keep the index in step with recipe create/edit/approve/reject/delete.
+
+        Anything other than a delete re-reads the recipe: only published
+        recipes are searchable, so an edit that sends a recipe back to
+        ``pending`` drops it from the index.
+        """
+        if event == "delete":
+            self.remove(recipe_id)
+            return
+        docs = list(fetch_documents(db, [recipe_id]))
+        if docs:
+            self.add(docs[0])
+        else:
+            self.remove(recipe_id)
+
+    # -- querying -------------------------------------------------------
+
+    def _vocabulary(self) -> Iterator[str]:
+        if self._segment is not None:
+            yield from (str(t) for t in self._segment.terms)
+        yield from (t for t, docs in self._postings.items() if docs)
+
+    def _expand(self, raw: str) -> dict[str, float]:
+        """Index terms matched by one query token: exact stem plus substrings."""
+        exact = stem(raw)
+        matches = {exact: 1.0}
+        if len(raw) >= 3:
+            if self._trigrams is None:
+                self._trigrams = {}
+                for term in set(self._vocabulary()):
+                    for gram in trigrams(term):
+                        self._trigrams.setdefault(gram, set()).add(term)
+            grams = [self._trigrams.get(g, set()) for g in trigrams(raw)]
+            candidates = set.intersection(*grams) if grams else set()
+        else:
+            candidates = {t for t in self._vocabulary() if t.startswith(raw)}
+        for term in candidates:
+            if raw in term and term != exact:
+                matches.setdefault(term, PARTIAL_MATCH_WEIGHT)
+        return matches
+
+    def _term_postings(self, term: str) -> dict[int, float]:
+        found: dict[int, float] = {}
+        if self._segment is not None:
+            ids, tfs = self._segment.postings(term)
+            for recipe_id, tf in zip(ids.tolist(), tfs.tolist()):
+                if recipe_id not in self._removed:
+                    found[recipe_id] = tf
+        found.update(self._postings.get(term, {}))
+        return found
+
+    def _doc_stats(self, recipe_id: int) -> tuple[float, float, int]:
+        if recipe_id in self._docs:
+            return self._docs[recipe_id]
+        seg = self._segment
+        pos = seg.doc_position(recipe_id)
+        return float(seg.doc_len[pos]), float(seg.doc_rating[pos]), int(seg.doc_views[pos])
+
+    def search(self, query: str, limit: int = 20) -> list[tuple[int, float]]:
+        """Return ``(recipe_id, score)`` for recipes matching every query token."""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._doc_count:
+            return []
+        avgdl = self._total_len / self._doc_count
+        stats: dict[int, tuple[float, float, int]] = {}
+        totals: dict[int, float] | None = None
+        for raw in tokens:
+            per_doc: dict[int, float] = {}
+            for term, weight in self._expand(raw).items():
+                postings = self._term_postings(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (self._doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for recipe_id, tf in postings.items():
+                    if totals is not None and recipe_id not in totals:
+                        continue
+                    if recipe_id not in stats:
+                        stats[recipe_id] = self._doc_stats(recipe_id)
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * stats[recipe_id][0] / avgdl)
+                    score = weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+                    if score > per_doc.get(recipe_id, 0.0):
+                        per_doc[recipe_id] = score
+            if totals is None:
+                totals = per_doc
+            else:
+                totals = {d: totals[d] + s for d, s in per_doc.items()}
+            if not totals:
+                return []
+        max_views = max((stats[d][2] for d in totals), default=0)
+        view_norm = math.log1p(max_views) or 1.0
+        ranked = [
+            (d, s + RATING_WEIGHT * stats[d][1] / 5.0 + VIEWS_WEIGHT * math.log1p(stats[d][2]) / view_norm)
+            for d, s in totals.items()
+        ]
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked[:limit]
+
+    # -- persistence ----------------------------------------------------
+
+    def save(self, path: Path) -> None:
+        """Merge segment and delta into a new segment directory, then swap it in."""
+        postings: dict[str, dict[int, float]] = defaultdict(dict)
+        for term in set(self._vocabulary()):
+            found = self._term_postings(term)
+            if found:
+                postings[term] = found
+        doc_ids = sorted(self._docs)
+        if self._segment is not None:
+            doc_ids = sorted(set(doc_ids) | {int(d) for d in self._segment.doc_ids if int(d) not in self._removed})
+        stats = np.array([self._doc_stats(d) for d in doc_ids], dtype=np.float64).reshape(-1, 3)
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(postings[t]) for t in terms], out=offsets[1:])
+        post_docs = np.empty(offsets[-1], dtype=np.int64)
+        post_tf = np.empty(offsets[-1], dtype=np.float32)
+        for i, term in enumerate(terms):
+            items = sorted(postings[term].items())
+            post_docs[offsets[i] : offsets[i + 1]] = [d for d, _ in items]
+            post_tf[offsets[i] : offsets[i + 1]] = [tf for _, tf in items]
+        arrays = {
+            "terms": np.array(terms, dtype=f"<U{MAX_TERM_LENGTH}"),
+            "offsets": offsets,
+            "post_docs": post_docs,
+            "post_tf": post_tf,
+            "doc_ids": np.array(doc_ids, dtype=np.int64),
+            "doc_len": stats[:, 0].astype(np.float32),
+            "doc_rating": stats[:, 1].astype(np.float32),
+            "doc_views": stats[:, 2].astype(np.int64),
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+        for name, arr in arrays.items():
+            np.save(tmp / f"{name}.npy", arr)
+        meta = {"docs": len(doc_ids), "total_len": float(stats[:, 0].sum()), "terms": len(terms)}
+        (tmp / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        self._segment = None  # release the old mmaps before replacing their files
+        shutil.rmtree(path, ignore_errors=True)
+        tmp.rename(path)
+        self._load_segment(path)
+
+    def _load_segment(self, path: Path) -> None:
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        self._segment = _Segment(path)
+        self._removed = set()
+        self._postings = defaultdict(dict)
+        self._docs = {}
+        self._doc_terms = {}
+        self._doc_count = meta["docs"]
+        self._total_len = meta["total_len"]
+        self._trigrams = None
+
+    @classmethod
+    def load(cls, path: Path) -> "RecipeSearchIndex":
+        index = cls()
+        index._load_segment(path)
+        return index
+
+
+# QUERY 4 of 09_common_queries.sql against the 02_create_tables.sql columns,
+# extended to ingredient names so both sides search the same fields.
+LIKE_SEARCH_SQL = """
+    SELECT r.id, r.title,
+           (SELECT COUNT(*) FROM recipe_view WHERE recipe_id = r.id) AS view_count,
+           (SELECT COUNT(*) FROM like_record WHERE recipe_id = r.id) AS like_count
+    FROM recipe r
+    WHERE r.status = 'published'
+      AND (r.title LIKE ? OR r.description LIKE ? OR r.category LIKE ?
+           OR EXISTS (SELECT 1 FROM ingredient i WHERE i.recipe_id = r.id AND i.name LIKE ?))
+    ORDER BY like_count DESC, view_count DESC"""
+
+_WORDS = {
+    "dish": ["pasta", "curry", "salad", "soup", "stew", "taco", "burger", "risotto", "pie", "noodle", "wrap", "cake"],
+    "adjective": ["spicy", "creamy", "crispy", "smoky", "zesty", "hearty", "quick", "classic", "roasted", "grilled"],
+    "ingredient": [
+        "chicken", "beef", "tofu", "salmon", "garlic", "basil", "lemon", "tomato", "mushroom",
+        "spinach", "chickpea", "coconut", "ginger", "potato", "cheese", "rice", "egg", "onion",
+    ],
+    "category": ["Italian", "Asian", "Dinner", "Lunch", "Breakfast", "Dessert", "Mexican", "Vegan"],
+}
+
+
+def populate_synthetic(db: Database, n_recipes: int, seed: int = 7) -> None:
+    """Fill an empty stand-in with ``n_recipes`` generated published recipes."""
+    rng = random.Random(seed)
+    with db.transaction():
+        db.execute(
+            "INSERT INTO user (id, username, first_name, last_name, email, password_hash, role, status) "
+            "VALUES (1, 'Bench User', 'Bench', 'User', 'bench@cookhub.com', 'x', 'user', 'active')"
+        )
+        recipes, ingredients = [], []
+        for rid in range(1, n_recipes + 1):
+            adj, main, dish = rng.choice(_WORDS["adjective"]), rng.choice(_WORDS["ingredient"]), rng.choice(_WORDS["dish"])
+            extras = rng.sample(_WORDS["ingredient"], 4)
+            title = f"{adj.title()} {main.title()} {dish.title()}"
+            description = f"A {adj} {dish} with {main}, {extras[0]} and {extras[1]} for any night of the week."
+            recipes.append((rid, title, description, rng.choice(_WORDS["category"]), 1, "published"))
+            ingredients += [(rid, name.title(), i) for i, name in enumerate([main] + extras)]
+        db.executemany(
+            "INSERT INTO recipe (id, title, description, category, author_id, status) VALUES (?, ?, ?, ?, ?, ?)",
+            recipes,
+        )
+        db.executemany("INSERT INTO ingredient (recipe_id, name, sort_order) VALUES (?, ?, ?)", ingredients)
+
+
+def benchmark(n_recipes: int = 20_000, queries: tuple[str, ...] = ("chicken", "creamy", "coconut curry", "mush")) -> None:
+    db = sqlite_standin(seed=False)
+    populate_synthetic(db, n_recipes)
+
+    started = time.perf_counter()
+    index = RecipeSearchIndex().build(fetch_documents(db))
+    build_s = time.perf_counter() - started
+    print(f"recipes={n_recipes} index_build={build_s:.2f}s terms={len(set(index._vocabulary()))}")
+    print(f"{'query':<16}{'LIKE ms':>10}{'index ms':>10}{'LIKE rows':>11}{'index rows':>12}")
+    for query in queries:
+        pattern = f"%{query}%"
+        started = time.perf_counter()
+        like_rows = db.query(LIKE_SEARCH_SQL, (pattern,) * 4)
+        like_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        hits = index.search(query, limit=n_recipes)
+        index_ms = (time.perf_counter() - started) * 1000
+        print(f"{query:<16}{like_ms:>10.1f}{index_ms:>10.1f}{len(like_rows):>11}{len(hits):>12}")
+    db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inverted-index recipe search")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--index", type=Path, default=Path(__file__).parent / "out" / "search_index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="Index all published recipes and save the segment")
+    search = sub.add_parser("search", help="Query a saved index")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+    bench = sub.add_parser("benchmark", help="Compare against the LIKE query on synthetic data")
+    bench.add_argument("--recipes", type=int, default=20_000)
+    args = parser.parse_args()
+
+    if args.command == "benchmark":
+        benchmark(args.recipes)
+    elif args.command == "build":
+        db = connect(args.db) if args.db else sqlite_standin()
+        index = RecipeSearchIndex().build(fetch_documents(db))
+        index.save(args.index)
+        print(f"indexed {len(index)} recipes into {args.index}")
+        db.close()
+    else:
+        index = RecipeSearchIndex.load(args.index)
+        for recipe_id, score in index.search(args.query, args.limit):
+            print(f"{recipe_id}\t{score:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from db import Database, connect, format_datetime, sqlite_standin, to_datetime
+
+# Interaction weights before time decay. Reviews only count when positive:
+# 4 stars -> 1.5, 5 stars -> 3.0.
+LIKE_WEIGHT = 3.0
+FAVORITE_WEIGHT = 4.0
+VIEW_WEIGHT = 1.0
+REVIEW_WEIGHT_PER_STAR = 1.5
+HALF_LIFE_DAYS = 90.0
+TOP_K = 20
+
+# source table -> (statement yielding id, user_id, recipe_id, timestamp, weight; base weight)
+INTERACTION_SQL: dict[str, tuple[str, float]] = {
+    "like_record": ("SELECT id, user_id, recipe_id, created_at, ? FROM like_record WHERE id > ? ORDER BY id", LIKE_WEIGHT),
+    "favorite": ("SELECT id, user_id, recipe_id, created_at, ? FROM favorite WHERE id > ? ORDER BY id", FAVORITE_WEIGHT),
+    "recipe_view": ("SELECT id, user_id, recipe_id, viewed_at, ? FROM recipe_view WHERE id > ? ORDER BY id", VIEW_WEIGHT),
+    "review": (
+        "SELECT id, user_id, recipe_id, created_at, (rating - 3) * ? FROM review "
+        "WHERE rating >= 4 AND id > ? ORDER BY id",
+        REVIEW_WEIGHT_PER_STAR,
+    ),
+}
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS recipe_similar (
+    recipe_id         INT NOT NULL,
+    rank_no           INT NOT NULL,
+    similar_recipe_id INT NOT NULL,
+    score             DOUBLE NOT NULL,
+    PRIMARY KEY (recipe_id, rank_no)
+)"""
+
+
+def _ranges(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenation of ``arange(s, s + c)`` for every (start, count) pair."""
+    counts = counts.astype(np.int64)
+    if counts.sum() == 0:
+        return np.empty(0, dtype=np.int64)
+    offsets = np.repeat(starts.astype(np.int64) - np.cumsum(counts) + counts, counts)
+    return offsets + np.arange(counts.sum(), dtype=np.int64)
+
+
+def read_interactions(
+    db: Database,
+    ref: datetime,
+    since: dict[str, int] | None = None,
+    tables: tuple[str, ...] = tuple(INTERACTION_SQL),
+    chunk_size: int = 50_000,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, dict[str, int]]:
+    """Stream likes, favorites, views and positive reviews as decayed COO triples.
+
+    Weights decay towards ``ref``. Returns ``(user_ids, recipe_ids, weights,
+    watermarks)``; ``watermarks`` holds the highest id read per source table
+    so later runs can resume.
+    """
+    since = dict(since or {})
+    users, items, weights = [], [], []
+    for table in tables:
+        sql, weight = INTERACTION_SQL[table]
+        last = since.get(table, 0)
+        for rows in db.stream(sql, (weight, last), chunk_size):
+            ages = np.array(
+                [(ref - (to_datetime(r[3]) or ref)).total_seconds() / 86400.0 for r in rows], dtype=np.float64
+            )
+            users.append(np.array([r[1] for r in rows], dtype=np.int64))
+            items.append(np.array([r[2] for r in rows], dtype=np.int64))
+            weights.append(np.array([float(r[4]) for r in rows]) * np.power(0.5, ages / HALF_LIFE_DAYS))
+            last = rows[-1][0]
+        since[table] = int(last)
+    empty = np.empty(0, dtype=np.int64)
+    return (
+        np.concatenate(users) if users else empty,
+        np.concatenate(items) if items else empty,
+        np.concatenate(weights) if weights else np.empty(0, dtype=np.float64),
+        since,
+    )
+
+
+class InteractionMatrix:
+    """Item x user matrix with L2-normalised item rows, kept in both CSR orders.
+
+    Item-major rows give a recipe's users; user-major rows give a user's
+    recipes. Together they compute one block of ``X @ X.T`` (cosine
+    similarity) without SciPy. The raw COO triples are kept too, so
+    incremental updates can append to them and rebuild.
+    """
+
+    FILES = (
+        "coo_users", "coo_items", "coo_weights",
+        "item_ids", "item_indptr", "item_users", "item_data",
+        "user_indptr", "user_items", "user_data",
+    )
+
+    def __init__(self, arrays: dict[str, np.ndarray], meta: dict) -> None:
+        for name in self.FILES:
+            setattr(self, name, arrays[name])
+        self.meta = meta
+
+    @property
+    def n_items(self) -> int:
+        return len(self.item_ids)
+
+    @classmethod
+    def from_coo(cls, users: np.ndarray, items: np.ndarray, weights: np.ndarray, meta: dict) -> "InteractionMatrix":
+        item_ids, item_idx = np.unique(items, return_inverse=True)
+        user_ids, user_idx = np.unique(users, return_inverse=True)
+        n_users = max(len(user_ids), 1)
+        keys, inverse = np.unique(item_idx * n_users + user_idx, return_inverse=True)
+        values = np.bincount(inverse, weights=weights, minlength=len(keys))
+        rows, cols = keys // n_users, keys % n_users
+        norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(item_ids)))
+        data = values / np.where(norms[rows] > 0, norms[rows], 1.0)
+        by_user = np.lexsort((rows, cols))
+        arrays = {
+            "coo_users": users,
+            "coo_items": items,
+            "coo_weights": weights,
+            "item_ids": item_ids,
+            "item_indptr": np.r_[0, np.cumsum(np.bincount(rows, minlength=len(item_ids)))],
+            "item_users": cols,
+            "item_data": data,
+            "user_indptr": np.r_[0, np.cumsum(np.bincount(cols, minlength=len(user_ids)))],
+            "user_items": rows[by_user],
+            "user_data": data[by_user],
+        }
+        return cls(arrays, meta)
+
+    def save(self, path: Path) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        for name in self.FILES:
+            np.save(path / f"{name}.npy", getattr(self, name))
+        (path / "meta.json").write_text(json.dumps(self.meta), encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Path) -> "InteractionMatrix":
+        arrays = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in cls.FILES}
+        return cls(arrays, json.loads((path / "meta.json").read_text(encoding="utf-8")))
+
+    def top_k(self, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top-``k`` cosine neighbours (item indices, -1 padded) for ``rows``."""
+        n = self.n_items
+        counts = self.item_indptr[rows + 1] - self.item_indptr[rows]
+        local = np.repeat(np.arange(len(rows)), counts)
+        pos = _ranges(self.item_indptr[rows], counts)
+        users, w = self.item_users[pos], self.item_data[pos]
+        ucounts = self.user_indptr[users + 1] - self.user_indptr[users]
+        upos = _ranges(self.user_indptr[users], ucounts)
+        cells = np.repeat(local, ucounts) * n + self.user_items[upos]
+        values = np.repeat(w, ucounts) * self.user_data[upos]
+        dense = np.bincount(cells, weights=values, minlength=len(rows) * n).reshape(len(rows), n)
+        dense[np.arange(len(rows)), rows] = 0.0
+        kk = min(k, n - 1)
+        if kk <= 0:
+            return np.full((len(rows), k), -1, dtype=np.int64), np.zeros((len(rows), k), dtype=np.float32)
+        idx = np.argpartition(-dense, kk - 1, axis=1)[:, :kk]
+        top = np.take_along_axis(dense, idx, axis=1)
+        order = np.argsort(-top, axis=1, kind="stable")
+        idx, top = np.take_along_axis(idx, order, axis=1), np.take_along_axis(top, order, axis=1)
+        idx = np.where(top > 0, idx, -1)
+        pad = k - kk
+        return (
+            np.pad(idx, ((0, 0), (0, pad)), constant_values=-1),
+            np.pad(top, ((0, 0), (0, pad))).astype(np.float32),
+        )
+
+
+def _block_worker(matrix_dir: str, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Runs in a worker process: the matrix is memory-mapped, not pickled.
+    matrix = InteractionMatrix.load(Path(matrix_dir))
+    idx, scores = matrix.top_k(rows, k)
+    return rows, idx, scores
+
+
+class NeighbourStore:
+    """Memory-mapped top-K lists: row ``i`` holds the neighbours of ``item_ids[i]``."""
+
+    def __init__(self, item_ids: np.ndarray, neighbours: np.ndarray, scores: np.ndarray) -> None:
+        self.item_ids, self.neighbours, self.scores = item_ids, neighbours, scores
+
+    @classmethod
+    def load(cls, path: Path) -> "NeighbourStore":
+        return cls(*(np.load(path / f"{name}.npy", mmap_mode="r") for name in ("item_ids", "neighbours", "scores")))
+
+    def save(self, path: Path) -> None:
+        path.mkdir(parents=True, exist_ok=True)
+        for name in ("item_ids", "neighbours", "scores"):
+            np.save(path / f"{name}.npy", np.asarray(getattr(self, name)))
+
+    def similar(self, recipe_id: int, limit: int = 10) -> list[tuple[int, float]]:
+        i = int(np.searchsorted(self.item_ids, recipe_id))
+        if i >= len(self.item_ids) or self.item_ids[i] != recipe_id:
+            return []
+        return [
+            (int(n), float(s)) for n, s in zip(self.neighbours[i], self.scores[i]) if n >= 0
+        ][:limit]
+
+
+class SimilarityBuilder:
+    """Builds ``recipe_similar`` from like/favorite/review/view co-engagement.
+
+    ``build`` recomputes every list in blocks spread over worker processes.
+    ``update`` folds in likes added since the last run: it recomputes the
+    lists of the newly liked recipes and offers each of them to its
+    neighbours' lists, so similarity stays symmetric without a full rebuild.
+    Scores of untouched pairs are not refreshed and weights keep decaying
+    towards the original build time, so a periodic ``build`` is still needed.
+    """
+
+    def __init__(
+        self, db: Database, out_dir: Path, top_k: int = TOP_K, block_size: int = 256, workers: int | None = None
+    ) -> None:
+        self.db = db
+        self.out_dir = out_dir
+        self.top_k = top_k
+        self.block_size = block_size
+        self.workers = workers or os.cpu_count() or 1
+
+    @property
+    def matrix_dir(self) -> Path:
+        return self.out_dir / "matrix"
+
+    @property
+    def store_dir(self) -> Path:
+        return self.out_dir / "neighbours"
+
+    def _compute(self, matrix: InteractionMatrix, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        idx = np.full((len(rows), self.top_k), -1, dtype=np.int64)
+        scores = np.zeros((len(rows), self.top_k), dtype=np.float32)
+        # Bound each block's dense scratch matrix to roughly 4M cells.
+        block = max(1, min(self.block_size, 4_000_000 // max(matrix.n_items, 1)))
+        blocks = [rows[i : i + block] for i in range(0, len(rows), block)]
+        where = {int(r): i for i, r in enumerate(rows)}
+        if self.workers > 1 and len(blocks) > 1:
+            with ProcessPoolExecutor(self.workers) as pool:
+                results = list(
+                    pool.map(_block_worker, [str(self.matrix_dir)] * len(blocks), blocks, [self.top_k] * len(blocks))
+                )
+        else:
+            results = [(b, *matrix.top_k(b, self.top_k)) for b in blocks]
+        for block_rows, block_idx, block_scores in results:
+            at = [where[int(r)] for r in block_rows]
+            idx[at], scores[at] = block_idx, block_scores
+        return idx, scores
+
+    def build(self, now: datetime | None = None) -> NeighbourStore:
+        ref = now or datetime.now()
+        users, items, weights, marks = read_interactions(self.db, ref)
+        meta = {"ref": format_datetime(ref), "watermarks": marks}
+        shutil.rmtree(self.matrix_dir, ignore_errors=True)
+        InteractionMatrix.from_coo(users, items, weights, meta).save(self.matrix_dir)
+        matrix = InteractionMatrix.load(self.matrix_dir)
+        idx, scores = self._compute(matrix, np.arange(matrix.n_items))
+        store = NeighbourStore(
+            np.asarray(matrix.item_ids), np.where(idx >= 0, matrix.item_ids[np.maximum(idx, 0)], -1), scores
+        )
+        store.save(self.store_dir)
+        self._publish(store, None)
+        return store
+
+    def update(self) -> list[int]:
+        """Apply likes recorded since the last build/update; returns touched recipe ids."""
+        old = InteractionMatrix.load(self.matrix_dir)
+        ref = to_datetime(old.meta["ref"])
+        marks = dict(old.meta["watermarks"])
+        users, items, weights, marks = read_interactions(self.db, ref, marks, ("like_record",))
+        if not len(items):
+            return []
+        matrix = InteractionMatrix.from_coo(
+            np.r_[old.coo_users, users],
+            np.r_[old.coo_items, items],
+            np.r_[old.coo_weights, weights],
+            {"ref": old.meta["ref"], "watermarks": marks},
+        )
+        del old
+        matrix.save(self.matrix_dir)
+        matrix = InteractionMatrix.load(self.matrix_dir)
+
+        previous = NeighbourStore.load(self.store_dir)
+        lists: dict[int, dict[int, float]] = {
+            int(rid): {int(n): float(s) for n, s in zip(ns, ss) if n >= 0}
+            for rid, ns, ss in zip(previous.item_ids, previous.neighbours, previous.scores)
+        }
+        del previous
+        touched = sorted(set(items.tolist()))
+        rows = np.searchsorted(matrix.item_ids, touched)
+        idx, scores = self._compute(matrix, rows)
+        changed = set(touched)
+        for rid, ns, ss in zip(touched, idx, scores):
+            fresh = {int(matrix.item_ids[n]): float(s) for n, s in zip(ns, ss) if n >= 0}
+            lists[rid] = fresh
+            for other, score in fresh.items():
+                entry = lists.setdefault(other, {})
+                entry[rid] = score
+                if len(entry) > self.top_k:
+                    del entry[min(entry, key=entry.get)]
+                changed.add(other)
+
+        item_ids = np.asarray(matrix.item_ids)
+        neighbours = np.full((len(item_ids), self.top_k), -1, dtype=np.int64)
+        out_scores = np.zeros((len(item_ids), self.top_k), dtype=np.float32)
+        for i, rid in enumerate(item_ids.tolist()):
+            ranked = sorted(lists.get(rid, {}).items(), key=lambda e: (-e[1], e[0]))[: self.top_k]
+            if ranked:
+                neighbours[i, : len(ranked)] = [n for n, _ in ranked]
+                out_scores[i, : len(ranked)] = [s for _, s in ranked]
+        store = NeighbourStore(item_ids, neighbours, out_scores)
+        store.save(self.store_dir)
+        self._publish(store, sorted(changed))
+        return sorted(changed)
+
+    def _publish(self, store: NeighbourStore, recipe_ids: list[int] | None) -> None:
+        db = self.db
+        rows = np.arange(len(store.item_ids)) if recipe_ids is None else np.searchsorted(store.item_ids, recipe_ids)
+        with db.transaction():
+            db.execute(SCHEMA)
+            if recipe_ids is None:
+                db.execute("DELETE FROM recipe_similar")
+            else:
+                for i in range(0, len(recipe_ids), 500):
+                    chunk = recipe_ids[i : i + 500]
+                    db.execute(
+                        f"DELETE FROM recipe_similar WHERE recipe_id IN ({', '.join('?' for _ in chunk)})", chunk
+                    )
+            batch = []
+            for i in rows.tolist():
+                rid = int(store.item_ids[i])
+                for rank, (n, s) in enumerate(zip(store.neighbours[i], store.scores[i]), start=1):
+                    if n >= 0:
+                        batch.append((rid, rank, int(n), float(s)))
+                if len(batch) >= 5000:
+                    db.executemany(
+                        "INSERT INTO recipe_similar (recipe_id, rank_no, similar_recipe_id, score) VALUES (?, ?, ?, ?)",
+                        batch,
+                    )
+                    batch = []
+            db.executemany(
+                "INSERT INTO recipe_similar (recipe_id, rank_no, similar_recipe_id, score) VALUES (?, ?, ?, ?)", batch
+            )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Precompute 'more like this' recipe neighbours")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--out", type=Path, default=Path(__file__).parent / "out" / "similarity")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--update", action="store_true", help="Fold in new likes instead of rebuilding")
+    parser.add_argument("--show", type=int, help="Print the neighbours of this recipe id")
+    args = parser.parse_args()
+
+    db = connect(args.db) if args.db else sqlite_standin()
+    builder = SimilarityBuilder(db, args.out, args.top_k, workers=args.workers)
+    if args.update:
+        print(f"updated {len(builder.update())} recipes")
+    else:
+        builder.build()
+    if args.show is not None:
+        for recipe_id, score in NeighbourStore.load(builder.store_dir).similar(args.show):
+            print(f"{recipe_id}\t{score:.4f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
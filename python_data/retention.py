@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from dashboard_rollup import floor_day, floor_month, next_month
+from db import Database, connect, format_datetime, sqlite_standin, to_datetime
+
+# table -> (timestamp column, rollup key column, {column: kind}); kinds as in
+# analytics_engine: i = integer (NULL -> -1), s = text, t = timestamp
+ARCHIVED_TABLES: dict[str, tuple[str, str, dict[str, str]]] = {
+    "activity_log": (
+        "created_at",
+        "action_type",
+        {
+            "id": "i",
+            "admin_id": "i",
+            "action_type": "s",
+            "target_type": "s",
+            "target_id": "i",
+            "description": "s",
+            "created_at": "t",
+            "updated_at": "t",
+        },
+    ),
+    "recipe_view": (
+        "viewed_at",
+        "recipe_id",
+        {"id": "i", "recipe_id": "i", "user_id": "i", "viewed_at": "t", "created_at": "t", "updated_at": "t"},
+    ),
+}
+
+SCHEMA = """CREATE TABLE IF NOT EXISTS archive_rollup (
+    source_table VARCHAR(64) NOT NULL,
+    stat_date    DATE NOT NULL,
+    group_key    VARCHAR(100) NOT NULL,
+    row_count    INT NOT NULL DEFAULT 0,
+    PRIMARY KEY (source_table, stat_date, group_key)
+)"""
+ROLLUP_COLUMNS = ("source_table", "stat_date", "group_key", "row_count")
+
+
+def archive_table(table: str, month: datetime) -> str:
+    return f"{table}_archive_{month:%Y%m}"
+
+
+def months_between(start: datetime, end: datetime) -> list[datetime]:
+    months, month = [], floor_month(start)
+    while month < end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+class RetentionJob:
+    """Moves rows older than a horizon out of ``activity_log`` / ``recipe_view``.
+
+    Rows leave the live table oldest first, ``batch_size`` at a time, each
+    batch in its own transaction: copied into a monthly archive table (or a
+    compressed ``.npz`` column file under ``archive_dir``), counted into
+    ``archive_rollup`` per day and group key (action type or recipe), then
+    deleted. Short transactions keep lock times bounded and the live tables
+    small enough to stay resident in the buffer pool.
+    """
+
+    def __init__(self, db: Database, archive_dir: Path | None = None, batch_size: int = 2000) -> None:
+        self.db = db
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+
+    def run(self, table: str, horizon: timedelta, now: datetime | None = None) -> int:
+        """Archive rows of ``table`` older than ``horizon``; returns rows moved."""
+        column, key, columns = ARCHIVED_TABLES[table]
+        cutoff = format_datetime((now or datetime.now()) - horizon)
+        with self.db.transaction():
+            self.db.execute(SCHEMA)
+        select = ", ".join(columns)
+        moved = 0
+        while True:
+            rows = self.db.query(
+                f"SELECT {select} FROM {table} WHERE {column} < ? ORDER BY id LIMIT ?", (cutoff, self.batch_size)
+            )
+            if not rows:
+                self.db.rollback()
+                return moved
+            ts_at = list(columns).index(column)
+            by_month: dict[datetime, list[tuple]] = {}
+            for row in rows:
+                by_month.setdefault(floor_month(to_datetime(row[ts_at])), []).append(row)
+            if self.archive_dir is None:
+                # DDL commits implicitly in MySQL, so archive tables are created
+                # before the batch transaction starts.
+                for month in by_month:
+                    self._ensure_archive(table, month)
+            with self.db.transaction():
+                for month, month_rows in sorted(by_month.items()):
+                    if self.archive_dir is None:
+                        self._to_table(table, month, month_rows)
+                    else:
+                        self._to_file(table, month, month_rows)
+                key_at = list(columns).index(key)
+                counts = Counter((floor_day(to_datetime(r[ts_at])).date().isoformat(), str(r[key_at])) for r in rows)
+                self.db.executemany(
+                    self.db.upsert_sql("archive_rollup", ROLLUP_COLUMNS, ROLLUP_COLUMNS[:3], ("row_count",)),
+                    ((table, day, group, n) for (day, group), n in sorted(counts.items())),
+                )
+                ids = [r[0] for r in rows]
+                self.db.execute(f"DELETE FROM {table} WHERE id IN ({', '.join('?' for _ in ids)})", ids)
+            moved += len(rows)
+
+    def _ensure_archive(self, table: str, month: datetime) -> None:
+        name = archive_table(table, month)
+        if self.db.table_exists(name):
+            return
+        with self.db.transaction():
+            if self.db.is_mysql:
+                # LIKE keeps the indexes but not the foreign keys, so archived rows
+                # outlive deleted users and recipes.
+                self.db.execute(f"CREATE TABLE {name} LIKE {table}")
+            else:
+                self.db.execute(f"CREATE TABLE {name} AS SELECT * FROM {table} WHERE 0")
+
+    def _to_table(self, table: str, month: datetime, rows: list[tuple]) -> None:
+        columns = ARCHIVED_TABLES[table][2]
+        self.db.executemany(self.db.insert_ignore_sql(archive_table(table, month), tuple(columns)), rows)
+
+    def _to_file(self, table: str, month: datetime, rows: list[tuple]) -> None:
+        # Named after the id range so a batch re-run after a crash overwrites its own file.
+        out = self.archive_dir / table / f"{month:%Y%m}"
+        out.mkdir(parents=True, exist_ok=True)
+        columns = ARCHIVED_TABLES[table][2]
+        arrays = {}
+        for i, (name, kind) in enumerate(columns.items()):
+            values = [r[i] for r in rows]
+            if kind == "i":
+                arrays[name] = np.array([-1 if v is None else int(v) for v in values], dtype=np.int64)
+            elif kind == "t":
+                arrays[name] = np.array(
+                    [np.datetime64("NaT") if v is None else np.datetime64(to_datetime(v), "s") for v in values],
+                    dtype="datetime64[s]",
+                )
+            else:
+                arrays[name] = np.array(["" if v is None else str(v) for v in values], dtype=np.str_)
+        np.savez_compressed(out / f"part-{rows[0][0]:010d}-{rows[-1][0]:010d}.npz", **arrays)
+
+
+def _from_file(path: Path, columns: dict[str, str], column: str, start: str, end: str) -> list[tuple]:
+    with np.load(path) as data:
+        arrays = {name: data[name] for name in columns}
+    ts = arrays[column]
+    mask = (ts >= np.datetime64(start)) & (ts < np.datetime64(end))
+    out = []
+    for i in np.nonzero(mask)[0]:
+        row = []
+        for name, kind in columns.items():
+            value = arrays[name][i]
+            if kind == "i":
+                row.append(None if value == -1 else int(value))
+            elif kind == "t":
+                row.append(None if np.isnat(value) else format_datetime(value.astype(datetime)))
+            else:
+                row.append(str(value) or None)
+        out.append(tuple(row))
+    return out
+
+
+def read_range(
+    db: Database, table: str, start: datetime, end: datetime, archive_dir: Path | None = None
+) -> list[tuple]:
+    """Rows of ``table`` with ``start <= timestamp < end`` from the live table and archives, oldest first.
+
+    Only the monthly archive tables and file directories overlapping the
+    range are read.
+    """
+    column, _, columns = ARCHIVED_TABLES[table]
+    select = ", ".join(columns)
+    lo, hi = format_datetime(start), format_datetime(end)
+    sources = [table] + [
+        archive_table(table, m) for m in months_between(start, end) if db.table_exists(archive_table(table, m))
+    ]
+    rows = []
+    for source in sources:
+        rows += [
+            tuple(format_datetime(to_datetime(v)) if columns[c] == "t" and v is not None else v for c, v in zip(columns, r))
+            for r in db.query(f"SELECT {select} FROM {source} WHERE {column} >= ? AND {column} < ?", (lo, hi))
+        ]
+    if archive_dir is not None:
+        for month in months_between(start, end):
+            for path in sorted((archive_dir / table / f"{month:%Y%m}").glob("part-*.npz")):
+                rows += _from_file(path, columns, column, lo, hi)
+    ts_at = list(columns).index(column)
+    # A file written by a batch whose transaction then failed duplicates live rows; ids settle it.
+    unique = {r[0]: r for r in rows}
+    return sorted(unique.values(), key=lambda r: (r[ts_at] or "", r[0]))
+
+
+def rollup_counts(db: Database, table: str, start: datetime, end: datetime) -> dict[str, int]:
+    """Archived row counts per group key for a date range, without touching the archives."""
+    return {
+        key: int(n)
+        for key, n in db.query(
+            "SELECT group_key, SUM(row_count) FROM archive_rollup "
+            "WHERE source_table = ? AND stat_date >= ? AND stat_date < ? GROUP BY group_key",
+            (table, start.date().isoformat(), end.date().isoformat()),
+        )
+    }
+
+
+def partition_ddl(table: str, first_month: datetime, months: int) -> list[str]:
+    """MySQL statements converting ``table`` to monthly RANGE partitions.
+
+    InnoDB does not allow foreign keys on partitioned tables and needs the
+    partitioning column in every unique key, so the foreign keys are dropped
+    and the primary key widened to ``(id, <timestamp>)`` first. The
+    partitioning function is ``UNIX_TIMESTAMP`` because the columns are
+    ``TIMESTAMP``. Review before running; the ALTER rebuilds the table.
+    """
+    column = ARCHIVED_TABLES[table][0]
+    foreign_keys = {
+        "activity_log": ("fk_activity_log_admin",),
+        "recipe_view": ("fk_recipe_view_recipe", "fk_recipe_view_user"),
+    }[table]
+    statements = [f"ALTER TABLE {table} DROP FOREIGN KEY {fk}" for fk in foreign_keys]
+    statements.append(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, {column})")
+    month, parts = floor_month(first_month), []
+    for _ in range(months):
+        month = next_month(month)
+        parts.append(f"    PARTITION p{month:%Y%m} VALUES LESS THAN (UNIX_TIMESTAMP('{format_datetime(month)}'))")
+    parts.append("    PARTITION pmax VALUES LESS THAN MAXVALUE")
+    statements.append(
+        f"ALTER TABLE {table} PARTITION BY RANGE (UNIX_TIMESTAMP({column})) (\n" + ",\n".join(parts) + "\n)"
+    )
+    return statements
+
+
+def drop_partition_ddl(table: str, month: datetime) -> str:
+    """Drop the partition holding rows *before* ``month`` (named ``p<month>``); instant compared to DELETE."""
+    return f"ALTER TABLE {table} DROP PARTITION p{floor_month(month):%Y%m}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive old activity_log / recipe_view rows")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--table", choices=tuple(ARCHIVED_TABLES), action="append", help="Default: both tables")
+    parser.add_argument("--horizon-days", type=int, default=90, help="Keep this many days in the live table")
+    parser.add_argument("--archive-dir", type=Path, help="Write compressed .npz files instead of archive tables")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument(
+        "--partition-ddl", type=int, metavar="MONTHS", help="Print DDL for MONTHS monthly partitions from the horizon on"
+    )
+    args = parser.parse_args()
+
+    tables = args.table or list(ARCHIVED_TABLES)
+    if args.partition_ddl:
+        start = floor_month(datetime.now() - timedelta(days=args.horizon_days))
+        for table in tables:
+            for statement in partition_ddl(table, start, args.partition_ddl):
+                print(f"{statement};")
+        return
+    db = connect(args.db) if args.db else sqlite_standin()
+    job = RetentionJob(db, args.archive_dir, args.batch_size)
+    for table in tables:
+        live_before = db.scalar(f"SELECT COUNT(*) FROM {table}")
+        moved = job.run(table, timedelta(days=args.horizon_days))
+        print(f"{table}: archived {moved} of {live_before} rows")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import math
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Iterable
+
+from db import Database, connect, format_datetime, sqlite_standin, to_datetime
+
+GLOBAL_USER = 0  # user_id used for the site-wide aggregate rows
+HALF_LIFE_DAYS = 14.0
+MAX_QUERY_LENGTH = 100
+MAX_QUERIES_PER_USER = 50
+MAX_GLOBAL_QUERIES = 20_000
+CACHED_PREFIX_LENGTH = 2
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS search_query_stat (
+        user_id       INT NOT NULL,
+        query         VARCHAR(100) NOT NULL,
+        search_count  INT NOT NULL DEFAULT 0,
+        score         DOUBLE NOT NULL DEFAULT 0,
+        last_searched DATETIME NOT NULL,
+        PRIMARY KEY (user_id, query)
+    )""",
+    """CREATE TABLE IF NOT EXISTS search_agg_state (
+        name  VARCHAR(50) NOT NULL PRIMARY KEY,
+        value BIGINT NOT NULL
+    )""",
+)
+STAT_COLUMNS = ("user_id", "query", "search_count", "score", "last_searched")
+
+_SPACE = re.compile(r"\s+")
+_EDGE_PUNCT = re.compile(r"^[^\w]+|[^\w]+$")
+
+
+def normalise(query: str | None) -> str:
+    text = _SPACE.sub(" ", (query or "").lower()).strip()
+    return _EDGE_PUNCT.sub("", text)[:MAX_QUERY_LENGTH]
+
+
+def prefix_end(prefix: str) -> str:
+    """Smallest string greater than every string starting with ``prefix``."""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def decay(score: float, since: datetime, until: datetime) -> float:
+    """Exponentially decay ``score`` from ``since`` to ``until`` (either direction)."""
+    days = (until - since).total_seconds() / 86400.0
+    return score * math.pow(0.5, days / HALF_LIFE_DAYS)
+
+
+class SearchHistoryAggregator:
+    """Folds raw ``search_history`` rows into decayed per-query counters.
+
+    Each row updates two ``search_query_stat`` entries, the user's and the
+    global one (``user_id = 0``). Scores are stored as of ``last_searched``
+    and decayed on read. Rows are streamed past an id watermark, so every
+    raw row is counted once, and ``compact`` can then delete old raw rows
+    without losing their contribution.
+    """
+
+    def __init__(self, db: Database, chunk_size: int = 5000) -> None:
+        self.db = db
+        self.chunk_size = chunk_size
+
+    def ensure_schema(self) -> None:
+        with self.db.transaction():
+            for ddl in SCHEMA:
+                self.db.execute(ddl)
+
+    def watermark(self) -> int:
+        return int(self.db.scalar("SELECT value FROM search_agg_state WHERE name = 'last_id'") or 0)
+
+    def run(self) -> int:
+        """Aggregate every raw row past the watermark; returns rows consumed."""
+        self.ensure_schema()
+        consumed = 0
+        last_id = self.watermark()
+        while True:
+            rows = self.db.query(
+                "SELECT id, user_id, query, searched_at FROM search_history WHERE id > ? ORDER BY id LIMIT ?",
+                (last_id, self.chunk_size),
+            )
+            if not rows:
+                return consumed
+            with self.db.transaction():
+                self._merge(rows)
+                last_id = rows[-1][0]
+                self.db.execute(
+                    self.db.upsert_sql("search_agg_state", ("name", "value"), ("name",)), ("last_id", last_id)
+                )
+            consumed += len(rows)
+
+    def _merge(self, rows: list[tuple]) -> None:
+        db = self.db
+        delta: dict[tuple[int, str], list] = {}
+        for _, user_id, query, searched_at in rows:
+            text = normalise(query)
+            if not text:
+                continue
+            ts = to_datetime(searched_at)
+            for key in ((int(user_id), text), (GLOBAL_USER, text)):
+                entry = delta.setdefault(key, [0, 0.0, ts])
+                if ts >= entry[2]:
+                    entry[1] = decay(entry[1], entry[2], ts) + 1.0
+                    entry[2] = ts
+                else:
+                    entry[1] += decay(1.0, ts, entry[2])
+                entry[0] += 1
+        if not delta:
+            return
+
+        existing: dict[tuple[int, str], tuple[int, float, datetime]] = {}
+        keys = list(delta)
+        for i in range(0, len(keys), 500):
+            chunk = keys[i : i + 500]
+            clause = " OR ".join("(user_id = ? AND query = ?)" for _ in chunk)
+            params = [v for key in chunk for v in key]
+            for user_id, query, count, score, last in db.query(
+                f"SELECT user_id, query, search_count, score, last_searched FROM search_query_stat WHERE {clause}",
+                params,
+            ):
+                existing[(int(user_id), query)] = (int(count), float(score), to_datetime(last))
+
+        merged = []
+        for key, (count, score, last) in delta.items():
+            if key in existing:
+                old_count, old_score, old_last = existing[key]
+                newest = max(last, old_last)
+                score = decay(score, last, newest) + decay(old_score, old_last, newest)
+                count, last = count + old_count, newest
+            merged.append((key[0], key[1], count, score, format_datetime(last)))
+        db.executemany(db.upsert_sql("search_query_stat", STAT_COLUMNS, ("user_id", "query")), merged)
+
+    def compact(self, keep_days: int = 90, batch_size: int = 1000, now: datetime | None = None) -> int:
+        """Delete aggregated raw rows older than ``keep_days`` in bounded batches.
+
+        Only rows at or below the watermark are removed, so unaggregated
+        searches are never lost. Counters keep their lifetime counts and are
+        pruned by rank alone (decayed score, then lifetime count): each user
+        keeps ``MAX_QUERIES_PER_USER`` and the global list
+        ``MAX_GLOBAL_QUERIES``. A score floor would drop the counters at
+        about the age the raw rows are deleted, losing the history entirely.
+        """
+        now = now or datetime.now()
+        cutoff = format_datetime(now - timedelta(days=keep_days))
+        last_id = self.watermark()
+        deleted = 0
+        while True:
+            ids = [
+                r[0]
+                for r in self.db.query(
+                    "SELECT id FROM search_history WHERE id <= ? AND searched_at < ? ORDER BY id LIMIT ?",
+                    (last_id, cutoff, batch_size),
+                )
+            ]
+            if not ids:
+                break
+            with self.db.transaction():
+                self.db.execute(f"DELETE FROM search_history WHERE id IN ({', '.join('?' for _ in ids)})", ids)
+            deleted += len(ids)
+
+        with self.db.transaction():
+            doomed = []
+            per_user: dict[int, list[tuple[float, int, str]]] = defaultdict(list)
+            for user_id, query, count, score, last in self.db.query(
+                "SELECT user_id, query, search_count, score, last_searched FROM search_query_stat"
+            ):
+                per_user[int(user_id)].append((decay(float(score), to_datetime(last), now), int(count), query))
+            for user_id, entries in per_user.items():
+                cap = MAX_GLOBAL_QUERIES if user_id == GLOBAL_USER else MAX_QUERIES_PER_USER
+                if len(entries) > cap:
+                    entries.sort(reverse=True)
+                    doomed += [(user_id, query) for _, _, query in entries[cap:]]
+            self.db.executemany("DELETE FROM search_query_stat WHERE user_id = ? AND query = ?", doomed)
+        return deleted
+
+
+class AutocompleteIndex:
+    """In-memory prefix index over ``search_query_stat``.
+
+    Global queries sit in one sorted list, so a prefix maps to a contiguous
+    slice found by bisection. Results for prefixes up to
+    ``CACHED_PREFIX_LENGTH`` characters are precomputed, because those
+    slices are the widest.
+    """
+
+    def __init__(self, limit: int = 8) -> None:
+        self.limit = limit
+        self._queries: list[str] = []
+        self._scores: list[float] = []
+        self._cache: dict[str, list[str]] = {}
+        self._users: dict[int, list[tuple[str, float]]] = {}
+
+    @classmethod
+    def from_db(cls, db: Database, now: datetime | None = None, limit: int = 8) -> "AutocompleteIndex":
+        now = now or datetime.now()
+        rows = [
+            (int(user_id), query, decay(float(score), to_datetime(last), now))
+            for user_id, query, score, last in db.query(
+                "SELECT user_id, query, score, last_searched FROM search_query_stat"
+            )
+        ]
+        return cls(limit).load(rows)
+
+    def load(self, rows: Iterable[tuple[int, str, float]]) -> "AutocompleteIndex":
+        global_rows: list[tuple[str, float]] = []
+        users: dict[int, list[tuple[str, float]]] = defaultdict(list)
+        for user_id, query, score in rows:
+            (global_rows if user_id == GLOBAL_USER else users[user_id]).append((query, score))
+        global_rows.sort()
+        self._queries = [q for q, _ in global_rows]
+        self._scores = [s for _, s in global_rows]
+        self._users = {u: sorted(entries) for u, entries in users.items()}
+        self._cache = {}
+        for prefix in {q[:n] for q in self._queries for n in range(1, CACHED_PREFIX_LENGTH + 1)}:
+            self._cache[prefix] = self._scan(prefix)
+        return self
+
+    def _scan(self, prefix: str) -> list[str]:
+        lo = bisect_left(self._queries, prefix)
+        hi = bisect_left(self._queries, prefix_end(prefix), lo)
+        best = heapq.nlargest(self.limit, range(lo, hi), key=self._scores.__getitem__)
+        return [self._queries[i] for i in best]
+
+    def suggest(self, prefix: str, user_id: int | None = None) -> list[str]:
+        prefix = normalise(prefix)
+        if not prefix:
+            return []
+        found: list[str] = []
+        if user_id is not None and user_id in self._users:
+            entries = self._users[user_id]
+            lo = bisect_left(entries, (prefix,))
+            hi = bisect_left(entries, (prefix_end(prefix),), lo)
+            found = [q for q, _ in heapq.nlargest(self.limit, entries[lo:hi], key=lambda e: e[1])]
+        shared = self._cache.get(prefix) if len(prefix) <= CACHED_PREFIX_LENGTH else None
+        for query in shared if shared is not None else self._scan(prefix):
+            if len(found) >= self.limit:
+                break
+            if query not in found:
+                found.append(query)
+        return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Aggregate search_history and serve autocomplete")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--keep-days", type=int, default=90, help="Raw search_history retention")
+    parser.add_argument("--suggest", help="Print suggestions for this prefix after aggregating")
+    parser.add_argument("--user", type=int, help="Personalise --suggest for this user id")
+    args = parser.parse_args()
+
+    db = connect(args.db) if args.db else sqlite_standin()
+    aggregator = SearchHistoryAggregator(db)
+    consumed = aggregator.run()
+    deleted = aggregator.compact(args.keep_days)
+    print(f"aggregated {consumed} searches, compacted {deleted} raw rows")
+    if args.suggest:
+        for query in AutocompleteIndex.from_db(db).suggest(args.suggest, args.user):
+            print(query)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
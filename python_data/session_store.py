@@ -0,0 +1,260 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import secrets
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from db import Database, connect, format_datetime, sqlite_standin, to_datetime
+
+SESSION_LIFETIME = timedelta(days=7)
+# Also how long a session revoked by another process stays valid here.
+CACHE_TTL = timedelta(seconds=5)
+NEGATIVE_TTL = timedelta(seconds=30)
+MAX_IN_PARAMS = 500
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Session:
+    id: int
+    user_id: int
+    token: str
+    expires_at: datetime
+
+
+def _case_update(table: str, column: str, values: dict[int, str]) -> tuple[str, list]:
+    """One UPDATE setting ``column`` per row id, instead of one statement per row."""
+    ids = list(values)
+    cases = " ".join("WHEN ? THEN ?" for _ in ids)
+    params = [v for i in ids for v in (i, values[i])] + ids
+    return f"UPDATE {table} SET {column} = CASE id {cases} END WHERE id IN ({', '.join('?' for _ in ids)})", params
+
+
+class SessionStore:
+    """Session validation served from memory, with coalesced activity writes.
+
+    Validated tokens are cached for ``cache_ttl`` (unknown tokens for
+    ``NEGATIVE_TTL``), so a busy session costs one ``idx_session_token``
+    lookup per TTL rather than one per request. Revocations through this
+    store apply immediately; revocations made by another process (another
+    store, a user delete) are seen once the cached entry ages out, so
+    ``cache_ttl`` is kept to seconds.
+
+    Each validation only records the session as seen in memory. ``flush``
+    writes the latest ``session.updated_at`` and ``user.last_active`` for
+    everything seen since the previous flush in two ``CASE`` updates per
+    chunk, with ``@DISABLE_TRIGGERS = 1`` so ``trg_User_UpdateLastActive``
+    does not add a ``user`` update per session row. ``sweep`` deletes
+    expired sessions through ``idx_session_expires_at`` in small committed
+    batches so no long lock is held.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        cache_ttl: timedelta = CACHE_TTL,
+        max_entries: int = 100_000,
+        sweep_batch: int = 500,
+    ) -> None:
+        self.db = db
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self.sweep_batch = sweep_batch
+        self.stats: Counter = Counter()
+        self._cache: OrderedDict[str, tuple[Session | None, datetime]] = OrderedDict()
+        self._seen: dict[int, tuple[int, datetime]] = {}  # session id -> (user id, last seen)
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _remember(self, token: str, session: Session | None, now: datetime) -> None:
+        self._cache[token] = (session, now)
+        self._cache.move_to_end(token)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def create(self, user_id: int, lifetime: timedelta = SESSION_LIFETIME, now: datetime | None = None) -> Session:
+        now = now or datetime.now()
+        token = secrets.token_urlsafe(32)
+        expires_at = (now + lifetime).replace(microsecond=0)
+        with self._lock, self.db.transaction():
+            session_id = self.db.execute(
+                "INSERT INTO session (user_id, session_token, expires_at) VALUES (?, ?, ?)",
+                (user_id, token, format_datetime(expires_at)),
+            ).lastrowid
+            session = Session(int(session_id), user_id, token, expires_at)
+            self._remember(token, session, now)
+        return session
+
+    def validate(self, token: str, now: datetime | None = None) -> Session | None:
+        """The live session for ``token``, or None; marks the session as seen."""
+        now = now or datetime.now()
+        with self._lock:
+            cached = self._cache.get(token)
+            if cached is not None:
+                session, cached_at = cached
+                ttl = self.cache_ttl if session is not None else NEGATIVE_TTL
+                if now - cached_at < ttl:
+                    self.stats["cache_hits"] += 1
+                    self._cache.move_to_end(token)
+                    return self._seen_now(session, now)
+            self.stats["db_lookups"] += 1
+            row = self.db.execute(
+                "SELECT id, user_id, expires_at FROM session WHERE session_token = ?", (token,)
+            ).fetchone()
+            self.db.rollback()
+            session = Session(int(row[0]), int(row[1]), token, to_datetime(row[2])) if row else None
+            self._remember(token, session, now)
+            return self._seen_now(session, now)
+
+    def _seen_now(self, session: Session | None, now: datetime) -> Session | None:
+        if session is None or session.expires_at <= now:
+            return None
+        self._seen[session.id] = (session.user_id, now)
+        return session
+
+    def revoke(self, token: str) -> None:
+        with self._lock, self.db.transaction():
+            self.db.execute("DELETE FROM session WHERE session_token = ?", (token,))
+            cached = self._cache.pop(token, None)
+            if cached and cached[0] is not None:
+                self._seen.pop(cached[0].id, None)
+
+    def revoke_user(self, user_id: int) -> None:
+        """Log a user out everywhere (``idx_session_user_id``)."""
+        with self._lock, self.db.transaction():
+            self.db.execute("DELETE FROM session WHERE user_id = ?", (user_id,))
+            for token, (session, _) in list(self._cache.items()):
+                if session is not None and session.user_id == user_id:
+                    del self._cache[token]
+                    self._seen.pop(session.id, None)
+
+    def flush(self) -> int:
+        """Write coalesced activity; returns the number of sessions updated."""
+        with self._lock:
+            seen, self._seen = self._seen, {}
+            if not seen:
+                return 0
+            users: dict[int, datetime] = {}
+            for user_id, at in seen.values():
+                users[user_id] = max(at, users.get(user_id, at))
+            sessions = {sid: format_datetime(at) for sid, (_, at) in seen.items()}
+            active = {uid: format_datetime(at) for uid, at in users.items()}
+            try:
+                with self.db.transaction(), self.db.triggers_disabled():
+                    for table, column, values in (
+                        ("session", "updated_at", sessions),
+                        ("user", "last_active", active),
+                    ):
+                        ids = list(values)
+                        for i in range(0, len(ids), MAX_IN_PARAMS):
+                            chunk = {k: values[k] for k in ids[i : i + MAX_IN_PARAMS]}
+                            self.db.execute(*_case_update(table, column, chunk))
+                            self.stats["write_statements"] += 1
+            except BaseException:
+                # Keep the activity for the next flush unless newer activity replaced it.
+                self._seen = seen | self._seen
+                raise
+            self.stats["flushes"] += 1
+            return len(sessions)
+
+    def sweep(self, now: datetime | None = None) -> int:
+        """Delete expired sessions in ``sweep_batch`` chunks; returns rows deleted."""
+        cutoff = format_datetime(now or datetime.now())
+        deleted = 0
+        while True:
+            with self._lock:
+                ids = [
+                    r[0]
+                    for r in self.db.query(
+                        "SELECT id FROM session WHERE expires_at < ? ORDER BY expires_at LIMIT ?",
+                        (cutoff, self.sweep_batch),
+                    )
+                ]
+                if not ids:
+                    self.db.rollback()
+                    break
+                with self.db.transaction():
+                    self.db.execute(f"DELETE FROM session WHERE id IN ({', '.join('?' for _ in ids)})", ids)
+                for sid in ids:
+                    self._seen.pop(sid, None)
+            deleted += len(ids)
+            # Yield between batches so request threads are not starved of the lock.
+            time.sleep(0)
+        self.stats["swept"] += deleted
+        return deleted
+
+    def start(self, flush_every: float = 10.0, sweep_every: float = 300.0) -> "SessionStore":
+        """Flush and sweep from a background thread.
+
+        Errors are logged and the thread keeps running: a failed flush keeps
+        its activity for the next one, a failed sweep is retried after
+        ``sweep_every``.
+        """
+
+        def loop() -> None:
+            last_sweep = time.monotonic()
+            while not self._stop.wait(flush_every):
+                try:
+                    self.flush()
+                except Exception:
+                    self.stats["flush_errors"] += 1
+                    log.exception("Session activity flush failed")
+                if time.monotonic() - last_sweep >= sweep_every:
+                    last_sweep = time.monotonic()
+                    try:
+                        self.sweep()
+                    except Exception:
+                        self.stats["sweep_errors"] += 1
+                        log.exception("Expired session sweep failed")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="session-store", daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulate authenticated traffic against the session store")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--flush-every", type=int, default=5000, help="Requests between flushes")
+    args = parser.parse_args()
+
+    db = connect(args.db) if args.db else sqlite_standin()
+    store = SessionStore(db)
+    users = [r[0] for r in db.query("SELECT id FROM user")]
+    tokens = [store.create(u).token for u in users]
+    store.create(users[0], lifetime=timedelta(seconds=-1))  # swept below
+    rng = random.Random(1)
+    started = time.perf_counter()
+    for i in range(args.requests):
+        store.validate(rng.choice(tokens))
+        if i % args.flush_every == args.flush_every - 1:
+            store.flush()
+    store.close()
+    elapsed = time.perf_counter() - started
+    store.sweep()
+    db_calls = store.stats["db_lookups"] + store.stats["write_statements"]
+    print(f"{args.requests} validations in {elapsed:.2f}s, {db_calls / args.requests:.5f} statements/request")
+    print(json.dumps(dict(store.stats), indent=2))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
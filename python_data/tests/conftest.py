@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# The services import each other as top-level modules (``from db import ...``).
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,105 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from dashboard_rollup import EVENT_SOURCES, DashboardRollup, floor_hour, read_buckets, read_dashboard
+from db import format_datetime, sqlite_standin
+
+NOW = datetime(2026, 2, 6, 12, 30)
+
+
+@pytest.fixture
+def db():
+    standin = sqlite_standin()
+    yield standin
+    standin.close()
+
+
+def _direct_totals(db):
+    return {
+        "total_users": db.scalar("SELECT COUNT(*) FROM user WHERE role <> 'admin'"),
+        "total_contributors": db.scalar("SELECT COUNT(*) FROM user WHERE role = 'user' AND status <> 'pending'"),
+        "published_recipes": db.scalar("SELECT COUNT(*) FROM recipe WHERE status = 'published'"),
+        "pending_recipes": db.scalar("SELECT COUNT(*) FROM recipe WHERE status = 'pending'"),
+    }
+
+
+def _snapshot_totals(db):
+    snapshot = read_dashboard(db)
+    return {name: snapshot[name] for name in _direct_totals(db)}
+
+
+def _add_user(db, username, status, joined):
+    with db.transaction():
+        db.execute(
+            "INSERT INTO user (username, first_name, last_name, email, password_hash, role, status, joined_date) "
+            "VALUES (?, 'New', 'Cook', ?, 'x', 'user', ?, ?)",
+            (username, f"{username}@example.com", status, format_datetime(joined)),
+        )
+
+
+def _add_recipe(db, title, status, created):
+    with db.transaction():
+        db.execute(
+            "INSERT INTO recipe (title, author_id, status, created_at) VALUES (?, 4, ?, ?)",
+            (title, status, format_datetime(created)),
+        )
+
+
+def test_totals_follow_inserts_status_changes_and_deletes(db):
+    rollup = DashboardRollup(db)
+    rollup.run(NOW)
+    assert _snapshot_totals(db) == _direct_totals(db)
+
+    _add_user(db, "latecomer", "pending", NOW - timedelta(minutes=10))
+    _add_recipe(db, "Fresh Soup", "pending", NOW - timedelta(minutes=5))
+    rollup.run(NOW + timedelta(hours=1))
+    assert _snapshot_totals(db) == _direct_totals(db)
+
+    with db.transaction():
+        db.execute("UPDATE user SET status = 'active' WHERE status = 'pending'")
+        db.execute("UPDATE recipe SET status = 'published' WHERE status = 'pending'")
+    rollup.run(NOW + timedelta(hours=2))
+    assert _snapshot_totals(db) == _direct_totals(db)
+
+    before = _snapshot_totals(db)
+    with db.transaction():
+        db.execute("DELETE FROM user WHERE id = 6")
+        db.execute("DELETE FROM recipe WHERE id = 1")
+    rollup.run(NOW + timedelta(hours=3))
+    after = _snapshot_totals(db)
+    assert after == _direct_totals(db)
+    assert after["total_users"] == before["total_users"] - 1
+    assert after["published_recipes"] < before["published_recipes"]
+
+
+def test_buckets_match_source_counts_at_every_granularity(db):
+    DashboardRollup(db).run(NOW)
+
+    for metric, (table, column, where) in EVENT_SOURCES.items():
+        expected = db.scalar(
+            f"SELECT COUNT(*) FROM {table} WHERE {column} < ?" + (f" AND {where}" if where else ""),
+            (format_datetime(floor_hour(NOW) + timedelta(hours=1)),),
+        )
+        for granularity in ("hour", "day", "month"):
+            total = db.scalar(f"SELECT SUM({metric}) FROM stat_rollup WHERE granularity = ?", (granularity,))
+            assert (total or 0) == expected, (metric, granularity)
+
+
+def test_rerun_counts_late_rows_in_closed_hours(db):
+    rollup = DashboardRollup(db, rescan_hours=24)
+    rollup.run(NOW)
+    late = floor_hour(NOW) - timedelta(hours=3)
+    before = read_buckets(db, "hour", late, late)[0]["recipe_views"]
+
+    with db.transaction():
+        db.execute(
+            "INSERT INTO recipe_view (user_id, recipe_id, viewed_at) VALUES (4, 1, ?)",
+            (format_datetime(late + timedelta(minutes=20)),),
+        )
+    rollup.run(NOW + timedelta(minutes=20))
+
+    assert read_buckets(db, "hour", late, late)[0]["recipe_views"] == before + 1
+    assert db.scalar("SELECT SUM(recipe_views) FROM stat_rollup WHERE granularity = 'month'") == db.scalar(
+        "SELECT COUNT(*) FROM recipe_view"
+    )
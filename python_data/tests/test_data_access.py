@@ -0,0 +1,54 @@
+import pytest
+
+from data_access import ConnectionPool, StorageDAL
+from db import sqlite_standin
+
+
+def _fake_hash(password: str) -> str:
+    return f"hashed:{password}"
+
+
+def _fake_verify(password: str, hashed: str) -> bool:
+    return hashed == f"hashed:{password}"
+
+
+@pytest.fixture
+def dal():
+    standin = sqlite_standin()
+    yield StorageDAL(ConnectionPool(lambda: standin, size=1), verify=_fake_verify, hasher=_fake_hash)
+    standin.close()
+
+
+def _user(dal, user_id):
+    return next(u for u in dal.get_users() if u["id"] == user_id)
+
+
+NEW_USER = {
+    "username": "newcook",
+    "firstName": "New",
+    "lastName": "Cook",
+    "email": "newcook@example.com",
+    "role": "user",
+    "status": "active",
+}
+
+
+def test_save_user_inserts_new_user_with_hashed_password(dal):
+    user_id = dal.save_user({**NEW_USER, "password": "secret"})
+
+    assert _user(dal, user_id)["email"] == "newcook@example.com"
+    assert dal.login("newcook@example.com", "secret")["id"] == user_id
+
+
+def test_save_user_requires_password_for_new_user(dal):
+    with pytest.raises(ValueError, match="password"):
+        dal.save_user(NEW_USER)
+
+
+def test_save_user_update_keeps_password(dal):
+    user_id = dal.save_user({**NEW_USER, "password": "secret"})
+
+    dal.save_user({"id": user_id, "bio": "Loves soup"})
+
+    assert _user(dal, user_id)["bio"] == "Loves soup"
+    assert dal.login("newcook@example.com", "secret")["id"] == user_id
@@ -0,0 +1,128 @@
+import json
+
+import pytest
+
+from db import sqlite_standin
+from migrate_localstorage import MERGED, TABLE_ORDER, LocalStorageMigrator
+
+
+def _fake_hash(password: str) -> str:
+    return f"hashed:{password}"
+
+
+def _export():
+    users = [
+        {"id": f"u{i}", "username": f"cook{i}", "email": f"cook{i}@example.com", "password": "pw", "status": "active"}
+        for i in range(6)
+    ]
+    # Same address as stand-in user 4, in another case.
+    users.append({"id": "u-dup", "username": "again", "email": "User@CookHub.com", "password": "pw"})
+    users[0]["favorites"] = ["r0", "r3"]
+    recipes = [
+        {
+            "id": f"r{i}",
+            "title": f"Soup \"{i}\" é\U0001F372",
+            "authorId": "u-dup" if i == 2 else f"u{i % 6}",
+            "status": "published",
+            "createdAt": "2026-01-10T08:00:00.000Z",
+            "ingredients": [{"name": "salt", "quantity": "1", "unit": "tsp"}],
+            "instructions": ["Boil", "Serve"],
+            "images": [f"/img/{i}a.jpg", f"/img/{i}b.jpg"],
+            "likedBy": ["u1", "u2"],
+            "viewedBy": ["u3", "guest:abc"],
+        }
+        for i in range(8)
+    ]
+    return {
+        "cookhub_users": users,
+        "cookhub_recipes": recipes,
+        "cookhub_reviews": [{"userId": "u1", "recipeId": "r0", "rating": 5, "comment": "Great"}],
+        "cookhub_daily_stats": {"2026-03-01": {"pageViews": 3}},
+    }
+
+
+@pytest.fixture
+def db():
+    standin = sqlite_standin()
+    yield standin
+    standin.close()
+
+
+def _write(tmp_path, export, name="export.json"):
+    path = tmp_path / name
+    path.write_text(json.dumps(export), encoding="utf-8")
+    return path
+
+
+def _counts(db):
+    return {table: db.scalar(f"SELECT COUNT(*) FROM {table}") for table in TABLE_ORDER}
+
+
+def _migrate(db, path, **kwargs):
+    return LocalStorageMigrator(db, "export.json", hasher=_fake_hash, **kwargs).run(path)
+
+
+def test_migration_loads_and_verifies(db, tmp_path):
+    report = _migrate(db, _write(tmp_path, _export()))
+
+    assert report["ok"], report
+    assert report["tables"]["recipe"]["loaded"] == 8
+    assert report["tables"]["recipe_view"]["skipped"] == {"guest viewer": 8}
+    orders = db.query("SELECT DISTINCT display_order FROM recipe_image ORDER BY display_order")
+    assert [order for (order,) in orders] == [1, 2]
+
+
+def test_duplicate_email_merges_onto_existing_user(db, tmp_path):
+    users = db.scalar("SELECT COUNT(*) FROM user")
+
+    report = _migrate(db, _write(tmp_path, _export()))
+
+    assert report["tables"]["user"]["skipped"] == {MERGED: 1}
+    assert db.scalar("SELECT COUNT(*) FROM user") == users + 6
+    assert db.scalar("SELECT author_id FROM recipe WHERE title LIKE 'Soup \"2\"%'") == 4
+
+
+def test_resume_after_failed_batch_matches_uninterrupted_run(db, tmp_path, monkeypatch):
+    path = _write(tmp_path, _export())
+    expected_db = sqlite_standin()
+    try:
+        _migrate(expected_db, path, batch_size=3)
+        expected = _counts(expected_db)
+    finally:
+        expected_db.close()
+
+    write = LocalStorageMigrator._write
+    calls = []
+
+    def crash_on_third_batch(self, *args):
+        calls.append(args[0])
+        if len(calls) == 3:
+            raise RuntimeError("connection lost")
+        return write(self, *args)
+
+    monkeypatch.setattr(LocalStorageMigrator, "_write", crash_on_third_batch)
+    with pytest.raises(RuntimeError):
+        _migrate(db, path, batch_size=3)
+    monkeypatch.setattr(LocalStorageMigrator, "_write", write)
+
+    report = _migrate(db, path, batch_size=3)
+
+    assert report["ok"], report
+    assert _counts(db) == expected
+
+
+def test_string_valued_sections_load_like_parsed_ones(db, tmp_path):
+    export = _export()
+    parsed = _migrate(db, _write(tmp_path, export))
+    expected = _counts(db)
+
+    # As copied straight out of localStorage: every value is itself a JSON string.
+    stringified = {key: json.dumps(value) for key, value in export.items()}
+    other = sqlite_standin()
+    try:
+        report = _migrate(other, _write(tmp_path, stringified, "stringified.json"))
+        assert report["tables"] == parsed["tables"]
+        assert _counts(other) == expected
+        assert other.query("SELECT title FROM recipe ORDER BY id") == db.query("SELECT title FROM recipe ORDER BY id")
+    finally:
+        other.close()
@@ -0,0 +1,47 @@
+import pytest
+
+from data_access import ConnectionPool, StorageDAL
+from db import sqlite_standin
+from recipe_cache import RecipeCache
+
+
+@pytest.fixture
+def standin():
+    db = sqlite_standin()
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def cache(standin):
+    cache = RecipeCache(StorageDAL(ConnectionPool(lambda: standin, size=1)))
+    yield cache
+    cache.close()
+
+
+def _author(cache, standin, recipe_id=1):
+    author_id = standin.scalar("SELECT author_id FROM recipe WHERE id = ?", (recipe_id,))
+    return author_id, cache.get_recipe(recipe_id)["author"]
+
+
+def test_author_rename_through_cache_refreshes_documents_and_pages(cache, standin):
+    author_id, author = _author(cache, standin)
+    page, _ = cache.get_recipe_page(50)
+    assert any(r["author"]["username"] == author["username"] for r in page)
+
+    cache.save_user({"id": author_id, "username": "renamed", "avatar": "/avatars/new.png"})
+
+    assert cache.get_recipe(1)["author"] == {"id": author_id, "username": "renamed", "avatar": "/avatars/new.png"}
+    page, _ = cache.get_recipe_page(50)
+    assert {r["author"]["username"] for r in page if r["authorId"] == author_id} == {"renamed"}
+
+
+def test_user_write_reported_with_on_write(cache, standin):
+    author_id, _ = _author(cache, standin)
+    with standin.transaction():
+        standin.execute("UPDATE user SET username = 'elsewhere' WHERE id = ?", (author_id,))
+    assert cache.get_recipe(1)["author"]["username"] != "elsewhere"
+
+    cache.on_write("user", author_id)
+
+    assert cache.get_recipe(1)["author"]["username"] == "elsewhere"
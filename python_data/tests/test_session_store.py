@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from db import sqlite_standin
+from session_store import CACHE_TTL, SessionStore
+
+NOW = datetime(2026, 2, 6, 12, 0)
+
+
+@pytest.fixture
+def db():
+    standin = sqlite_standin()
+    yield standin
+    standin.close()
+
+
+def test_revoke_applies_immediately_in_the_revoking_store(db):
+    store = SessionStore(db)
+    token = store.create(4, now=NOW).token
+
+    store.revoke(token)
+
+    assert store.validate(token, now=NOW) is None
+
+
+def test_revocation_by_another_store_is_seen_within_seconds(db):
+    here, elsewhere = SessionStore(db), SessionStore(db)
+    token = here.create(4, now=NOW).token
+    other = here.create(5, now=NOW).token
+    assert here.validate(token, now=NOW) is not None
+
+    elsewhere.revoke(token)
+    elsewhere.revoke_user(5)
+
+    later = NOW + CACHE_TTL
+    assert CACHE_TTL <= timedelta(seconds=10)
+    assert here.validate(token, now=later) is None
+    assert here.validate(other, now=later) is None
@@ -0,0 +1,270 @@
+from __future__ import annotations
+
+import argparse
+import heapq
+import json
+import os
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator
+
+import numpy as np
+
+from db import Database, connect, sqlite_standin, to_datetime
+
+# window name -> (slot length in seconds, number of slots)
+WINDOWS: dict[str, tuple[int, int]] = {
+    "1h": (300, 12),
+    "24h": (3600, 24),
+    "7d": (6 * 3600, 28),
+}
+EVENT_WEIGHTS = {"view": 1, "like": 3}
+ALL = "*"  # category key for the site-wide list
+_PRIME = (1 << 31) - 1
+
+# source table -> (event kind, statement yielding id, recipe_id, timestamp, rating)
+SOURCES: dict[str, tuple[str, str]] = {
+    "recipe_view": ("view", "SELECT id, recipe_id, viewed_at, NULL FROM recipe_view WHERE id > ? ORDER BY id"),
+    "like_record": ("like", "SELECT id, recipe_id, created_at, NULL FROM like_record WHERE id > ? ORDER BY id"),
+    "review": ("review", "SELECT id, recipe_id, created_at, rating FROM review WHERE id > ? ORDER BY id"),
+}
+
+Event = tuple[str, int, datetime, "int | None"]
+
+
+def event_weight(kind: str, rating: int | None = None) -> int:
+    if kind == "review":
+        # Only 3+ star reviews push a recipe up: 3 -> 1, 4 -> 2, 5 -> 3.
+        return max((rating or 0) - 2, 0)
+    return EVENT_WEIGHTS.get(kind, 0)
+
+
+class SlidingSketch:
+    """Count-min sketch over a ring of time slots.
+
+    Each slot holds its own ``depth x width`` counter table and ``total`` is
+    their sum, so an estimate costs ``depth`` lookups however many slots the
+    window has. Advancing the clock subtracts and clears the slots that fall
+    out of the window, so the window edge moves in whole slots. Memory is
+    fixed by the constructor arguments.
+    """
+
+    def __init__(self, slot_seconds: int, n_slots: int, depth: int = 4, width: int = 2048, seed: int = 7) -> None:
+        self.slot_seconds = slot_seconds
+        self.n_slots = n_slots
+        self.width = width
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, _PRIME, size=(depth, 1)).astype(np.int64)
+        self._b = rng.randint(0, _PRIME, size=(depth, 1)).astype(np.int64)
+        self.counts = np.zeros((n_slots, depth, width), dtype=np.int32)
+        self.total = np.zeros((depth, width), dtype=np.int64)
+        self.head = -1  # absolute index of the newest slot
+
+    def _cells(self, ids: np.ndarray) -> np.ndarray:
+        return (self._a * ids[None, :] + self._b) % _PRIME % self.width
+
+    def slot_of(self, ts: datetime) -> int:
+        return int(ts.timestamp()) // self.slot_seconds
+
+    def advance(self, slot: int) -> None:
+        if slot <= self.head:
+            return
+        if self.head < 0 or slot - self.head >= self.n_slots:
+            self.counts[:] = 0
+            self.total[:] = 0
+        else:
+            for s in range(self.head + 1, slot + 1):
+                ring = s % self.n_slots
+                self.total -= self.counts[ring]
+                self.counts[ring] = 0
+        self.head = slot
+
+    def add(self, ids: np.ndarray, weights: np.ndarray, slots: np.ndarray) -> None:
+        """Count a batch of events; events older than the window are dropped."""
+        order = np.argsort(slots, kind="stable")
+        ids, weights, slots = ids[order], weights[order], slots[order]
+        rows = np.arange(self.total.shape[0])[:, None]
+        for slot in np.unique(slots):
+            self.advance(int(slot))
+            if slot <= self.head - self.n_slots:
+                continue
+            mask = slots == slot
+            cells = self._cells(ids[mask])
+            w = np.broadcast_to(weights[mask], cells.shape)
+            np.add.at(self.counts[int(slot) % self.n_slots], (rows, cells), w)
+            np.add.at(self.total, (rows, cells), w)
+
+    def estimate(self, ids: np.ndarray) -> np.ndarray:
+        if not len(ids):
+            return np.zeros(0, dtype=np.int64)
+        rows = np.arange(self.total.shape[0])[:, None]
+        return self.total[rows, self._cells(ids)].min(axis=0)
+
+
+class TrendingTracker:
+    """Serves trending and top-N recipe lists from bounded in-memory state.
+
+    Events (views, likes, reviews) are tailed from the database past per-table
+    id watermarks, or fed from an event file. Every window keeps a sliding
+    count-min sketch plus, per category and site-wide, a bounded candidate set
+    of recipe ids; ``top`` re-estimates the candidates and returns the best
+    ``limit`` by heap selection.
+    """
+
+    def __init__(self, db: Database | None = None, candidates: int = 100, depth: int = 4, width: int = 2048) -> None:
+        self.db = db
+        self.capacity = candidates
+        self.sketches = {name: SlidingSketch(s, n, depth, width) for name, (s, n) in WINDOWS.items()}
+        self.candidates: dict[str, dict[str, set[int]]] = {name: defaultdict(set) for name in WINDOWS}
+        self.watermarks: dict[str, int] = dict.fromkeys(SOURCES, 0)
+        self.categories: dict[int, str | None] = {}
+
+    def _category(self, recipe_ids: Iterable[int]) -> None:
+        missing = [r for r in set(recipe_ids) if r not in self.categories]
+        if self.db is None:
+            self.categories.update(dict.fromkeys(missing))
+            return
+        for i in range(0, len(missing), 500):
+            chunk = missing[i : i + 500]
+            found = dict(
+                self.db.query(
+                    f"SELECT id, category FROM recipe WHERE id IN ({', '.join('?' for _ in chunk)})", chunk
+                )
+            )
+            self.categories.update({r: found.get(r) for r in chunk})
+
+    def ingest(self, events: Iterable[Event]) -> int:
+        batch = [(rid, event_weight(kind, rating), ts) for kind, rid, ts, rating in events]
+        batch = [e for e in batch if e[1] > 0]
+        if not batch:
+            return 0
+        ids = np.array([e[0] for e in batch], dtype=np.int64)
+        weights = np.array([e[1] for e in batch], dtype=np.int64)
+        self._category(ids.tolist())
+        touched = np.unique(ids)
+        for name, sketch in self.sketches.items():
+            sketch.add(ids, weights, np.array([sketch.slot_of(e[2]) for e in batch], dtype=np.int64))
+            for rid in touched.tolist():
+                category = self.categories.get(rid)
+                for key in (ALL, category) if category else (ALL,):
+                    members = self.candidates[name][key]
+                    members.add(rid)
+                    if len(members) > 2 * self.capacity:
+                        self._prune(name, key)
+        return len(batch)
+
+    def _prune(self, window: str, key: str) -> None:
+        members = np.fromiter(self.candidates[window][key], dtype=np.int64)
+        scores = self.sketches[window].estimate(members)
+        keep = np.argsort(-scores, kind="stable")[: self.capacity]
+        self.candidates[window][key] = {int(members[i]) for i in keep if scores[i] > 0}
+
+    def advance(self, now: datetime) -> None:
+        for sketch in self.sketches.values():
+            sketch.advance(sketch.slot_of(now))
+
+    def top(
+        self, window: str = "24h", category: str | None = None, limit: int = 10, now: datetime | None = None
+    ) -> list[tuple[int, int]]:
+        """``(recipe_id, estimated weighted count)`` pairs, best first.
+
+        The windows are first advanced to ``now`` (default: the wall clock),
+        so slots that expired while no events arrived no longer count.
+        """
+        self.advance(now or datetime.now())
+        members = np.fromiter(self.candidates[window].get(category or ALL, ()), dtype=np.int64)
+        scores = self.sketches[window].estimate(members)
+        best = heapq.nlargest(limit, range(len(members)), key=lambda i: (scores[i], -members[i]))
+        return [(int(members[i]), int(scores[i])) for i in best if scores[i] > 0]
+
+    def poll(self, chunk_size: int = 5000) -> int:
+        """Consume every new row of the source tables; returns events counted."""
+        consumed = 0
+        for table, (kind, sql) in SOURCES.items():
+            for rows in self.db.stream(sql, (self.watermarks[table],), chunk_size):
+                consumed += self.ingest((kind, int(r[1]), to_datetime(r[2]), r[3]) for r in rows)
+                self.watermarks[table] = int(rows[-1][0])
+        return consumed
+
+    def save(self, path: Path) -> None:
+        """Write a snapshot atomically so a restart resumes from the watermarks."""
+        arrays = {}
+        for name, sketch in self.sketches.items():
+            arrays[f"{name}_counts"] = sketch.counts
+            arrays[f"{name}_total"] = sketch.total
+        meta = {
+            "heads": {name: sketch.head for name, sketch in self.sketches.items()},
+            "watermarks": self.watermarks,
+            "candidates": {
+                name: {key: sorted(ids) for key, ids in groups.items()} for name, groups in self.candidates.items()
+            },
+        }
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as fh:
+            np.savez(fh, meta=np.array(json.dumps(meta)), **arrays)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    def load(self, path: Path) -> "TrendingTracker":
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            for name, sketch in self.sketches.items():
+                sketch.counts[:] = data[f"{name}_counts"]
+                sketch.total[:] = data[f"{name}_total"]
+                sketch.head = meta["heads"][name]
+        self.watermarks.update(meta["watermarks"])
+        for name, groups in meta["candidates"].items():
+            self.candidates[name] = defaultdict(set, {key: set(ids) for key, ids in groups.items()})
+        return self
+
+
+def read_event_file(path: Path) -> Iterator[Event]:
+    """JSON lines such as ``{"type": "view", "recipe_id": 3, "ts": "2026-01-01 10:00:00"}``."""
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                event = json.loads(line)
+                yield event["type"], int(event["recipe_id"]), to_datetime(event["ts"]), event.get("rating")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Streaming trending recipes over sliding windows")
+    parser.add_argument("--db", help="Database URL (defaults to the seeded SQLite stand-in)")
+    parser.add_argument("--events", type=Path, help="Read events from a JSON-lines file instead of tailing tables")
+    parser.add_argument("--snapshot", type=Path, default=Path(__file__).parent / "out" / "trending.npz")
+    parser.add_argument("--window", choices=tuple(WINDOWS), default="24h")
+    parser.add_argument("--category", help="Restrict the printed list to one category")
+    parser.add_argument("--follow", type=float, metavar="SECONDS", help="Keep polling at this interval")
+    parser.add_argument("--snapshot-every", type=float, default=60.0, help="Seconds between snapshots with --follow")
+    args = parser.parse_args()
+
+    db = connect(args.db) if args.db else sqlite_standin()
+    tracker = TrendingTracker(db)
+    if args.snapshot.exists():
+        tracker.load(args.snapshot)
+    args.snapshot.parent.mkdir(parents=True, exist_ok=True)
+    if args.events:
+        tracker.ingest(read_event_file(args.events))
+    else:
+        tracker.poll()
+    last_snapshot = time.monotonic()
+    try:
+        while args.follow:
+            time.sleep(args.follow)
+            tracker.poll()
+            if time.monotonic() - last_snapshot >= args.snapshot_every:
+                tracker.save(args.snapshot)
+                last_snapshot = time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    tracker.save(args.snapshot)
+    for recipe_id, score in tracker.top(args.window, args.category):
+        print(f"{recipe_id}\t{score}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
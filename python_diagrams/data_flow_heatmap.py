@@ -0,0 +1,465 @@
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable, Iterator
+
+from graphviz import Digraph
+
+from data_flow_graphviz import build_level1_dfd, build_level2_dfd
+from diagram_export import DiagramModel
+
+BUILDERS: dict[str, Callable[[], Digraph]] = {"level1": build_level1_dfd, "level2": build_level2_dfd}
+
+# Table -> data store label, and ordered fingerprint rules -> process label per
+# DFD level. The first matching rule wins; a mapping file passed with
+# --mapping is tried before these and may add or override stores.
+DEFAULT_MAPPING: dict = {
+    "stores": {
+        "user": "Users DB",
+        "favorite": "Users DB",
+        "session": "Session Store",
+        "recipe": "Recipes DB",
+        "ingredient": "Recipes DB",
+        "instruction": "Recipes DB",
+        "recipe_image": "Recipes DB",
+        "like_record": "Recipes DB",
+        "recipe_view": "Recipes DB",
+        "review": "Reviews DB",
+        "search_history": "Search History",
+        "daily_stat": "Daily Stats",
+        "activity_log": "Activity Log",
+    },
+    "rules": [
+        {"match": r"\bsession\b", "level1": "Session & Role Management", "level2": "Start Session"},
+        {"match": r"^update user set last_active\b", "level1": "Session & Role Management", "level2": "Start Session"},
+        {"match": r"^select .* from user\b.* where (\w+\.)?email = \?", "level1": "Authenticate & Register", "level2": "Validate Credentials"},
+        {"match": r"^insert into user\b", "level1": "Authenticate & Register", "level2": "Create Account"},
+        {"match": r"^update user\b", "level1": "Profile Management", "level2": "Update Profile"},
+        {"match": r"^(delete from|select .* from) user\b", "level1": "Admin User Moderation", "level2": "Manage Users"},
+        {"match": r"^insert into recipe_view\b", "level1": "View Recipe Detail", "level2": "Record View"},
+        {"match": r"^(insert into|update) daily_stat\b", "level1": "View Recipe Detail", "level2": "Record View"},
+        {"match": r"\brecipe_view\b", "level1": "View Recipe Detail", "level2": "View Recipe Detail"},
+        {"match": r"\blike_record\b", "level1": "Likes & Favorites", "level2": "Toggle Like"},
+        {"match": r"\bfavorite\b", "level1": "Likes & Favorites", "level2": "Toggle Favorite"},
+        {"match": r"^delete from review\b", "level1": "Delete Review", "level2": "Delete Review"},
+        {"match": r"^(insert into|update) review\b", "level1": "Reviews & Ratings", "level2": "Add/Update Review"},
+        {"match": r"^select .* from review\b", "level1": "Reviews & Ratings", "level2": "Browse/Search Recipes"},
+        {"match": r"\bsearch_history\b", "level1": "Browse/Search Recipes", "level2": "Save Search History"},
+        {"match": r"^update recipe set status\b", "level1": "Admin Recipe Moderation", "level2": "Manage Recipes"},
+        {"match": r"^delete from recipe\b", "level1": "Create/Edit/Delete Recipe", "level2": "Delete Own Recipe"},
+        {"match": r"^(insert into|update|delete from) (recipe|ingredient|instruction|recipe_image)\b", "level1": "Create/Edit/Delete Recipe", "level2": "Create/Edit Recipe"},
+        {"match": r"^select .* from (recipe|ingredient|instruction|recipe_image)\b( \w+)? where (\w+\.)?(id|recipe_id) = \?", "level1": "View Recipe Detail", "level2": "View Recipe Detail"},
+        {"match": r"^select .* from (recipe|ingredient|instruction|recipe_image)\b", "level1": "Browse/Search Recipes", "level2": "Browse/Search Recipes"},
+        {"match": r"\bdaily_stat\b", "level1": "Analytics & Activity Logging", "level2": "View Dashboard Stats"},
+        {"match": r"^insert into activity_log\b", "level1": "Analytics & Activity Logging", "level2": "Manage Users"},
+        {"match": r"\bactivity_log\b", "level1": "Analytics & Activity Logging", "level2": "Review Activity Log"},
+    ],
+}
+
+WRITES = ("insert", "update", "delete", "replace")
+# Low -> high load, blue through pale yellow to red.
+RAMP = ((0x2C, 0x7B, 0xB6), (0xFF, 0xFF, 0xBF), (0xD7, 0x19, 0x1C))
+IDLE_COLOR = "#BBBBBB"
+
+
+@dataclass
+class Statement:
+    sql: str
+    ts: float | None = None
+    query_time: float | None = None
+    rows_examined: int | None = None
+
+
+@dataclass
+class FingerprintStats:
+    kind: str
+    tables: tuple[str, ...]
+    sample: str
+    count: int = 0
+    timed: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    rows_examined: int = 0
+
+
+@dataclass
+class EdgeLoad:
+    count: int = 0
+    total_time: float = 0.0
+    rows_examined: int = 0
+    fingerprints: set[str] = field(default_factory=set)
+
+    def add(self, fingerprint: str, stats: FingerprintStats) -> None:
+        self.count += stats.count
+        self.total_time += stats.total_time
+        self.rows_examined += stats.rows_examined
+        self.fingerprints.add(fingerprint)
+
+    def merge(self, other: "EdgeLoad") -> None:
+        self.count += other.count
+        self.total_time += other.total_time
+        self.rows_examined += other.rows_examined
+        self.fingerprints |= other.fingerprints
+
+
+# -- log reading ---------------------------------------------------------------
+
+_GENERAL = re.compile(
+    r"^(?:(?P<ts>\d{4}-\d\d-\d\dT\S+|\d{6}\s+\d{1,2}:\d\d:\d\d)\s+|\s+)(?P<thread>\d+)\s+(?P<command>[A-Z][A-Za-z ]*?)\t(?P<arg>.*)$"
+)
+_BANNER = re.compile(r"^(/\S+, Version: |Tcp port: |Time\s+Id\s+Command)")
+_SLOW_METRICS = re.compile(r"Query_time:\s*([\d.]+).*?Rows_examined:\s*(\d+)")
+
+
+def _parse_ts(text: str) -> float | None:
+    text = " ".join(text.split())
+    try:
+        if "T" in text:
+            ts = datetime.fromisoformat(text)
+        else:
+            ts = datetime.strptime(text, "%y%m%d %H:%M:%S")
+    except ValueError:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def _open(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, encoding="utf-8", errors="replace")
+
+
+def read_log(path: Path) -> Iterator[Statement]:
+    """Stream statements from a MySQL/MariaDB general or slow query log.
+
+    General-log ``Query``/``Execute`` entries give statement and time only;
+    slow-log entries also carry ``Query_time`` and ``Rows_examined``.
+    Multi-line statements are joined. Plain ``.gz`` files are read as-is.
+    """
+    current: Statement | None = None
+    meta: Statement | None = None
+    with _open(path) as fh:
+        for line in fh:
+            line = line.rstrip("\r\n")
+            if line.startswith("# "):
+                if current is not None:
+                    yield current
+                    current = None
+                if line.startswith("# Time:"):
+                    meta = Statement("", ts=_parse_ts(line[7:].strip()))
+                metrics = _SLOW_METRICS.search(line)
+                if metrics:
+                    meta = meta or Statement("")
+                    meta.query_time, meta.rows_examined = float(metrics.group(1)), int(metrics.group(2))
+                continue
+            general = _GENERAL.match(line)
+            if general or _BANNER.match(line):
+                if current is not None:
+                    yield current
+                    current = None
+                if general and general.group("command") in ("Query", "Execute"):
+                    ts = general.group("ts")
+                    current = Statement(general.group("arg"), ts=_parse_ts(ts) if ts else None)
+                continue
+            if meta is not None and current is None:
+                if line.startswith("SET timestamp="):
+                    meta.ts = float(line[14:].rstrip(";"))
+                    continue
+                if re.match(r"use \S+;$", line, re.I):
+                    continue
+                current, meta = meta, None
+                current.sql = line
+            elif current is not None:
+                current.sql += "\n" + line
+        if current is not None:
+            yield current
+
+
+# -- fingerprinting ------------------------------------------------------------
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"")
+_COMMENT = re.compile(r"/\*.*?\*/|--[^\n]*|#[^\n]*", re.S)
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?(?:e[+-]?\d+)?\b|\b0x[0-9a-f]+\b", re.I)
+_IN_LIST = re.compile(r"\bin \(\?(?:, ?\?)*\)")
+_ROW = r"\([^()]*(?:\([^()]*\)[^()]*)*\)"  # one level of nested calls, e.g. now()
+_VALUES = re.compile(rf"\bvalues ?{_ROW}(?:, ?{_ROW})*")
+_TABLES = re.compile(r"\b(?:from|join|into|update)\s+(?:\w+\.)?(\w+)")
+_NOT_TABLES = {"select", "set", "where", "dual", "values"}
+
+
+def fingerprint(sql: str) -> str:
+    """Normalise a statement so every execution of the same query shape compares equal.
+
+    Literals become ``?``, ``IN`` lists and multi-row ``VALUES`` collapse to
+    ``(?+)``, comments and backticks go, and whitespace and case are folded,
+    as ``pt-fingerprint`` does.
+    """
+    text = _STRING.sub("?", sql)
+    text = _COMMENT.sub(" ", text)
+    text = _NUMBER.sub("?", text.replace("`", ""))
+    text = " ".join(text.lower().split()).rstrip(";").rstrip()
+    text = _IN_LIST.sub("in (?+)", text)
+    return _VALUES.sub("values (?+)", text)
+
+
+def tables_of(fp: str) -> tuple[str, ...]:
+    head = fp.split(" on duplicate key update ", 1)[0]
+    return tuple(dict.fromkeys(t for t in _TABLES.findall(head) if t not in _NOT_TABLES))
+
+
+@dataclass
+class TrafficProfile:
+    fingerprints: dict[str, FingerprintStats] = field(default_factory=dict)
+    first_ts: float | None = None
+    last_ts: float | None = None
+    statements: int = 0
+
+    def add(self, statement: Statement) -> None:
+        fp = fingerprint(statement.sql)
+        stats = self.fingerprints.get(fp)
+        if stats is None:
+            kind = fp.split(" ", 1)[0]
+            stats = self.fingerprints[fp] = FingerprintStats("select" if kind == "with" else kind, tables_of(fp), statement.sql[:500])
+        stats.count += 1
+        if statement.query_time is not None:
+            stats.timed += 1
+            stats.total_time += statement.query_time
+            stats.max_time = max(stats.max_time, statement.query_time)
+        stats.rows_examined += statement.rows_examined or 0
+        if statement.ts is not None:
+            self.first_ts = statement.ts if self.first_ts is None else min(self.first_ts, statement.ts)
+            self.last_ts = statement.ts if self.last_ts is None else max(self.last_ts, statement.ts)
+        self.statements += 1
+
+    @property
+    def duration(self) -> float:
+        if self.first_ts is None or self.last_ts is None:
+            return 1.0
+        return max(self.last_ts - self.first_ts, 1.0)
+
+
+def analyse(statements: Iterable[Statement]) -> TrafficProfile:
+    profile = TrafficProfile()
+    for statement in statements:
+        profile.add(statement)
+    return profile
+
+
+# -- mapping onto the DFDs -----------------------------------------------------
+
+
+def load_mapping(path: Path | None = None) -> dict:
+    mapping = {"stores": dict(DEFAULT_MAPPING["stores"]), "rules": list(DEFAULT_MAPPING["rules"])}
+    if path is not None:
+        custom = json.loads(path.read_text(encoding="utf-8"))
+        mapping["stores"].update(custom.get("stores", {}))
+        mapping["rules"] = list(custom.get("rules", [])) + mapping["rules"]
+    mapping["compiled"] = [(re.compile(rule["match"]), rule) for rule in mapping["rules"]]
+    return mapping
+
+
+def edge_loads(
+    profile: TrafficProfile, mapping: dict, level: str
+) -> tuple[dict[tuple[str, str, str], EdgeLoad], dict[str, list[str]], EdgeLoad]:
+    """Load per (process label, store label, "read"/"write"), fingerprints per store, and unmapped load."""
+    loads: dict[tuple[str, str, str], EdgeLoad] = {}
+    by_store: dict[str, list[str]] = {}
+    unmapped = EdgeLoad()
+    for fp, stats in profile.fingerprints.items():
+        stores = list(dict.fromkeys(mapping["stores"][t] for t in stats.tables if t in mapping["stores"]))
+        for store in stores:
+            by_store.setdefault(store, []).append(fp)
+        process = next((rule.get(level) for pattern, rule in mapping["compiled"] if pattern.search(fp)), None)
+        if process is None or not stores:
+            if stats.tables:
+                unmapped.add(fp, stats)
+            continue
+        direction = "write" if stats.kind in WRITES else "read"
+        for store in stores:
+            loads.setdefault((process, store, direction), EdgeLoad()).add(fp, stats)
+    return loads, by_store, unmapped
+
+
+# -- rendering -----------------------------------------------------------------
+
+def _color(share: float) -> str:
+    position = min(max(share, 0.0), 1.0) * (len(RAMP) - 1)
+    low = min(int(position), len(RAMP) - 2)
+    frac = position - low
+    rgb = (round(a + (b - a) * frac) for a, b in zip(RAMP[low], RAMP[low + 1]))
+    return "#" + "".join(f"{c:02X}" for c in rgb)
+
+
+def _metric(load: EdgeLoad, metric: str) -> float:
+    return {"count": load.count, "time": load.total_time, "rows": load.rows_examined}[metric]
+
+
+def render_heatmap(
+    level: str,
+    profile: TrafficProfile,
+    mapping: dict,
+    metric: str = "count",
+    top: int = 5,
+) -> tuple[Digraph, dict]:
+    """The ``level`` DFD with data-store edges sized and coloured by observed load.
+
+    Pen width grows with the square root of the edge's share of the busiest
+    edge, colour runs blue -> yellow -> red. Store edges are restyled where
+    they stand in the DOT body, so edge order, and with it the layout, stays
+    that of the plain DFD. Flows with traffic but no edge in the diagram are
+    appended dashed, and each store gets a note listing its ``top``
+    fingerprints by total time (by count for general logs).
+    """
+    g = BUILDERS[level]()
+    model = DiagramModel.from_graph(g)
+    g.attr(label=f"{g.name} - traffic by {metric}")
+    labels: dict[str, str] = {}
+    for name in model.nodes:
+        labels.setdefault(model.label(name), name)
+    loads, by_store, unmapped = edge_loads(profile, mapping, level)
+    # (tail, head) -> indexes into model.edges; some pairs are drawn more than once.
+    edges: dict[tuple[str, str], list[int]] = {}
+    for i, (tail, head, attrs) in enumerate(model.edges):
+        if "invis" not in attrs.get("style", ""):
+            edges.setdefault((tail, head), []).append(i)
+
+    def restyle(i: int, **heat: str) -> None:
+        # Render with graphviz's own quoting, then put the line back in place.
+        tail, head, attrs = model.edges[i]
+        g.edge(tail, head, **{**attrs, **heat})
+        g.body[model.edge_lines[i]] = g.body.pop()
+
+    placed: dict[tuple[str, str], EdgeLoad] = {}
+    for (process, store, direction), load in loads.items():
+        if process not in labels or store not in labels:
+            unmapped.merge(load)
+            continue
+        p, s = labels[process], labels[store]
+        # Reads are drawn store -> process and writes process -> store, but many
+        # flows only have one arrow; use whichever exists.
+        key = (p, s) if direction == "write" else (s, p)
+        if key not in edges and key[::-1] in edges:
+            key = key[::-1]
+        placed.setdefault(key, EdgeLoad()).merge(load)
+
+    stores = {labels[store] for store in mapping["stores"].values() if store in labels}
+    peak = max((_metric(load, metric) for load in placed.values()), default=0) or 1
+    edge_rows = []
+    for key, load in sorted(placed.items(), key=lambda kv: -_metric(kv[1], metric)):
+        documented = key in edges
+        share = _metric(load, metric) / peak
+        text = f"{load.count / profile.duration:.2f} qps"
+        if load.total_time:
+            text += f", {load.total_time:.2f}s"
+        if load.rows_examined:
+            text += f", {load.rows_examined:,} rows"
+        heat = {"penwidth": f"{1 + 7 * math.sqrt(share):.2f}", "color": _color(share), "fontcolor": _color(share)}
+        if documented:
+            # Traffic goes under the first drawing's label; repeats keep theirs.
+            first, *rest = edges[key]
+            xlabel = model.edges[first][2].get("xlabel", "")
+            restyle(first, xlabel=f"{xlabel}\\n{text}" if xlabel else text, **heat)
+            for i in rest:
+                restyle(i, **heat)
+        else:
+            g.edge(*key, xlabel=f"(not in DFD)\\n{text}", style="dashed", **heat)
+        edge_rows.append(
+            {
+                "tail": key[0],
+                "head": key[1],
+                "documented": documented,
+                "qps": load.count / profile.duration,
+                "count": load.count,
+                "total_time": load.total_time,
+                "rows_examined": load.rows_examined,
+                "fingerprints": sorted(load.fingerprints),
+            }
+        )
+    for key, indexes in edges.items():
+        if stores & set(key) and key not in placed:
+            for i in indexes:
+                restyle(i, color=IDLE_COLOR, fontcolor=IDLE_COLOR)
+
+    timed = any(s.timed for s in profile.fingerprints.values())
+    slow = {}
+    for store, fps in sorted(by_store.items()):
+        if store not in labels:
+            continue
+        ranked = sorted(
+            fps,
+            key=lambda f: (profile.fingerprints[f].total_time if timed else profile.fingerprints[f].count),
+            reverse=True,
+        )[:top]
+        slow[store] = [
+            {"fingerprint": f, **{k: getattr(profile.fingerprints[f], k) for k in ("count", "total_time", "max_time", "rows_examined")}}
+            for f in ranked
+        ]
+        lines = [
+            (f"{profile.fingerprints[f].total_time:.2f}s" if timed else f"x{profile.fingerprints[f].count}")
+            + f"  {f[:70]}{'...' if len(f) > 70 else ''}"
+            for f in ranked
+        ]
+        note = f"{labels[store]}_slow"
+        g.node(note, "\\l".join(lines) + "\\l", shape="note", fontsize="9", fontname="Courier")
+        g.edge(labels[store], note, style="dotted", arrowhead="none")
+
+    report = {
+        "level": level,
+        "metric": metric,
+        "duration": profile.duration,
+        "statements": profile.statements,
+        "edges": edge_rows,
+        "top_fingerprints": slow,
+        "unmapped": {
+            "count": unmapped.count,
+            "total_time": unmapped.total_time,
+            "fingerprints": sorted(unmapped.fingerprints),
+        },
+    }
+    return g, report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Re-render the DFDs with load from MySQL query logs")
+    parser.add_argument("logs", type=Path, nargs="+", help="General or slow query logs (.gz allowed)")
+    parser.add_argument("--mapping", type=Path, help="JSON with extra 'stores' and 'rules' (tried first)")
+    parser.add_argument("--metric", choices=("count", "time", "rows"), help="Default: time for slow logs, else count")
+    parser.add_argument("--duration", type=float, help="Seconds the logs cover (default: first to last timestamp)")
+    parser.add_argument("--top", type=int, default=5, help="Fingerprints listed per store")
+    args = parser.parse_args()
+
+    profile = TrafficProfile()
+    for path in args.logs:
+        for statement in read_log(path):
+            profile.add(statement)
+    if args.duration:
+        profile.first_ts, profile.last_ts = 0.0, args.duration
+    metric = args.metric or ("time" if any(s.timed for s in profile.fingerprints.values()) else "count")
+    mapping = load_mapping(args.mapping)
+    out_dir = Path(__file__).parent / "out"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    reports = {}
+    for level in BUILDERS:
+        g, reports[level] = render_heatmap(level, profile, mapping, metric, args.top)
+        g.render(out_dir / f"data_flow_{level}_traffic", cleanup=True)
+    (out_dir / "data_flow_traffic.json").write_text(json.dumps(reports, indent=2), encoding="utf-8")
+    print(f"{profile.statements} statements, {len(profile.fingerprints)} fingerprints over {profile.duration:.0f}s")
+    for level, report in reports.items():
+        print(f"{level}:")
+        for row in report["edges"][:10]:
+            flag = "" if row["documented"] else "  (not in DFD)"
+            print(f"  {row['tail']:>4} -> {row['head']:<4} {row['qps']:9.2f} qps {row['total_time']:9.2f}s{flag}")
+        print(f"  unmapped: {report['unmapped']['count']} statements")
+
+
+if __name__ == "__main__":
+    main()
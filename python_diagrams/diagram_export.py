@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from graphviz import Digraph, ExecutableNotFound
+
+import flowchart_graphviz
+from data_flow_graphviz import build_context_dfd, build_level1_dfd, build_level2_dfd
+from er_recipe_conceptual_graphviz import build_er_recipe_conceptual
+from er_recipe_logical_graphviz import build_er_recipe_logical
+from flowchart_graphviz import build_flowchart
+
+# Importing flowchart_graphviz turns every Digraph's edge labels into xlabels;
+# build_flowchart() keeps its own per-graph wrapper, so the other builders get
+# their labels back and lay out exactly as when run on their own.
+Digraph.edge = flowchart_graphviz._digraph_edge_orig
+
+# Export name -> builder; names match the images in out/.
+DIAGRAMS: dict[str, Callable[[], Digraph]] = {
+    "application_flowchart": build_flowchart,
+    "data_flow_context": build_context_dfd,
+    "data_flow_level1": build_level1_dfd,
+    "data_flow_level2": build_level2_dfd,
+    "er_recipe_conceptual": build_er_recipe_conceptual,
+    "er_recipe_logical": build_er_recipe_logical,
+}
+# Bump when the payload format changes so cached exports are rebuilt.
+EXPORT_VERSION = "1"
+OUT_DIR = Path(__file__).resolve().parent.parent / "public" / "diagrams"
+
+# Edge flags in the layout payload.
+DASHED, DOTTED, NO_ARROW = 1, 2, 4
+
+_ID = r'"(?:[^"\\]|\\.)*"|[^\s\[\]{}"]+'
+_ATTR = re.compile(r'(\w+)=("(?:[^"\\]|\\.)*"|<[^>]*>|[^\s\]]+)', re.S)
+_SUBGRAPH = re.compile(r"^(?:subgraph (\S+) )?\{$")
+_DEFAULTS = re.compile(r"^(node|edge|graph) \[(.*)\]$", re.S)
+_EDGE = re.compile(rf"^({_ID}) -> ({_ID})(?: \[(.*)\])?$", re.S)
+_NODE = re.compile(rf"^({_ID})(?: \[(.*)\])?$", re.S)
+
+
+def _unquote(value: str) -> str:
+    if value.startswith('"') and value.endswith('"'):
+        return value[1:-1].replace('\\"', '"')
+    return value
+
+
+def _attrs(text: str | None) -> dict[str, str]:
+    return {k: _unquote(v) for k, v in _ATTR.findall(text or "")}
+
+
+def _text(label: str) -> str:
+    """DOT escString to plain text: ``\\n``/``\\l``/``\\r`` line breaks become newlines."""
+    return re.sub(r"\\[nlr]", "\n", label).rstrip("\n")
+
+
+@dataclass
+class DiagramModel:
+    """Nodes, edges and clusters of a builder's graph, with attributes resolved.
+
+    Parsed from the statements ``graphviz.Digraph`` emits (``g.body``), so
+    node and edge defaults set with ``g.attr("node", ...)`` are applied the
+    way Graphviz applies them: per scope, at the point of declaration.
+    ``edge_lines[i]`` is the index in ``g.body`` of ``edges[i]``, for callers
+    that restyle edges in place.
+    """
+
+    name: str
+    attrs: dict[str, str] = field(default_factory=dict)
+    nodes: dict[str, dict[str, str]] = field(default_factory=dict)
+    edges: list[tuple[str, str, dict[str, str]]] = field(default_factory=list)
+    edge_lines: list[int] = field(default_factory=list)
+    clusters: dict[str, dict] = field(default_factory=dict)
+    node_cluster: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_graph(cls, g: Digraph) -> "DiagramModel":
+        model = cls(g.name)
+        # Scope stack: (cluster name or None, graph attrs, node defaults, edge defaults).
+        scopes = [(None, model.attrs, {}, {})]
+
+        def touch(name: str, attrs: dict[str, str] | None = None) -> None:
+            cluster, _, node_defaults, _ = scopes[-1]
+            node = model.nodes.setdefault(name, dict(node_defaults))
+            node.update(attrs or {})
+            if cluster is not None:
+                model.clusters[cluster]["nodes"].setdefault(name, None)
+                model.node_cluster.setdefault(name, cluster)
+
+        for index, item in enumerate(g.body):
+            stmt = item.strip("\t\n")
+            sub = _SUBGRAPH.match(stmt)
+            if sub:
+                name = _unquote(sub.group(1) or "")
+                parent = scopes[-1]
+                cluster = name if name.startswith("cluster") else parent[0]
+                attrs: dict[str, str] = {}
+                if name.startswith("cluster"):
+                    model.clusters[name] = {"attrs": attrs, "nodes": {}}
+                scopes.append((cluster, attrs, dict(parent[2]), dict(parent[3])))
+                continue
+            if stmt == "}":
+                scopes.pop()
+                continue
+            defaults = _DEFAULTS.match(stmt)
+            if defaults:
+                kind, attrs = defaults.group(1), _attrs(defaults.group(2))
+                scopes[-1][{"graph": 1, "node": 2, "edge": 3}[kind]].update(attrs)
+                continue
+            edge = _EDGE.match(stmt)
+            if edge:
+                tail, head = _unquote(edge.group(1)), _unquote(edge.group(2))
+                touch(tail)
+                touch(head)
+                model.edges.append((tail, head, {**scopes[-1][3], **_attrs(edge.group(3))}))
+                model.edge_lines.append(index)
+                continue
+            node = _NODE.match(stmt)
+            if node and "=" not in node.group(1):
+                touch(_unquote(node.group(1)), _attrs(node.group(2)))
+                continue
+            scopes[-1][1].update(_attrs(stmt))
+        return model
+
+    def label(self, name: str) -> str:
+        label = self.nodes[name].get("label", "\\N")
+        return name if label == "\\N" else _text(label)
+
+    def visible_nodes(self) -> list[str]:
+        return [n for n, attrs in self.nodes.items() if "invis" not in attrs.get("style", "")]
+
+
+# -- Mermaid -------------------------------------------------------------------
+
+_MERMAID_SHAPES = {
+    "box": '["{}"]',
+    "rect": '["{}"]',
+    "rectangle": '["{}"]',
+    "square": '["{}"]',
+    "note": '["{}"]',
+    "plaintext": '["{}"]',
+    "ellipse": '(["{}"])',
+    "oval": '(["{}"])',
+    "circle": '(("{}"))',
+    "doublecircle": '((("{}")))',
+    "diamond": '{{"{}"}}',
+    "cylinder": '[("{}")]',
+    "hexagon": '{{{{"{}"}}}}',
+    "parallelogram": '[/"{}"/]',
+}
+
+
+def _mermaid_id(name: str) -> str:
+    ident = re.sub(r"\W", "_", name)
+    return f"n_{ident}" if ident.lower() in ("end", "graph", "subgraph", "style", "class") or ident[0].isdigit() else ident
+
+
+def _mermaid_text(text: str) -> str:
+    return text.replace('"', "#quot;").replace("\n", "<br/>")
+
+
+def to_mermaid(model: DiagramModel, source: str) -> str:
+    """Mermaid ``flowchart`` for the model: same nodes, shapes, labels, clusters and edges.
+
+    Invisible edges, which only steer the Graphviz layout, become ``~~~``
+    links so Mermaid keeps the same ordering hints.
+    """
+    direction = model.attrs.get("rankdir", "TB")
+    lines = [f"%% Generated by python_diagrams/diagram_export.py from {source}; do not edit.", f"flowchart {direction}"]
+
+    def node_line(name: str, indent: str) -> str:
+        shape = model.nodes[name].get("shape", "ellipse")
+        return indent + _mermaid_id(name) + _MERMAID_SHAPES.get(shape, '["{}"]').format(_mermaid_text(model.label(name)))
+
+    visible = set(model.visible_nodes())
+    for cluster, spec in model.clusters.items():
+        members = [n for n in spec["nodes"] if n in visible and model.node_cluster.get(n) == cluster]
+        label = _mermaid_text(_text(spec["attrs"].get("label", cluster)))
+        lines.append(f'    subgraph {_mermaid_id(cluster)}["{label}"]')
+        lines += [node_line(n, "        ") for n in members]
+        lines.append("    end")
+    lines += [node_line(n, "    ") for n in model.nodes if n in visible and n not in model.node_cluster]
+    for tail, head, attrs in model.edges:
+        if tail not in visible or head not in visible:
+            continue
+        style = attrs.get("style", "")
+        if "invis" in style:
+            lines.append(f"    {_mermaid_id(tail)} ~~~ {_mermaid_id(head)}")
+            continue
+        arrow = "none" not in (attrs.get("dir", ""), attrs.get("arrowhead", ""))
+        if "dashed" in style or "dotted" in style:
+            link = "-.->" if arrow else "-.-"
+        else:
+            link = "-->" if arrow else "---"
+        text = attrs.get("label") or attrs.get("xlabel")
+        label = f'|"{_mermaid_text(_text(text))}"|' if text else ""
+        lines.append(f"    {_mermaid_id(tail)} {link}{label} {_mermaid_id(head)}")
+    return "\n".join(lines) + "\n"
+
+
+# -- pre-laid-out JSON ----------------------------------------------------------
+
+
+def _floats(text: str) -> list[float]:
+    return [float(v) for v in re.split(r"[,\s]+", text.strip()) if v]
+
+
+def to_layout(model: DiagramModel, layout: dict, digest: str) -> dict:
+    """Compact, browser-ready geometry from one ``json0`` layout pass.
+
+    Coordinates are rounded points with the origin at the top-left. Rows are
+    arrays rather than objects to keep the payload small:
+
+    * ``nodes``: ``[name, label, shape, cx, cy, width, height]``
+    * ``edges``: ``[tail index, head index, [x0, y0, x1, y1, ...], arrow tip
+      [x, y] or 0, label, label x, label y, flags]``. The points are the
+      Graphviz cubic B-spline (``M p0 C p1 p2 p3 C ...``), flags are
+      ``DASHED | DOTTED | NO_ARROW``.
+    * ``clusters``: ``[label, x0, y0, x1, y1]``
+    """
+    x0, y0, x1, y1 = _floats(layout["bb"])
+
+    def point(x: float, y: float) -> list[int]:
+        return [round(x - x0), round(y1 - y)]
+
+    laid_nodes = {o["name"]: o for o in layout.get("objects", []) if "nodes" not in o and "pos" in o}
+    names = [n for n in model.visible_nodes() if n in laid_nodes]
+    index = {name: i for i, name in enumerate(names)}
+    nodes = []
+    for name in names:
+        obj = laid_nodes[name]
+        cx, cy = point(*_floats(obj["pos"]))
+        nodes.append(
+            [
+                name,
+                model.label(name),
+                model.nodes[name].get("shape", "ellipse"),
+                cx,
+                cy,
+                round(float(obj["width"]) * 72),
+                round(float(obj["height"]) * 72),
+            ]
+        )
+
+    # Edges are matched to the layout by (tail, head) occurrence, in creation order.
+    by_gvid = {o["_gvid"]: o["name"] for o in layout.get("objects", []) if "nodes" not in o}
+    laid_edges: dict[tuple[str, str], list[dict]] = {}
+    for edge in sorted(layout.get("edges", []), key=lambda e: e["_gvid"]):
+        laid_edges.setdefault((by_gvid.get(edge["tail"]), by_gvid.get(edge["head"])), []).append(edge)
+    seen: dict[tuple[str, str], int] = {}
+    edges = []
+    for tail, head, attrs in model.edges:
+        n = seen[tail, head] = seen.get((tail, head), -1) + 1
+        candidates = laid_edges.get((tail, head), [])
+        if n >= len(candidates) or "invis" in attrs.get("style", "") or tail not in index or head not in index:
+            continue
+        laid = candidates[n]
+        points, tip = [], 0
+        for part in laid.get("pos", "").split(" "):
+            if part.startswith("e,"):
+                tip = point(*_floats(part[2:]))
+            elif part and not part.startswith("s,"):
+                points += point(*_floats(part))
+        text = attrs.get("label") or attrs.get("xlabel") or ""
+        where = laid.get("lp") or laid.get("xlp")
+        lx, ly = point(*_floats(where)) if where and text else (0, 0)
+        style = attrs.get("style", "")
+        flags = (DASHED if "dashed" in style else 0) | (DOTTED if "dotted" in style else 0)
+        if "none" in (attrs.get("dir", ""), attrs.get("arrowhead", "")) or not tip:
+            flags |= NO_ARROW
+        edges.append([index[tail], index[head], points, tip, _text(text), lx, ly, flags])
+
+    clusters = []
+    for obj in layout.get("objects", []):
+        if obj.get("name", "").startswith("cluster") and "bb" in obj:
+            cx0, cy0, cx1, cy1 = _floats(obj["bb"])
+            spec = model.clusters.get(obj["name"], {"attrs": {}})
+            clusters.append([_text(spec["attrs"].get("label", "")), *point(cx0, cy1), *point(cx1, cy0)])
+
+    return {
+        "v": EXPORT_VERSION,
+        "hash": digest,
+        "name": model.name,
+        "title": _text(model.attrs.get("label", model.name)),
+        "size": [round(x1 - x0), round(y1 - y0)],
+        "nodes": nodes,
+        "edges": edges,
+        "clusters": clusters,
+    }
+
+
+def run_layout(g: Digraph) -> dict:
+    """Lay ``g`` out with ``dot -Tjson0``.
+
+    Falls back to pygraphviz's bundled Graphviz when the ``dot`` executable
+    is not on PATH (e.g. on machines with only the Python wheels).
+    """
+    try:
+        return json.loads(g.pipe(format="json0"))
+    except ExecutableNotFound as exc:
+        try:
+            import pygraphviz
+        except ImportError:
+            raise exc from None
+        return json.loads(pygraphviz.AGraph(string=g.source).draw(format="json0", prog="dot"))
+
+
+def source_hash(g: Digraph) -> str:
+    return hashlib.sha256(f"{EXPORT_VERSION}\n{g.source}".encode()).hexdigest()[:16]
+
+
+def export(names: list[str] | None = None, out_dir: Path = OUT_DIR, force: bool = False) -> dict[str, dict]:
+    """Write ``<name>.json`` and ``<name>.mmd`` for each diagram plus ``index.json``.
+
+    A diagram whose DOT source hash matches the one recorded in
+    ``index.json`` is skipped, so Graphviz only runs for changed builders.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    index_path = out_dir / "index.json"
+    index = json.loads(index_path.read_text(encoding="utf-8")) if index_path.exists() else {}
+    for name in names or list(DIAGRAMS):
+        builder = DIAGRAMS[name]
+        g = builder()
+        digest = source_hash(g)
+        json_path, mmd_path = out_dir / f"{name}.json", out_dir / f"{name}.mmd"
+        cached = index.get(name, {})
+        if not force and cached.get("hash") == digest and json_path.exists() and mmd_path.exists():
+            cached["cached"] = True
+            continue
+        model = DiagramModel.from_graph(g)
+        layout = run_layout(g)
+        payload = to_layout(model, layout, digest)
+        body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+        json_path.write_text(body, encoding="utf-8")
+        mmd_path.write_text(to_mermaid(model, f"{builder.__module__}.{builder.__name__}()"), encoding="utf-8")
+        index[name] = {
+            "hash": digest,
+            "title": payload["title"],
+            "json": json_path.name,
+            "mmd": mmd_path.name,
+            "bytes": len(body.encode()),
+            "nodes": len(payload["nodes"]),
+            "edges": len(payload["edges"]),
+            "cached": False,
+        }
+    index_path.write_text(
+        json.dumps({k: {f: v for f, v in row.items() if f != "cached"} for k, row in index.items()}, indent=2),
+        encoding="utf-8",
+    )
+    return index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export the diagrams as Mermaid and pre-laid-out JSON")
+    parser.add_argument("names", nargs="*", metavar="name", help=f"Default: all of {', '.join(DIAGRAMS)}")
+    parser.add_argument("--out", type=Path, default=OUT_DIR)
+    parser.add_argument("--force", action="store_true", help="Re-run the layout even when the source is unchanged")
+    args = parser.parse_args()
+    unknown = sorted(set(args.names) - set(DIAGRAMS))
+    if unknown:
+        parser.error(f"unknown diagram(s): {', '.join(unknown)}")
+
+    for name, row in export(args.names or None, args.out, args.force).items():
+        state = "cached" if row.get("cached") else "exported"
+        print(f"{name:<24} {state:<9} {row['nodes']:>4} nodes {row['edges']:>4} edges {row['bytes'] / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
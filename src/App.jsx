@@ -15,6 +15,7 @@ import { Profile } from './pages/Recipe/Profile';
 import { AdminStats } from './pages/Admin/AdminStats';
 import { UserList } from './pages/Admin/UserList';
 import { AdminRecipes } from './pages/Admin/AdminRecipes';
+import { AdminDiagrams } from './pages/Admin/AdminDiagrams';
 
 function App() {
   return (
@@ -45,6 +46,7 @@ function App() {
             <Route index element={<AdminStats />} />
             <Route path="users" element={<UserList />} />
             <Route path="recipes" element={<AdminRecipes />} />
+            <Route path="diagrams" element={<AdminDiagrams />} />
           </Route>
 
           {/* Catch All */}
@@ -0,0 +1,219 @@
+import { useCallback, useEffect, useMemo, useRef, useState } from 'react';
+import { ZoomIn, ZoomOut, Maximize } from 'lucide-react';
+import { Button } from '../ui/Button';
+import { cn } from '../../lib/utils';
+
+const MIN_SCALE = 0.05;
+const MAX_SCALE = 4;
+// Below this scale labels are unreadable, so they are not drawn at all.
+const LABEL_SCALE = 0.35;
+const FONT_SIZE = 14;
+const LINE_HEIGHT = 16;
+
+const overlaps = (box, view) => box[0] <= view[2] && box[2] >= view[0] && box[1] <= view[3] && box[3] >= view[1];
+
+const clamp = (value, lo, hi) => Math.min(hi, Math.max(lo, value));
+
+const fitView = (diagram, size) => {
+    const k = clamp(Math.min(size.width / diagram.width, size.height / diagram.height) * 0.95, MIN_SCALE, MAX_SCALE);
+    return {
+        k,
+        x: diagram.width / 2 - size.width / 2 / k,
+        y: diagram.height / 2 - size.height / 2 / k,
+    };
+};
+
+const NodeShape = ({ node }) => {
+    const { x, y, w, h } = node;
+    const className = 'fill-white stroke-cool-gray-60';
+    switch (node.shape) {
+        case 'ellipse':
+        case 'oval':
+        case 'circle':
+            return <ellipse cx={x} cy={y} rx={w / 2} ry={h / 2} className={className} />;
+        case 'doublecircle':
+            return (
+                <>
+                    <ellipse cx={x} cy={y} rx={w / 2} ry={h / 2} className={className} />
+                    <ellipse cx={x} cy={y} rx={w / 2 - 4} ry={h / 2 - 4} className={className} />
+                </>
+            );
+        case 'diamond':
+            return <polygon points={`${x},${y - h / 2} ${x + w / 2},${y} ${x},${y + h / 2} ${x - w / 2},${y}`} className={className} />;
+        case 'cylinder': {
+            const ry = Math.min(h / 8, 8);
+            const top = y - h / 2 + ry;
+            const bottom = y + h / 2 - ry;
+            return (
+                <path
+                    d={`M${x - w / 2},${top} a${w / 2},${ry} 0 0 1 ${w},0 a${w / 2},${ry} 0 0 1 ${-w},0 V${bottom} a${w / 2},${ry} 0 0 0 ${w},0 V${top}`}
+                    className={className}
+                />
+            );
+        }
+        case 'plaintext':
+        case 'none':
+            return null;
+        default:
+            return <rect x={x - w / 2} y={y - h / 2} width={w} height={h} className={className} />;
+    }
+};
+
+const Label = ({ lines, x, y, className, fontSize = FONT_SIZE }) => (
+    <text x={x} y={y - ((lines.length - 1) * LINE_HEIGHT) / 2} textAnchor="middle" dominantBaseline="central" fontSize={fontSize} className={className}>
+        {lines.map((line, i) => (
+            <tspan key={i} x={x} dy={i === 0 ? 0 : LINE_HEIGHT}>
+                {line}
+            </tspan>
+        ))}
+    </text>
+);
+
+// Pan/zoom viewer for a decoded diagram (see lib/diagrams.js); only what intersects the viewport is rendered.
+export function DiagramViewer({ diagram, className }) {
+    const containerRef = useRef(null);
+    const dragRef = useRef(null);
+    const [size, setSize] = useState({ width: 0, height: 0 });
+    // Pan/zoom state, tagged with the diagram it belongs to; until the user moves, the fitted view is shown.
+    const [override, setOverride] = useState(null);
+
+    useEffect(() => {
+        const element = containerRef.current;
+        const observer = new ResizeObserver(([entry]) => {
+            setSize({ width: entry.contentRect.width, height: entry.contentRect.height });
+        });
+        observer.observe(element);
+        return () => observer.disconnect();
+    }, []);
+
+    const fitted = useMemo(() => (size.width && size.height ? fitView(diagram, size) : null), [diagram, size]);
+    const view = override?.diagram === diagram ? override.view : fitted;
+
+    const updateView = useCallback(
+        (change) => {
+            setOverride((current) => {
+                const base = current?.diagram === diagram ? current.view : fitted;
+                return base ? { diagram, view: change(base) } : current;
+            });
+        },
+        [diagram, fitted],
+    );
+
+    const zoomAt = useCallback(
+        (factor, px, py) => {
+            updateView((v) => {
+                const k = clamp(v.k * factor, MIN_SCALE, MAX_SCALE);
+                // Keep the world point under (px, py) fixed.
+                return { k, x: v.x + px / v.k - px / k, y: v.y + py / v.k - py / k };
+            });
+        },
+        [updateView],
+    );
+
+    useEffect(() => {
+        // React's onWheel is passive, so the page would scroll too.
+        const element = containerRef.current;
+        const onWheel = (event) => {
+            event.preventDefault();
+            const rect = element.getBoundingClientRect();
+            zoomAt(Math.exp(-event.deltaY * 0.0015), event.clientX - rect.left, event.clientY - rect.top);
+        };
+        element.addEventListener('wheel', onWheel, { passive: false });
+        return () => element.removeEventListener('wheel', onWheel);
+    }, [zoomAt]);
+
+    const handlePointerDown = (event) => {
+        if (!view || event.target.closest('button')) return;
+        event.currentTarget.setPointerCapture(event.pointerId);
+        dragRef.current = { px: event.clientX, py: event.clientY, x: view.x, y: view.y };
+    };
+
+    const handlePointerMove = (event) => {
+        const drag = dragRef.current;
+        if (!drag) return;
+        updateView((v) => ({ ...v, x: drag.x - (event.clientX - drag.px) / v.k, y: drag.y - (event.clientY - drag.py) / v.k }));
+    };
+
+    const handlePointerUp = () => {
+        dragRef.current = null;
+    };
+
+    const visible = useMemo(() => {
+        if (!view) return { clusters: [], edges: [], nodes: [] };
+        const margin = 20 / view.k;
+        const viewport = [view.x - margin, view.y - margin, view.x + size.width / view.k + margin, view.y + size.height / view.k + margin];
+        return {
+            clusters: diagram.clusters.filter((c) => overlaps(c.box, viewport)),
+            edges: diagram.edges.filter((e) => overlaps(e.box, viewport)),
+            nodes: diagram.nodes.filter((n) => overlaps(n.box, viewport)),
+        };
+    }, [diagram, view, size]);
+
+    const showLabels = view && view.k >= LABEL_SCALE;
+    const center = [size.width / 2, size.height / 2];
+
+    return (
+        <div
+            ref={containerRef}
+            className={cn('relative overflow-hidden touch-none select-none rounded-lg border border-cool-gray-20 bg-cool-gray-10 cursor-grab active:cursor-grabbing', className)}
+            onPointerDown={handlePointerDown}
+            onPointerMove={handlePointerMove}
+            onPointerUp={handlePointerUp}
+            onPointerCancel={handlePointerUp}
+        >
+            {view && (
+                <svg width={size.width} height={size.height} className="block">
+                    <g transform={`scale(${view.k}) translate(${-view.x} ${-view.y})`}>
+                        {visible.clusters.map((cluster) => (
+                            <g key={cluster.label + cluster.box.join()}>
+                                <rect
+                                    x={cluster.box[0]}
+                                    y={cluster.box[1]}
+                                    width={cluster.box[2] - cluster.box[0]}
+                                    height={cluster.box[3] - cluster.box[1]}
+                                    rx={6}
+                                    className="fill-white/60 stroke-cool-gray-30"
+                                />
+                                {showLabels && cluster.label && (
+                                    <Label lines={[cluster.label]} x={(cluster.box[0] + cluster.box[2]) / 2} y={cluster.box[1] + 14} className="fill-cool-gray-60 font-semibold" />
+                                )}
+                            </g>
+                        ))}
+                        {visible.edges.map((edge) => (
+                            <g key={edge.key}>
+                                <path
+                                    d={edge.d}
+                                    fill="none"
+                                    strokeDasharray={edge.dashed ? '6 4' : edge.dotted ? '2 3' : undefined}
+                                    className="stroke-cool-gray-60"
+                                />
+                                {edge.arrow && <polygon points={edge.arrow} className="fill-cool-gray-60" />}
+                                {showLabels && edge.label && (
+                                    <Label lines={edge.label.split('\n')} x={edge.lx} y={edge.ly} fontSize={11} className="fill-cool-gray-60" />
+                                )}
+                            </g>
+                        ))}
+                        {visible.nodes.map((node) => (
+                            <g key={node.id}>
+                                <title>{node.label}</title>
+                                <NodeShape node={node} />
+                                {showLabels && <Label lines={node.lines} x={node.x} y={node.y} className="fill-cool-gray-90" />}
+                            </g>
+                        ))}
+                    </g>
+                </svg>
+            )}
+            <div className="absolute right-3 top-3 flex flex-col gap-1">
+                <Button size="icon" variant="outline" className="bg-white" title="Zoom in" onClick={() => zoomAt(1.25, ...center)}>
+                    <ZoomIn className="h-4 w-4" />
+                </Button>
+                <Button size="icon" variant="outline" className="bg-white" title="Zoom out" onClick={() => zoomAt(0.8, ...center)}>
+                    <ZoomOut className="h-4 w-4" />
+                </Button>
+                <Button size="icon" variant="outline" className="bg-white" title="Fit to view" onClick={() => setOverride(null)}>
+                    <Maximize className="h-4 w-4" />
+                </Button>
+            </div>
+        </div>
+    );
+}
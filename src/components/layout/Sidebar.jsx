@@ -2,12 +2,13 @@ import React from 'react';
 import { Link, useLocation, useNavigate } from 'react-router-dom';
 import { useAuth } from '../../context/AuthContext';
 import { cn } from '../../lib/utils';
-import { LayoutDashboard, Users, FileText, LogOut, Settings } from 'lucide-react';
+import { LayoutDashboard, Users, FileText, LogOut, Settings, Network } from 'lucide-react';
 
 const NAV_ITEMS = [
     { label: 'Dashboard', href: '/admin', icon: LayoutDashboard },
     { label: 'Users', href: '/admin/users', icon: Users },
     { label: 'Recipes', href: '/admin/recipes', icon: FileText },
+    { label: 'Diagrams', href: '/admin/diagrams', icon: Network },
 ];
 
 export function Sidebar() {
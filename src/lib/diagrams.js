@@ -0,0 +1,102 @@
+// Pre-laid-out diagrams written by python_diagrams/diagram_export.py into public/diagrams/.
+// Layout happens once at export time; the browser only decodes and draws.
+
+const DIAGRAM_BASE = `${import.meta.env.BASE_URL}diagrams/`;
+
+// Edge flags, as in diagram_export.py
+export const DASHED = 1;
+export const DOTTED = 2;
+export const NO_ARROW = 4;
+
+const cache = new Map();
+
+const fetchJson = (url) => {
+    if (!cache.has(url)) {
+        const request = fetch(url).then((res) => {
+            if (!res.ok) throw new Error(`${url}: ${res.status}`);
+            return res.json();
+        });
+        // Failed requests are retried on the next call instead of being cached.
+        request.catch(() => cache.delete(url));
+        cache.set(url, request);
+    }
+    return cache.get(url);
+};
+
+const bounds = (points) => {
+    let x0 = Infinity, y0 = Infinity, x1 = -Infinity, y1 = -Infinity;
+    for (let i = 0; i < points.length; i += 2) {
+        x0 = Math.min(x0, points[i]);
+        x1 = Math.max(x1, points[i]);
+        y0 = Math.min(y0, points[i + 1]);
+        y1 = Math.max(y1, points[i + 1]);
+    }
+    return [x0, y0, x1, y1];
+};
+
+const arrowHead = (points, tip) => {
+    // Graphviz ends the spline at the arrow's base; the head spans base -> tip.
+    const bx = points[points.length - 2];
+    const by = points[points.length - 1];
+    const dx = tip[0] - bx;
+    const dy = tip[1] - by;
+    const half = 0.35;
+    return `${tip[0]},${tip[1]} ${bx - dy * half},${by + dx * half} ${bx + dy * half},${by - dx * half}`;
+};
+
+export const decodeDiagram = (payload) => {
+    const nodes = payload.nodes.map(([id, label, shape, x, y, w, h]) => ({
+        id,
+        label,
+        lines: label.split('\n'),
+        shape,
+        x,
+        y,
+        w,
+        h,
+        box: [x - w / 2, y - h / 2, x + w / 2, y + h / 2],
+    }));
+    const edges = payload.edges.map(([tail, head, points, tip, label, lx, ly, flags], index) => {
+        let d = `M${points[0]},${points[1]}`;
+        for (let i = 2; i + 5 < points.length; i += 6) {
+            d += `C${points.slice(i, i + 6).join(',')}`;
+        }
+        const all = tip ? [...points, ...tip] : points;
+        const box = bounds(label ? [...all, lx, ly] : all);
+        return {
+            key: `${index}`,
+            tail: nodes[tail].id,
+            head: nodes[head].id,
+            d,
+            arrow: tip && !(flags & NO_ARROW) ? arrowHead(points, tip) : null,
+            label,
+            lx,
+            ly,
+            dashed: Boolean(flags & DASHED),
+            dotted: Boolean(flags & DOTTED),
+            box,
+        };
+    });
+    const clusters = payload.clusters.map(([label, x0, y0, x1, y1]) => ({ label, box: [x0, y0, x1, y1] }));
+    return {
+        name: payload.name,
+        title: payload.title,
+        width: payload.size[0],
+        height: payload.size[1],
+        nodes,
+        edges,
+        clusters,
+    };
+};
+
+export const loadDiagramIndex = () => fetchJson(`${DIAGRAM_BASE}index.json`);
+
+// The source hash in the query string lets the browser cache each export indefinitely.
+export const loadDiagram = async (name) => {
+    const index = await loadDiagramIndex();
+    const entry = index[name];
+    if (!entry) throw new Error(`Unknown diagram: ${name}`);
+    return { ...decodeDiagram(await fetchJson(`${DIAGRAM_BASE}${entry.json}?v=${entry.hash}`)), key: name };
+};
+
+export const mermaidUrl = (entry) => `${DIAGRAM_BASE}${entry.mmd}?v=${entry.hash}`;
@@ -0,0 +1,71 @@
+import { useEffect, useState } from 'react';
+import { Tabs, TabsList, TabsTrigger } from '../../components/ui/Tabs';
+import { DiagramViewer } from '../../components/diagram/DiagramViewer';
+import { loadDiagram, loadDiagramIndex, mermaidUrl } from '../../lib/diagrams';
+
+export function AdminDiagrams() {
+    const [index, setIndex] = useState(null);
+    const [selected, setSelected] = useState(null);
+    const [diagram, setDiagram] = useState(null);
+    const [error, setError] = useState(null);
+
+    useEffect(() => {
+        loadDiagramIndex()
+            .then((data) => {
+                setIndex(data);
+                setError(null);
+                setSelected(Object.keys(data)[0] ?? null);
+            })
+            .catch(() => setError('No exported diagrams found. Run npm run diagrams first.'));
+    }, []);
+
+    useEffect(() => {
+        if (!selected) return;
+        let cancelled = false;
+        loadDiagram(selected)
+            .then((data) => {
+                if (cancelled) return;
+                setDiagram(data);
+                setError(null);
+            })
+            .catch((err) => !cancelled && setError(err.message));
+        return () => {
+            cancelled = true;
+        };
+    }, [selected]);
+
+    return (
+        <div className="space-y-6">
+            <div>
+                <h1 className="text-3xl font-bold tracking-tight text-cool-gray-90">System Diagrams</h1>
+                <p className="text-cool-gray-60">Flowchart, data flow and ER diagrams. Drag to pan, scroll to zoom.</p>
+            </div>
+
+            {error && <p className="text-sm text-red-600">{error}</p>}
+
+            {index && selected && (
+                <>
+                    <div className="flex flex-wrap items-center justify-between gap-3">
+                        <Tabs value={selected} onValueChange={setSelected} className="w-auto">
+                            <TabsList className="h-auto flex-wrap">
+                                {Object.entries(index).map(([name, entry]) => (
+                                    <TabsTrigger key={name} value={name}>
+                                        {entry.title}
+                                    </TabsTrigger>
+                                ))}
+                            </TabsList>
+                        </Tabs>
+                        <a href={mermaidUrl(index[selected])} download className="text-sm font-medium text-cool-gray-60 hover:text-cool-gray-90">
+                            Mermaid source
+                        </a>
+                    </div>
+                    {diagram?.key === selected ? (
+                        <DiagramViewer diagram={diagram} className="h-[70vh]" />
+                    ) : (
+                        <div className="h-[70vh] rounded-lg border border-cool-gray-20 bg-cool-gray-10" />
+                    )}
+                </>
+            )}
+        </div>
+    );
+}